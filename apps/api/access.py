@@ -0,0 +1,168 @@
+"""
+Shared trip authorization.
+
+Resolves (trip, role) for a user with one joined Trip/TripMember query and
+memoizes the result on the request's Session, so repeated checks within a
+request are free. An optional in-process TTL LRU keyed by (user_sub, trip_id)
+can skip the query entirely across requests; membership changes invalidate it.
+"""
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy import and_
+from sqlalchemy.orm import Session
+import models
+
+# Seconds to keep resolved roles in the process-wide LRU (0 disables it)
+TRIP_ACCESS_CACHE_TTL = float(os.environ.get("TRIP_ACCESS_CACHE_TTL", "0"))
+TRIP_ACCESS_CACHE_SIZE = int(os.environ.get("TRIP_ACCESS_CACHE_SIZE", "10000"))
+
+ROLE_LEVELS = {"owner": 4, "admin": 3, "member": 2, "viewer": 1}
+
+_SESSION_KEY = "trip_access"
+
+
+class TripAccess:
+    """A user's resolved access to a trip"""
+
+    def __init__(self, db: Session, trip_id: int, user_sub: str, role: Optional[str], trip: models.Trip = None):
+        self.db = db
+        self.trip_id = trip_id
+        self.user_sub = user_sub
+        self.role = role
+        self._trip = trip
+
+    @property
+    def trip(self) -> models.Trip:
+        # Only hits the database when the role came from the LRU
+        if self._trip is None:
+            self._trip = self.db.get(models.Trip, self.trip_id)
+        return self._trip
+
+    @property
+    def is_owner(self) -> bool:
+        return self.role == "owner"
+
+    def has_role(self, min_role: str) -> bool:
+        return ROLE_LEVELS.get(self.role, 0) >= ROLE_LEVELS.get(min_role, 0)
+
+
+class _RoleCache:
+    """Thread-safe TTL LRU of (user_sub, trip_id) -> role"""
+
+    def __init__(self, ttl: float, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        if self.ttl <= 0:
+            return None
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            role, expires = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return role
+
+    def set(self, key, role: str):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (role, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, trip_id: int = None, user_sub: str = None):
+        with self._lock:
+            if trip_id is None and user_sub is None:
+                self._data.clear()
+                return
+            for key in [k for k in self._data
+                        if (user_sub is None or k[0] == user_sub) and (trip_id is None or k[1] == trip_id)]:
+                del self._data[key]
+
+
+role_cache = _RoleCache(TRIP_ACCESS_CACHE_TTL, TRIP_ACCESS_CACHE_SIZE)
+
+
+def resolve_trip_access(db: Session, trip_id: int, user_sub: str) -> TripAccess:
+    """Resolve the user's role on a trip (None if no access). Raises 404 if the trip doesn't exist."""
+    memo = db.info.setdefault(_SESSION_KEY, {})
+    key = (user_sub, trip_id)
+    if key in memo:
+        return memo[key]
+
+    role = role_cache.get(key)
+    if role is not None:
+        access = TripAccess(db, trip_id, user_sub, role)
+    else:
+        row = db.query(models.Trip, models.TripMember.role).outerjoin(
+            models.TripMember,
+            and_(
+                models.TripMember.trip_id == models.Trip.id,
+                models.TripMember.user_id == user_sub,
+                models.TripMember.invite_status == "accepted"
+            )
+        ).filter(models.Trip.id == trip_id).first()
+        if not row:
+            raise HTTPException(404, "Trip not found")
+
+        trip, member_role = row
+        if trip.owner_sub == user_sub:
+            role = "owner"
+        elif member_role is not None:
+            role = member_role_level(member_role)
+        access = TripAccess(db, trip_id, user_sub, role, trip)
+        if role is not None:
+            role_cache.set(key, role)
+
+    memo[key] = access
+    return access
+
+
+def member_role_level(role: Optional[str]) -> str:
+    """The role a membership grants; a member row claiming "owner" counts as admin"""
+    if role == "owner":
+        return "admin"
+    return role or "member"
+
+
+def require_trip_access(db: Session, trip_id: int, user_sub: str, min_role: str = "viewer",
+                        status_code: int = 403, detail: str = "Access denied") -> TripAccess:
+    """
+    Resolve access and require at least min_role (owner > admin > member > viewer).
+    Owner-only routes pass status_code=404 so other users can't probe for trips.
+    """
+    access = resolve_trip_access(db, trip_id, user_sub)
+    if access.role is None or not access.has_role(min_role):
+        raise HTTPException(status_code, detail)
+    return access
+
+
+def require_expense_access(db: Session, expense_id: int, user_sub: str, min_role: str = "viewer") -> models.Expense:
+    """Load an expense and require access to its trip"""
+    expense = db.query(models.Expense).filter(models.Expense.id == expense_id).first()
+    if not expense:
+        raise HTTPException(404, "Expense not found")
+    require_trip_access(db, expense.trip_id, user_sub, min_role, detail="Access denied to this expense")
+    return expense
+
+
+def invalidate_trip_access(trip_id: int = None, user_sub: str = None, db: Session = None):
+    """Drop cached roles after membership or ownership changes (no arguments clears everything)"""
+    role_cache.invalidate(trip_id, user_sub)
+    if db is not None:
+        memo = db.info.get(_SESSION_KEY, {})
+        for key in [k for k in memo
+                    if (user_sub is None or k[0] == user_sub) and (trip_id is None or k[1] == trip_id)]:
+            del memo[key]
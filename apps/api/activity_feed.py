@@ -0,0 +1,222 @@
+"""
+Live trip activity: publish committed ActivityLog rows to per-trip subscribers.
+
+Session listeners collect new ActivityLog rows as they flush, serialize them
+(with the actor's profile) before the commit finishes, and publish them once
+the commit succeeds; rolled-back rows are dropped. Whatever code adds the row,
+subscribers see it without polling.
+
+The broker is pluggable. LocalBroker fans out within one process: each
+subscriber owns a bounded asyncio.Queue fed thread-safely from the threadpool,
+and one that falls behind is cut off so its client reconnects and backfills
+from the table. RedisBroker (ACTIVITY_PUBSUB_URL=redis://...) publishes to a
+channel per trip on any Redis-compatible server and relays what it receives to
+a LocalBroker, so every worker sees every write.
+"""
+import os
+import json
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+import models
+import schemas
+
+logger = logging.getLogger(__name__)
+
+# Empty: in-process only (one worker). redis://host:6379/0 fans out across workers and hosts.
+ACTIVITY_PUBSUB_URL = os.environ.get("ACTIVITY_PUBSUB_URL", "")
+ACTIVITY_PUBSUB_CHANNEL = os.environ.get("ACTIVITY_PUBSUB_CHANNEL", "trip-activity")
+# Events buffered per subscriber before it is disconnected as too slow
+ACTIVITY_STREAM_QUEUE = int(os.environ.get("ACTIVITY_STREAM_QUEUE", "100"))
+
+_SESSION_KEY = "activity_feed_pending"
+
+
+class Subscription:
+    """One stream's queue of events for a trip; `lagged` once it overflowed"""
+
+    def __init__(self, trip_id: int, maxsize: int = ACTIVITY_STREAM_QUEUE):
+        self.trip_id = trip_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.lagged = False
+
+    def _put(self, event: Dict):
+        # Runs on the subscriber's loop
+        if self.lagged:
+            return
+        if self.queue.full():
+            # Drop the backlog and wake the reader; its client resumes from the last id it saw
+            self.lagged = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+            return
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: float) -> Optional[Dict]:
+        """Next event, or None on timeout or once lagged"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class LocalBroker:
+    """In-process fan-out to the subscribers of each trip"""
+
+    def __init__(self):
+        self._subscribers: Dict[int, Set[Subscription]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    async def subscribe(self, trip_id: int) -> Subscription:
+        sub = Subscription(trip_id)
+        with self._lock:
+            self._subscribers[trip_id].add(sub)
+        return sub
+
+    async def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            subs = self._subscribers.get(sub.trip_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[sub.trip_id]
+
+    def deliver(self, trip_id: int, event: Dict):
+        """Hand an event to local subscribers; safe from any thread"""
+        with self._lock:
+            subs = list(self._subscribers.get(trip_id, ()))
+        for sub in subs:
+            try:
+                sub.loop.call_soon_threadsafe(sub._put, event)
+            except RuntimeError:  # the subscriber's loop has closed
+                pass
+
+    def publish(self, trip_id: int, event: Dict):
+        self.deliver(trip_id, event)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(s) for s in self._subscribers.values())
+
+    async def aclose(self):
+        pass
+
+
+class RedisBroker(LocalBroker):
+    """Publishes through Redis pub/sub; one listener task per process relays to local subscribers"""
+
+    def __init__(self, url: str, channel: str = ACTIVITY_PUBSUB_CHANNEL):
+        super().__init__()
+        import redis
+        import redis.asyncio
+        self.channel = channel
+        self._publisher = redis.Redis.from_url(url)
+        self._async_client = redis.asyncio.Redis.from_url(url)
+        self._listener: Optional[asyncio.Task] = None
+
+    def publish(self, trip_id: int, event: Dict):
+        try:
+            self._publisher.publish(f"{self.channel}:{trip_id}", json.dumps(event))
+        except Exception:
+            # Live delivery is best effort; the row is committed and clients backfill on reconnect
+            logger.exception("activity publish failed for trip %s", trip_id)
+
+    async def subscribe(self, trip_id: int) -> Subscription:
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+        return await super().subscribe(trip_id)
+
+    async def _listen(self):
+        while True:
+            try:
+                pubsub = self._async_client.pubsub(ignore_subscribe_messages=True)
+                await pubsub.psubscribe(f"{self.channel}:*")
+                async for message in pubsub.listen():
+                    trip_id = int(message["channel"].decode().rsplit(":", 1)[1])
+                    self.deliver(trip_id, json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("activity pub/sub listener failed; reconnecting")
+                await asyncio.sleep(1)
+
+    async def aclose(self):
+        if self._listener is not None:
+            self._listener.cancel()
+        await self._async_client.aclose()
+        self._publisher.close()
+
+
+def build_broker(url: str = ACTIVITY_PUBSUB_URL) -> LocalBroker:
+    return RedisBroker(url) if url else LocalBroker()
+
+
+broker = build_broker()
+
+
+def serialize(db: Session, activity: models.ActivityLog) -> Dict:
+    """The JSON shape of GET /trips/{trip_id}/activity rows"""
+    user = db.get(models.UserProfile, activity.user_id)
+    out = schemas.ActivityLogOut(
+        id=activity.id, trip_id=activity.trip_id, user_id=activity.user_id,
+        action_type=activity.action_type, action_metadata=activity.action_metadata,
+        created_at=activity.created_at,
+        user=schemas.UserProfileOut.model_validate(user, from_attributes=True) if user is not None else None,
+    )
+    return out.model_dump(mode="json")
+
+
+def serialize_many(db: Session, activities: Iterable) -> List[Dict]:
+    """serialize() for many rows (ActivityLog objects or rows with its columns), loading actors in one query"""
+    activities = list(activities)
+    user_ids = {a.user_id for a in activities}
+    # Held here so serialize() finds them in the (weakly referencing) identity map
+    users = db.query(models.UserProfile).filter(models.UserProfile.id.in_(user_ids)).all() if user_ids else []
+    payloads = [serialize(db, a) for a in activities]
+    del users
+    return payloads
+
+
+def publish_on_commit(session: Session, activities: Iterable):
+    """Publish rows inserted without the ORM (e.g. Core multi-row inserts) once session commits"""
+    session.info.setdefault(_SESSION_KEY, []).extend(serialize_many(session, activities))
+
+
+def _after_flush(session: Session, flush_context):
+    new = [obj for obj in session.new if isinstance(obj, models.ActivityLog)]
+    if new:
+        session.info.setdefault(_SESSION_KEY, []).extend(new)
+
+
+def _after_flush_postexec(session: Session, flush_context):
+    # Serialize while the rows and their ids are loaded; after_commit can't query
+    pending = session.info.get(_SESSION_KEY, ())
+    new = [(i, item) for i, item in enumerate(pending) if isinstance(item, models.ActivityLog)]
+    for (i, _), payload in zip(new, serialize_many(session, [item for _, item in new])):
+        pending[i] = payload
+
+
+def _after_commit(session: Session):
+    pending = session.info.pop(_SESSION_KEY, None)
+    for payload in pending or ():
+        broker.publish(payload["trip_id"], payload)
+
+
+def _after_rollback(session: Session):
+    session.info.pop(_SESSION_KEY, None)
+
+
+def install():
+    """Publish ActivityLog rows committed through any Session"""
+    if not event.contains(Session, "after_flush", _after_flush):
+        event.listen(Session, "after_flush", _after_flush)
+        event.listen(Session, "after_flush_postexec", _after_flush_postexec)
+        event.listen(Session, "after_commit", _after_commit)
+        event.listen(Session, "after_rollback", _after_rollback)
+
@@ -0,0 +1,221 @@
+"""
+Recording trip activity, synchronously or write-behind.
+
+Routes call record() next to the change it describes. In the default "sync"
+mode the ActivityLog row joins the request's transaction, as before. With
+ACTIVITY_LOG_MODE=async the event is kept on the session and handed to an
+in-process buffer only once that transaction commits (a rollback drops it), so
+the request no longer inserts into the hot activity_log table or moves the
+trip summary's last activity itself. A background thread writes the buffer
+every ACTIVITY_LOG_FLUSH_MS or as soon as ACTIVITY_LOG_BATCH_SIZE events wait:
+one session and one multi-row INSERT per batch, one trip version bump and one
+trip_summary.apply per trip, and the rows are published to live streams once
+the batch commits.
+
+The trade-off is durability and read-your-writes: rows land up to one flush
+interval after the response, and events still buffered when a process dies
+are lost. Shutdown drains the buffer (the app's lifespan, and gunicorn's
+worker_exit hook when max_requests recycles a worker), and a full buffer makes
+writers wait rather than grow without bound.
+"""
+import os
+import time
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+from database import SessionLocal
+import models
+import trip_summary
+import trip_version
+import activity_feed
+
+logger = logging.getLogger(__name__)
+
+# "sync": write in the request's transaction (default; rows are readable once the request returns)
+# "async": write-behind
+ACTIVITY_LOG_MODE = os.environ.get("ACTIVITY_LOG_MODE", "sync").lower()
+ACTIVITY_LOG_BATCH_SIZE = int(os.environ.get("ACTIVITY_LOG_BATCH_SIZE", "200"))
+ACTIVITY_LOG_FLUSH_MS = float(os.environ.get("ACTIVITY_LOG_FLUSH_MS", "250"))
+# Events buffered before record() blocks the committing request
+ACTIVITY_LOG_QUEUE = int(os.environ.get("ACTIVITY_LOG_QUEUE", "10000"))
+# Attempts at writing a batch before it is dropped (and logged)
+ACTIVITY_LOG_RETRIES = 3
+
+_SESSION_KEY = "activity_log_pending"
+
+
+class ActivityLogWriter:
+    """Buffers committed activity events and inserts them in batches from a daemon thread"""
+
+    def __init__(self, batch_size: int = ACTIVITY_LOG_BATCH_SIZE, flush_ms: float = ACTIVITY_LOG_FLUSH_MS,
+                 max_pending: int = ACTIVITY_LOG_QUEUE, session_factory=SessionLocal):
+        self.batch_size = batch_size
+        self.interval = flush_ms / 1000
+        self.max_pending = max_pending
+        self.session_factory = session_factory
+        self.stats = defaultdict(int)
+        self._pending: List[Dict] = []
+        self._writing = 0
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._closed = False
+
+    def submit(self, events: List[Dict]):
+        """Queue committed events; blocks while the buffer is full"""
+        if not events:
+            return
+        with self._cond:
+            closed = self._closed
+        if closed:
+            # Shut down: nobody will flush, so write inline
+            self._write_with_retries(events)
+            return
+        with self._cond:
+            self._ensure_thread()
+            while len(self._pending) >= self.max_pending:
+                self.stats["waits"] += 1
+                self._cond.wait()
+            self._pending.extend(events)
+            self.stats["queued"] += len(events)
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._pending) + self._writing
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything queued so far is written; False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            if self._pending and (self._thread is None or not self._thread.is_alive()):
+                self._ensure_thread()
+            self._cond.notify_all()
+            while self._pending or self._writing:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout: float = 30):
+        """Drain the buffer and stop the thread; later events are written inline"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None and thread.is_alive():
+            thread.join(timeout)
+            if thread.is_alive():
+                logger.error("activity log writer did not drain within %ss; %s events pending",
+                             timeout, self.pending())
+
+    def _ensure_thread(self):
+        # Lazily, and again after a fork (gunicorn preloads the app in the master)
+        if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="activity-log-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.interval
+                while not self._closed and len(self._pending) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if not self._pending:
+                    if self._closed:
+                        return
+                    continue
+                batch, self._pending = self._pending[:self.batch_size], self._pending[self.batch_size:]
+                self._writing = len(batch)
+                self._cond.notify_all()  # room for blocked writers
+            try:
+                self._write_with_retries(batch)
+            finally:
+                with self._cond:
+                    self._writing = 0
+                    self._cond.notify_all()
+
+    def _write_with_retries(self, batch: List[Dict]):
+        for attempt in range(1, ACTIVITY_LOG_RETRIES + 1):
+            try:
+                self._write(batch)
+                return
+            except Exception:
+                if attempt == ACTIVITY_LOG_RETRIES:
+                    self.stats["dropped"] += len(batch)
+                    logger.exception("dropping %d activity events after %d failed writes", len(batch), attempt)
+                    return
+                logger.warning("activity log batch write failed (attempt %d); retrying", attempt, exc_info=True)
+                time.sleep(self.interval * attempt)
+
+    def _write(self, batch: List[Dict]):
+        db = self.session_factory()
+        try:
+            # One multi-row INSERT; RETURNING whole rows, so nothing depends on their order
+            table = models.ActivityLog.__table__
+            rows = db.execute(insert(table).values(batch).returning(*table.c)).all()
+            # Core bypasses the flush listeners: bump versions and queue the live events here
+            trip_version.bump(db, {row.trip_id for row in rows})
+            activity_feed.publish_on_commit(db, rows)
+            last_at: Dict[int, datetime] = {}
+            for row in rows:
+                at = last_at.get(row.trip_id)
+                last_at[row.trip_id] = row.created_at if at is None else max(at, row.created_at)
+            for trip_id in sorted(last_at):
+                trip_summary.apply(db, trip_id, at=last_at[trip_id])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        self.stats["written"] += len(batch)
+        self.stats["batches"] += 1
+
+
+writer = ActivityLogWriter()
+
+
+def record(db: Session, trip_id: int, user_id: str, action_type: str, metadata: Optional[Dict] = None,
+           at: Optional[datetime] = None) -> Optional[models.ActivityLog]:
+    """
+    Log an action on a trip as part of db's transaction and move the trip's last
+    activity forward. Returns the pending row in sync mode; None in async mode,
+    where it is written after the commit. Does not commit.
+    """
+    values = dict(trip_id=trip_id, user_id=user_id, action_type=action_type, action_metadata=metadata,
+                  created_at=at or datetime.utcnow())
+    if ACTIVITY_LOG_MODE != "async":
+        activity = models.ActivityLog(**values)
+        db.add(activity)
+        trip_summary.apply(db, trip_id, at=activity.created_at)
+        return activity
+    db.info.setdefault(_SESSION_KEY, []).append(values)
+    return None
+
+
+def _after_commit(session: Session):
+    events = session.info.pop(_SESSION_KEY, None)
+    if events:
+        writer.submit(events)
+
+
+def _after_rollback(session: Session):
+    session.info.pop(_SESSION_KEY, None)
+
+
+def install():
+    """Hand events recorded in async mode to the writer when their transaction commits"""
+    if not event.contains(Session, "after_commit", _after_commit):
+        event.listen(Session, "after_commit", _after_commit)
+        event.listen(Session, "after_rollback", _after_rollback)
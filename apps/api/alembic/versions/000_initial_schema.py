@@ -0,0 +1,167 @@
+"""Initial schema: core trip, expense and planning tables
+
+Revision ID: 000
+Revises:
+Create Date: 2026-10-16
+
+Creates the tables that predate migrations (previously only created by
+Base.metadata.create_all), as they stood before revision 001, so a fresh
+database can be built by `alembic upgrade head` alone. Revision 001 was
+re-parented onto this one (its down_revision used to be None). Paths:
+
+- Fresh database: `alembic upgrade head` runs 000, then 001 onwards.
+- Database already managed by Alembic (alembic_version at 001 or later):
+  nothing to do; `alembic upgrade head` continues from the recorded revision
+  and never runs 000, whose tables that database already has.
+- Database created by create_all without alembic_version: it already has the
+  full schema, so run `alembic stamp head` once instead of upgrading.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '000'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'trips',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('owner_sub', sa.String(), nullable=False),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('home_currency', sa.String(), nullable=False),
+        sa.Column('start_date', sa.Date(), nullable=False),
+        sa.Column('end_date', sa.Date(), nullable=False),
+        sa.Column('total_budget', sa.Numeric(precision=12, scale=2), nullable=True),
+    )
+    op.create_index('ix_trips_id', 'trips', ['id'])
+    op.create_index('ix_trips_owner_sub', 'trips', ['owner_sub'])
+
+    op.create_table(
+        'participants',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('trip_id', sa.Integer(), sa.ForeignKey('trips.id'), nullable=False),
+        sa.Column('display_name', sa.String(), nullable=False),
+        sa.Column('weight', sa.Float(), nullable=False),
+    )
+    op.create_index('ix_participants_id', 'participants', ['id'])
+    op.create_index('ix_participants_trip_id', 'participants', ['trip_id'])
+
+    op.create_table(
+        'itinerary_items',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('trip_id', sa.Integer(), sa.ForeignKey('trips.id'), nullable=False),
+        sa.Column('start_dt', sa.DateTime(), nullable=False),
+        sa.Column('end_dt', sa.DateTime(), nullable=True),
+        sa.Column('type', sa.String(), nullable=False),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('location_text', sa.String(), nullable=True),
+        sa.Column('lat', sa.Float(), nullable=True),
+        sa.Column('lng', sa.Float(), nullable=True),
+        sa.Column('notes', sa.Text(), nullable=True),
+        sa.Column('conf_code', sa.String(), nullable=True),
+    )
+    op.create_index('ix_itinerary_items_id', 'itinerary_items', ['id'])
+    op.create_index('ix_itinerary_items_trip_id', 'itinerary_items', ['trip_id'])
+
+    op.create_table(
+        'expenses',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('trip_id', sa.Integer(), sa.ForeignKey('trips.id'), nullable=False),
+        sa.Column('payer_id', sa.Integer(), sa.ForeignKey('participants.id'), nullable=False),
+        sa.Column('dt', sa.Date(), nullable=False),
+        sa.Column('amount', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column('currency', sa.String(), nullable=False),
+        sa.Column('category', sa.String(), nullable=True),
+        sa.Column('note', sa.Text(), nullable=True),
+        sa.Column('fx_rate_to_home', sa.Float(), nullable=True),
+    )
+    op.create_index('ix_expenses_id', 'expenses', ['id'])
+    op.create_index('ix_expenses_trip_id', 'expenses', ['trip_id'])
+
+    op.create_table(
+        'expense_splits',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('expense_id', sa.Integer(), sa.ForeignKey('expenses.id'), nullable=False),
+        sa.Column('participant_id', sa.Integer(), sa.ForeignKey('participants.id'), nullable=False),
+        sa.Column('share_type', sa.String(), nullable=False),
+        sa.Column('share_value', sa.Float(), nullable=True),
+    )
+    op.create_index('ix_expense_splits_id', 'expense_splits', ['id'])
+    op.create_index('ix_expense_splits_expense_id', 'expense_splits', ['expense_id'])
+    op.create_index('ix_expense_splits_participant_id', 'expense_splits', ['participant_id'])
+
+    op.create_table(
+        'exchange_rates',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('from_ccy', sa.String(), nullable=False),
+        sa.Column('to_ccy', sa.String(), nullable=False),
+        sa.Column('rate', sa.Float(), nullable=False),
+        sa.UniqueConstraint('date', 'from_ccy', 'to_ccy', name='uq_fx_date_pair'),
+    )
+    op.create_index('ix_exchange_rates_id', 'exchange_rates', ['id'])
+
+    op.create_table(
+        'category_budgets',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('trip_id', sa.Integer(), sa.ForeignKey('trips.id'), nullable=False),
+        sa.Column('category', sa.String(), nullable=False),
+        sa.Column('planned_amount', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.UniqueConstraint('trip_id', 'category', name='uq_trip_category'),
+    )
+    op.create_index('ix_category_budgets_id', 'category_budgets', ['id'])
+    op.create_index('ix_category_budgets_trip_id', 'category_budgets', ['trip_id'])
+
+    op.create_table(
+        'accommodations',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('trip_id', sa.Integer(), sa.ForeignKey('trips.id'), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('type', sa.String(), nullable=True),
+        sa.Column('check_in_date', sa.Date(), nullable=False),
+        sa.Column('check_out_date', sa.Date(), nullable=False),
+        sa.Column('nightly_rate', sa.Numeric(precision=12, scale=2), nullable=True),
+        sa.Column('total_cost', sa.Numeric(precision=12, scale=2), nullable=True),
+        sa.Column('currency', sa.String(), nullable=False),
+        sa.Column('location_text', sa.String(), nullable=True),
+        sa.Column('lat', sa.Float(), nullable=True),
+        sa.Column('lng', sa.Float(), nullable=True),
+        sa.Column('confirmation_code', sa.String(), nullable=True),
+        sa.Column('notes', sa.Text(), nullable=True),
+        sa.Column('booking_url', sa.String(), nullable=True),
+    )
+    op.create_index('ix_accommodations_id', 'accommodations', ['id'])
+    op.create_index('ix_accommodations_trip_id', 'accommodations', ['trip_id'])
+
+    op.create_table(
+        'settlements',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('trip_id', sa.Integer(), sa.ForeignKey('trips.id'), nullable=False),
+        sa.Column('from_participant_id', sa.Integer(), sa.ForeignKey('participants.id'), nullable=False),
+        sa.Column('to_participant_id', sa.Integer(), sa.ForeignKey('participants.id'), nullable=False),
+        sa.Column('amount', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column('currency', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('payment_method', sa.String(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.Column('notes', sa.Text(), nullable=True),
+    )
+    op.create_index('ix_settlements_id', 'settlements', ['id'])
+    op.create_index('ix_settlements_trip_id', 'settlements', ['trip_id'])
+
+
+def downgrade():
+    op.drop_table('settlements')
+    op.drop_table('accommodations')
+    op.drop_table('category_budgets')
+    op.drop_table('exchange_rates')
+    op.drop_table('expense_splits')
+    op.drop_table('expenses')
+    op.drop_table('itinerary_items')
+    op.drop_table('participants')
+    op.drop_table('trips')
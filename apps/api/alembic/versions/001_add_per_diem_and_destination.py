@@ -1,9 +1,13 @@
 """Add per_diem_budget and destination to trips
 
 Revision ID: 001
-Revises:
+Revises: 000
 Create Date: 2025-10-31
 
+Originally the base revision; 000 (the pre-migration tables) was added below
+it later. Databases already stamped at 001 or beyond upgrade as before, since
+Alembic only runs revisions after the recorded one. See 000 for the paths.
+
 """
 from alembic import op
 import sqlalchemy as sa
@@ -11,7 +15,7 @@ from sqlalchemy.dialects import postgresql
 
 # revision identifiers, used by Alembic.
 revision = '001'
-down_revision = None
+down_revision = '000'
 branch_labels = None
 depends_on = None
 
@@ -0,0 +1,34 @@
+"""Add trip_balances ledger table
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Materialized per-participant balances, kept up to date by expense writes.
+    # Existing trips are computed on read until their first expense write seeds them
+    # (or run scripts/rebuild_ledger.py once to seed them all).
+    op.create_table(
+        'trip_balances',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('trip_id', sa.Integer(), sa.ForeignKey('trips.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('participant_id', sa.Integer(), sa.ForeignKey('participants.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('net_cents', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.UniqueConstraint('trip_id', 'participant_id', name='uq_trip_balance_participant'),
+    )
+    op.create_index('ix_trip_balances_trip_id', 'trip_balances', ['trip_id'])
+
+
+def downgrade():
+    op.drop_table('trip_balances')
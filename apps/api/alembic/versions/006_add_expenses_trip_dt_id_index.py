@@ -0,0 +1,22 @@
+"""Add composite (trip_id, dt, id) index to expenses for keyset pagination
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_expenses_trip_dt_id', 'expenses', ['trip_id', 'dt', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_expenses_trip_dt_id', table_name='expenses')
@@ -0,0 +1,32 @@
+"""Add trip_summaries table for the trips list
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Denormalized per-trip figures, kept up to date by writes. Existing trips are
+    # computed on read and seeded on their next write (or via scripts/rebuild_trip_summaries.py).
+    op.create_table(
+        'trip_summaries',
+        sa.Column('trip_id', sa.Integer(), sa.ForeignKey('trips.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('participant_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('expense_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('total_spent_cents', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('last_activity_at', sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table('trip_summaries')
@@ -0,0 +1,23 @@
+"""Add trips.version for conditional GETs
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('trips', sa.Column('version', sa.BigInteger(), nullable=False, server_default='1'))
+
+
+def downgrade():
+    op.drop_column('trips', 'version')
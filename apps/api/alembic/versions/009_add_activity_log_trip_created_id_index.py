@@ -0,0 +1,27 @@
+"""Add composite (trip_id, created_at desc, id desc) index to activity_log for keyset pagination
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_activity_log_trip_created_id', 'activity_log',
+                    ['trip_id', sa.text('created_at DESC'), sa.text('id DESC')])
+    # Covered by the composite index's leading column
+    op.drop_index('ix_activity_log_trip_id', table_name='activity_log')
+
+
+def downgrade():
+    op.create_index('ix_activity_log_trip_id', 'activity_log', ['trip_id'])
+    op.drop_index('ix_activity_log_trip_created_id', table_name='activity_log')
@@ -1,4 +1,5 @@
 import os
+from typing import Optional
 from fastapi import Request, HTTPException
 
 AUTH_DISABLED = os.environ.get("AUTH_DISABLED", "false").lower() == "true"
@@ -23,3 +24,10 @@ def get_user_sub(request: Request) -> str:
     if not sub:
         raise HTTPException(status_code=401, detail="Missing x-user-sub header (or disable auth in env)")
     return sub
+
+def request_user_sub(request: Request) -> Optional[str]:
+    """The caller's sub without enforcing auth (None when anonymous), for routing and bookkeeping"""
+    sub = request.headers.get("x-user-sub")
+    if AUTH_DISABLED:
+        return sub or "dev-user-sub"
+    return sub
@@ -0,0 +1,105 @@
+"""
+Set-based balance computation.
+
+Computes every participant's net balance for a trip (home-currency cents) in a
+single grouped SQL statement over expenses, expense_splits and participants,
+with the same split rules and largest-remainder cent allocation as
+`ledger.recompute_trip_balances`. Runs on SQLite (3.25+, window functions)
+and Postgres.
+"""
+from typing import Dict
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Python rounds via Decimal(str(x)) half-up; this nudge makes floor(x + 0.5)
+# agree for values whose binary form sits just below a half cent (e.g. 1.005).
+HALF_CENT_EPSILON = 1e-6
+
+
+def _floor(expr: str, dialect: str) -> str:
+    # FLOOR() is only present in SQLite builds with math functions enabled
+    if dialect == "sqlite":
+        return (f"(CASE WHEN ({expr}) < CAST(({expr}) AS INTEGER) "
+                f"THEN CAST(({expr}) AS INTEGER) - 1 ELSE CAST(({expr}) AS INTEGER) END)")
+    return f"FLOOR({expr})"
+
+
+def _amount(dialect: str) -> str:
+    # SQLite keeps Numeric(12,2) as REAL; round like SQLAlchemy does on load
+    if dialect == "sqlite":
+        return "ROUND(e.amount, 2)"
+    return "CAST(e.amount AS DOUBLE PRECISION)"
+
+
+def build_balance_sql(dialect: str) -> str:
+    total_home = (f"{_amount(dialect)} * (CASE WHEN e.fx_rate_to_home IS NULL OR e.fx_rate_to_home = 0 "
+                  f"THEN 1.0 ELSE e.fx_rate_to_home END)")
+    floor_raw = _floor("raw", dialect)
+    return f"""
+WITH exp AS (
+    SELECT e.id AS expense_id, e.payer_id,
+           CASE WHEN {total_home} < 0 THEN -1 ELSE 1 END AS sgn,
+           {_floor(f"ABS({total_home}) * 100 + 0.5 + :eps", dialect)} AS cents
+    FROM expenses e
+    WHERE e.trip_id = :trip_id
+),
+modes AS (
+    SELECT s.expense_id,
+           MAX(CASE WHEN s.share_type = 'custom' THEN 1 ELSE 0 END) AS has_custom,
+           MAX(CASE WHEN s.share_type = 'weight' THEN 1 ELSE 0 END) AS has_weight
+    FROM expense_splits s
+    JOIN exp ON exp.expense_id = s.expense_id
+    GROUP BY s.expense_id
+),
+shares AS (
+    SELECT s.expense_id, s.participant_id, s.id AS ord,
+           CASE WHEN m.has_custom = 1 THEN COALESCE(s.share_value, 0)
+                WHEN m.has_weight = 1 THEN
+                    CASE WHEN p.weight IS NULL OR p.weight = 0 THEN 1.0 ELSE p.weight END
+                ELSE 1.0 END AS w
+    FROM expense_splits s
+    JOIN modes m ON m.expense_id = s.expense_id
+    LEFT JOIN participants p ON p.id = s.participant_id AND p.trip_id = :trip_id
+    UNION ALL
+    SELECT exp.expense_id, p.id, p.id, 1.0
+    FROM exp
+    JOIN participants p ON p.trip_id = :trip_id
+    WHERE NOT EXISTS (SELECT 1 FROM modes m WHERE m.expense_id = exp.expense_id)
+),
+weighted AS (
+    SELECT sh.expense_id, sh.participant_id, sh.ord, exp.cents, exp.sgn,
+           exp.cents * sh.w / NULLIF(SUM(sh.w) OVER (PARTITION BY sh.expense_id), 0) AS raw
+    FROM shares sh
+    JOIN exp ON exp.expense_id = sh.expense_id
+),
+based AS (
+    SELECT expense_id, participant_id, ord, cents, sgn,
+           {floor_raw} AS base, raw - {floor_raw} AS frac
+    FROM weighted
+    WHERE raw IS NOT NULL
+),
+ranked AS (
+    SELECT participant_id, sgn, base,
+           ROW_NUMBER() OVER (PARTITION BY expense_id ORDER BY frac DESC, ord) AS rn,
+           cents - SUM(base) OVER (PARTITION BY expense_id) AS leftover
+    FROM based
+),
+deltas AS (
+    SELECT payer_id AS participant_id, sgn * cents AS delta FROM exp
+    UNION ALL
+    SELECT participant_id, -sgn * (base + CASE WHEN rn <= leftover THEN 1 ELSE 0 END) FROM ranked
+    UNION ALL
+    SELECT id, 0 FROM participants WHERE trip_id = :trip_id
+)
+SELECT participant_id, SUM(delta) AS net_cents
+FROM deltas
+GROUP BY participant_id
+ORDER BY participant_id
+"""
+
+
+def compute_trip_balances(db: Session, trip_id: int) -> Dict[int, int]:
+    """Net balance per participant in home-currency cents, computed in the database"""
+    dialect = db.get_bind().dialect.name
+    rows = db.execute(text(build_balance_sql(dialect)), {"trip_id": trip_id, "eps": HALF_CENT_EPSILON}).all()
+    return {pid: int(round(cents)) for pid, cents in rows}
@@ -1,16 +1,228 @@
 import os
-from sqlalchemy import create_engine
+import time
+import logging
+import threading
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker, declarative_base
+from db_config import build_engine, build_async_engine
+from auth import request_user_sub
+
+logger = logging.getLogger(__name__)
 
 DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./local.db")
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+# Serve the async read routes from an AsyncSession instead of the threadpool
+DATABASE_ASYNC = os.environ.get("DATABASE_ASYNC", "false").lower() == "true"
+
+# Optional read replica for read-only routes; users who just wrote keep reading
+# the primary for READ_YOUR_WRITES_S seconds. The worker that took the write
+# remembers it, and responses carry the write time in LAST_WRITE_HEADER for the
+# client to echo, so reads landing on other workers or hosts honour it too.
+DATABASE_REPLICA_URL = os.environ.get("DATABASE_REPLICA_URL")
+READ_YOUR_WRITES_S = float(os.environ.get("READ_YOUR_WRITES_S", "5"))
+LAST_WRITE_HEADER = "X-Last-Write"
+# Clock difference tolerated between the hosts stamping and reading LAST_WRITE_HEADER
+LAST_WRITE_SKEW_S = 1.0
+
+engine = build_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
-def get_db():
+
+def async_database_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto an async driver (psycopg 3 is async-capable; SQLite needs aiosqlite)"""
+    u = make_url(url)
+    if u.get_backend_name() == "postgresql" and u.get_driver_name() != "asyncpg":
+        u = u.set(drivername="postgresql+psycopg")
+    elif u.get_backend_name() == "sqlite":
+        u = u.set(drivername="sqlite+aiosqlite")
+    return u.render_as_string(hide_password=False)
+
+
+ASYNC_DATABASE_URL = os.environ.get("ASYNC_DATABASE_URL") or async_database_url(DATABASE_URL)
+
+replica_engine = build_engine(DATABASE_REPLICA_URL) if DATABASE_REPLICA_URL else None
+ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine) if replica_engine else None
+
+async_engine = None
+AsyncSessionLocal = None
+AsyncReplicaSessionLocal = None
+if DATABASE_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+    async_engine = build_async_engine(ASYNC_DATABASE_URL)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    if DATABASE_REPLICA_URL:
+        AsyncReplicaSessionLocal = async_sessionmaker(build_async_engine(async_database_url(DATABASE_REPLICA_URL)),
+                                                      autoflush=False, expire_on_commit=False)
+
+
+def dispose_engines(close: bool = True):
+    """Drop every engine's pooled connections. A forked worker passes close=False so
+    the connections it inherited are discarded without closing the parent's sockets."""
+    engines = [engine, replica_engine]
+    for factory in (AsyncSessionLocal, AsyncReplicaSessionLocal):
+        if factory is not None:
+            engines.append(factory.kw["bind"].sync_engine)
+    for e in engines:
+        if e is not None:
+            e.dispose(close=close)
+
+
+class _RecentWriters:
+    """Users who committed a write in the last `window` seconds"""
+
+    def __init__(self, window: float):
+        self.window = window
+        self._until = {}
+        self._lock = threading.Lock()
+
+    def mark(self, user_sub: str):
+        now = time.monotonic()
+        with self._lock:
+            self._until[user_sub] = now + self.window
+            if len(self._until) > 10000:
+                self._until = {k: v for k, v in self._until.items() if v > now}
+
+    def is_recent(self, user_sub: str) -> bool:
+        with self._lock:
+            until = self._until.get(user_sub)
+        return until is not None and until > time.monotonic()
+
+
+recent_writers = _RecentWriters(READ_YOUR_WRITES_S)
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _note_write(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _note_bulk_write(orm_execute_state):
+    # insert()/update()/delete() through Session.execute don't flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _mark_recent_writer(session):
+    if not session.info.pop("wrote", False):
+        return
+    if session.info.get("user_sub"):
+        recent_writers.mark(session.info["user_sub"])
+    state = session.info.get("request_state")
+    if state is not None:
+        state["last_write"] = time.time()  # sent back by ReadYourWritesMiddleware
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _forget_write(session):
+    session.info.pop("wrote", None)
+
+
+def _client_wrote_recently(request: Request) -> bool:
+    try:
+        last_write = float(request.headers.get(LAST_WRITE_HEADER, ""))
+    except ValueError:
+        return False
+    # A stamp from the future beyond the skew allowance is ignored rather than trusted indefinitely
+    return -LAST_WRITE_SKEW_S <= time.time() - last_write < READ_YOUR_WRITES_S
+
+
+def use_replica(request: Request) -> bool:
+    if ReplicaSessionLocal is None or READ_YOUR_WRITES_S < 0:
+        return False
+    user_sub = request_user_sub(request)
+    if user_sub and recent_writers.is_recent(user_sub):
+        return False
+    return not _client_wrote_recently(request)
+
+
+def get_db(request: Request):
     db = SessionLocal()
+    # Commits that write start the user's read-your-writes window
+    db.info["user_sub"] = request_user_sub(request)
+    db.info["request_state"] = request.scope.setdefault("state", {})
     try:
         yield db
     finally:
         db.close()
+
+
+class ReadYourWritesMiddleware:
+    """ASGI middleware stamping responses to requests that wrote with LAST_WRITE_HEADER"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_stamp(message):
+            if message["type"] == "http.response.start":
+                last_write = scope.get("state", {}).get("last_write")
+                if last_write is not None:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (LAST_WRITE_HEADER.lower().encode(), f"{last_write:.3f}".encode())
+                    ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_stamp)
+
+
+def _replica_session():
+    """A replica Session, or None if the replica is unreachable"""
+    db = ReplicaSessionLocal()
+    try:
+        db.connection()
+        return db
+    except OperationalError as e:
+        logger.warning("Read replica unavailable, using primary: %s", e)
+        db.close()
+        return None
+
+
+class ThreadpoolSession:
+    """The AsyncSession.run_sync interface over a sync Session, run in the threadpool"""
+
+    def __init__(self, session):
+        self.sync_session = session
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+
+async def get_async_db(request: Request):
+    """
+    Read-only session for async routes, on the replica when one is configured
+    (primary for users inside their read-your-writes window, or if the replica
+    is down). Handlers call `await db.run_sync(fn, ...)` with a function taking
+    a sync Session; with DATABASE_ASYNC it runs on the async engine without
+    tying up a thread, otherwise in the threadpool as before. Return plain data
+    or schemas from `fn`, not ORM objects to lazy-load later.
+    """
+    replica = use_replica(request)
+    if AsyncSessionLocal is not None:
+        session = None
+        if replica:
+            session = AsyncReplicaSessionLocal()
+            try:
+                await session.connection()
+            except OperationalError as e:
+                logger.warning("Read replica unavailable, using primary: %s", e)
+                await session.close()
+                session = None
+        async with session or AsyncSessionLocal() as session:
+            yield session
+    else:
+        db = (await run_in_threadpool(_replica_session) if replica else None) or SessionLocal()
+        try:
+            yield ThreadpoolSession(db)
+        finally:
+            await run_in_threadpool(db.close)
@@ -0,0 +1,262 @@
+"""
+Synthetic datasets for load tests, benchmarks and regression checks.
+
+generate_dataset() bulk-inserts trips with participants, expenses and splits,
+members, comments, reactions and activity using Core insert() executemany,
+committing every few trips so memory stays flat at millions of expenses. Each
+trip draws from its own RNG seeded from (spec seed, trip index), so a spec
+always produces the same rows regardless of batch size. The balance ledger and
+trip summaries are written alongside, so reads don't trigger a rebuild.
+"""
+import random
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+import models
+import ledger
+from utils import expense_total_cents
+
+# Fixed rates to USD; expense fx_rate_to_home is derived from these
+RATES_TO_USD = {
+    "USD": 1.0, "EUR": 1.08, "GBP": 1.27, "JPY": 0.0067, "CAD": 0.74,
+    "AUD": 0.66, "MXN": 0.058, "THB": 0.028, "CHF": 1.12, "INR": 0.012,
+}
+
+CATEGORIES = [c.value for c in models.ExpenseCategory]
+EMOJIS = ["👍", "❤️", "😂", "😮", "🎉", "💸"]
+WEIGHTS = [1.0, 1.0, 1.0, 0.5, 1.2, 1.5, 2.0]
+
+PRESETS = {
+    "small": dict(trips=20, participants=(2, 6), expenses=(20, 80)),
+    "medium": dict(trips=500, participants=(2, 8), expenses=(50, 150)),
+    # ~1M expenses
+    "large": dict(trips=10000, participants=(2, 8), expenses=(80, 120), owners=200),
+    # Few trips with very large groups
+    "wide": dict(trips=20, participants=(50, 50), members=(49, 49), expenses=(500, 1000), users=100),
+}
+
+
+class DatasetSpec:
+    """
+    Shape of a generated dataset. (low, high) tuples are inclusive per-trip
+    ranges; split_mix weights the split kinds ("none" = no split rows, i.e.
+    equal among all participants).
+    """
+
+    def __init__(self, trips: int = 10, participants: Tuple[int, int] = (2, 6),
+                 expenses: Tuple[int, int] = (20, 100), split_mix: Optional[Dict[str, float]] = None,
+                 currencies: Sequence[str] = ("USD", "EUR", "JPY", "GBP"), foreign_share: float = 0.3,
+                 members: Tuple[int, int] = (0, 3), users: int = 50, owners: int = 1,
+                 comments_per_expense: float = 0.2, reactions_per_expense: float = 0.3,
+                 activity: Tuple[int, int] = (10, 50), seed: int = 1, prefix: str = "datagen"):
+        self.trips = trips
+        self.participants = participants
+        self.expenses = expenses
+        self.split_mix = split_mix or {"equal": 0.5, "weight": 0.2, "custom": 0.1, "none": 0.2}
+        self.currencies = [c.upper() for c in currencies]
+        self.foreign_share = foreign_share
+        self.members = members
+        self.users = max(users, owners)
+        self.owners = owners
+        self.comments_per_expense = comments_per_expense
+        self.reactions_per_expense = reactions_per_expense
+        self.activity = activity
+        self.seed = seed
+        self.prefix = prefix
+
+    @classmethod
+    def preset(cls, name: str, **overrides) -> "DatasetSpec":
+        return cls(**{**PRESETS[name], **overrides})
+
+    def user_ids(self) -> List[str]:
+        return [f"{self.prefix}-user-{i}" for i in range(self.users)]
+
+    def owner_ids(self) -> List[str]:
+        return self.user_ids()[:self.owners]
+
+
+def fx_rate(ccy: str, home: str) -> float:
+    return round(RATES_TO_USD.get(ccy, 1.0) / RATES_TO_USD.get(home, 1.0), 6)
+
+
+def _count(rng: random.Random, mean: float) -> int:
+    """Non-negative count with the given mean"""
+    whole = int(mean)
+    return whole + (1 if rng.random() < mean - whole else 0)
+
+
+# Statements target the Table rather than the mapped class: the ORM bulk path
+# splices RETURNING batches back together in quadratic time
+def _insert_returning_ids(db: Session, model, rows: List[Dict]) -> List[int]:
+    if not rows:
+        return []
+    table = model.__table__
+    return db.execute(insert(table).returning(table.c.id, sort_by_parameter_order=True), rows).scalars().all()
+
+
+def _insert(db: Session, model, rows: List[Dict]):
+    if rows:
+        db.execute(insert(model.__table__), rows)
+
+
+def ensure_users(db: Session, spec: DatasetSpec) -> int:
+    """Insert the spec's user profiles that don't exist yet"""
+    wanted = spec.user_ids()
+    existing = set(db.execute(
+        select(models.UserProfile.id).where(models.UserProfile.id.in_(wanted))
+    ).scalars())
+    now = datetime(2024, 1, 1)
+    rows = [{"id": uid, "email": f"{uid}@example.test", "display_name": f"User {i}",
+             "created_at": now, "updated_at": now} for i, uid in enumerate(wanted) if uid not in existing]
+    _insert(db, models.UserProfile, rows)
+    return len(rows)
+
+
+class _TripPlan:
+    """Rows for one trip, generated before ids are known"""
+
+    def __init__(self, spec: DatasetSpec, index: int):
+        rng = random.Random(f"{spec.seed}:{index}")
+        users = spec.user_ids()
+        self.owner = users[index % spec.owners]
+        self.home = spec.currencies[0] if rng.random() < 0.8 else rng.choice(spec.currencies)
+        self.start = date(2024, 1, 1) + timedelta(days=rng.randint(0, 700))
+        self.days = rng.randint(3, 21)
+        self.trip = {
+            "owner_sub": self.owner, "title": f"Trip {index}", "home_currency": self.home,
+            "start_date": self.start, "end_date": self.start + timedelta(days=self.days - 1),
+            "total_budget": rng.choice([None, 1000, 2500, 5000, 10000]),
+            "per_diem_budget": rng.choice([None, 100, 150, 250]),
+            "destination": rng.choice([None, "Tokyo", "Lisbon", "Mexico City", "Bangkok", "Reykjavik"]),
+        }
+        self.participants = [
+            {"display_name": f"P{i}", "weight": rng.choice(WEIGHTS)}
+            for i in range(rng.randint(*spec.participants))
+        ]
+        others = [u for u in users if u != self.owner]
+        self.members = rng.sample(others, min(len(others), rng.randint(*spec.members)))
+        self.people = [self.owner] + self.members
+
+        kinds, mix = list(spec.split_mix), list(spec.split_mix.values())
+        foreign = [c for c in spec.currencies if c != self.home]
+        self.expenses = []
+        for _ in range(rng.randint(*spec.expenses)):
+            ccy = rng.choice(foreign) if foreign and rng.random() < spec.foreign_share else self.home
+            # Splits reference participants by position until ids exist
+            kind = rng.choices(kinds, mix)[0]
+            listed = [] if kind == "none" else rng.sample(range(len(self.participants)),
+                                                         rng.randint(1, len(self.participants)))
+            splits = [(pos, kind, round(rng.uniform(0.5, 10), 2) if kind == "custom" else None) for pos in listed]
+            comments = [(rng.choice(self.people), rng.randint(0, self.days * 24 * 60))
+                        for _ in range(_count(rng, spec.comments_per_expense))]
+            reactors = rng.sample(self.people, min(len(self.people), _count(rng, spec.reactions_per_expense)))
+            self.expenses.append({
+                "row": {
+                    "payer": rng.randrange(len(self.participants)),
+                    "dt": self.start + timedelta(days=rng.randrange(self.days)),
+                    "amount": round(rng.uniform(3, 400), 2), "currency": ccy,
+                    "category": rng.choice(CATEGORIES), "note": None,
+                    "merchant_name": rng.choice([None, "Cafe", "Metro", "Hotel", "Market", "Museum"]),
+                    "fx_rate_to_home": fx_rate(ccy, self.home) if ccy != self.home else None,
+                },
+                "splits": splits,
+                "comments": comments,
+                "reactions": [(user, rng.choice(EMOJIS)) for user in reactors],
+            })
+        self.activity = [(rng.choice(self.people), rng.choice(["expense_added", "comment_added", "reaction_added",
+                                                               "member_joined"]),
+                          rng.randrange(len(self.expenses)) if self.expenses else None,
+                          rng.randint(0, self.days * 24 * 60))
+                         for _ in range(rng.randint(*spec.activity))]
+
+    def at(self, minutes: int) -> datetime:
+        return datetime.combine(self.start, datetime.min.time()) + timedelta(minutes=minutes)
+
+
+def _write_trips(db: Session, plans: List[_TripPlan], totals: Dict[str, int]) -> List[int]:
+    trip_ids = _insert_returning_ids(db, models.Trip, [p.trip for p in plans])
+
+    participant_ids = iter(_insert_returning_ids(db, models.Participant, [
+        {"trip_id": tid, **row} for tid, p in zip(trip_ids, plans) for row in p.participants
+    ]))
+    people = [[next(participant_ids) for _ in p.participants] for p in plans]
+
+    expense_ids = iter(_insert_returning_ids(db, models.Expense, [
+        {"trip_id": tid, "payer_id": pids[e["row"]["payer"]],
+         **{k: v for k, v in e["row"].items() if k != "payer"}}
+        for tid, p, pids in zip(trip_ids, plans, people) for e in p.expenses
+    ]))
+
+    splits, comments, reactions, members, activity, balances, summaries = [], [], [], [], [], [], []
+    for tid, p, pids in zip(trip_ids, plans, people):
+        weights = {pid: row["weight"] for pid, row in zip(pids, p.participants)}
+        net = {pid: 0 for pid in pids}
+        ids = []
+        for e in p.expenses:
+            eid = next(expense_ids)
+            ids.append(eid)
+            split_rows = [{"expense_id": eid, "participant_id": pids[pos], "share_type": kind, "share_value": value}
+                          for pos, kind, value in e["splits"]]
+            splits.extend(split_rows)
+            row = e["row"]
+            for pid, delta in ledger.expense_deltas(row["amount"], row["fx_rate_to_home"], pids[row["payer"]],
+                                                    [SimpleNamespace(**s) for s in split_rows], weights).items():
+                net[pid] += delta
+            for user, minutes in e["comments"]:
+                at = p.at(minutes)
+                comments.append({"expense_id": eid, "user_id": user, "content": "Looks right",
+                                 "created_at": at, "updated_at": at})
+            reactions.extend({"expense_id": eid, "user_id": user, "emoji": emoji, "created_at": p.at(0)}
+                             for user, emoji in e["reactions"])
+        balances.extend({"trip_id": tid, "participant_id": pid, "net_cents": cents} for pid, cents in net.items())
+        summaries.append({
+            "trip_id": tid, "participant_count": len(pids), "expense_count": len(ids),
+            "total_spent_cents": sum(expense_total_cents(e["row"]["amount"], e["row"]["fx_rate_to_home"])
+                                     for e in p.expenses),
+            "last_activity_at": max((p.at(minutes) for _, _, _, minutes in p.activity), default=None),
+        })
+        members.extend({"trip_id": tid, "user_id": user, "role": "member", "invite_status": "accepted",
+                        "joined_at": p.at(0)} for user in p.members)
+        activity.extend({"trip_id": tid, "user_id": user, "action_type": action,
+                         "action_metadata": {"expense_id": ids[pos]} if pos is not None and action != "member_joined" else None,
+                         "created_at": p.at(minutes)}
+                        for user, action, pos, minutes in p.activity)
+
+    for model, rows, key in ((models.ExpenseSplit, splits, "splits"), (models.Comment, comments, "comments"),
+                             (models.Reaction, reactions, "reactions"), (models.TripMember, members, "members"),
+                             (models.ActivityLog, activity, "activity"), (models.TripBalance, balances, None),
+                             (models.TripSummary, summaries, None)):
+        _insert(db, model, rows)
+        if key:
+            totals[key] += len(rows)
+    totals["trips"] += len(plans)
+    totals["participants"] += sum(len(p.participants) for p in plans)
+    totals["expenses"] += sum(len(p.expenses) for p in plans)
+    return trip_ids
+
+
+def generate_dataset(db: Session, spec: DatasetSpec, batch_expenses: int = 20000,
+                     progress: Optional[Callable[[Dict[str, int]], None]] = None) -> Dict:
+    """
+    Insert a dataset and commit every ~batch_expenses expenses. Returns row
+    counts plus the generated trip ids and owner subs.
+    """
+    totals = dict.fromkeys(["users", "trips", "participants", "expenses", "splits", "members",
+                            "comments", "reactions", "activity"], 0)
+    totals["users"] = ensure_users(db, spec)
+    db.commit()
+
+    trip_ids, batch, batch_size = [], [], 0
+    for index in range(spec.trips):
+        plan = _TripPlan(spec, index)
+        batch.append(plan)
+        batch_size += len(plan.expenses)
+        if batch_size >= batch_expenses or index == spec.trips - 1:
+            trip_ids.extend(_write_trips(db, batch, totals))
+            db.commit()
+            batch, batch_size = [], 0
+            if progress:
+                progress(totals)
+    return {**totals, "trip_ids": trip_ids, "owners": spec.owner_ids()}
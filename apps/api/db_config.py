@@ -0,0 +1,128 @@
+"""
+Engine configuration.
+
+Builds the sync and async engines from environment settings: pool sizing and
+recycling, a disconnect check that only pings connections that sat idle in the
+pool (instead of pre-pinging every checkout), SQLite WAL mode and pragmas, and
+psycopg's prepared-statement threshold alongside SQLAlchemy's compiled-statement
+cache.
+"""
+import os
+import time
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import Engine, make_url
+
+# QueuePool sizing (ignored for in-memory SQLite)
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+# Close connections older than this many seconds (-1 disables); keep under the server/proxy idle timeout
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))
+# Ping a connection on checkout only if it sat idle for longer than this (seconds)
+DB_PING_IDLE_S = float(os.environ.get("DB_PING_IDLE_S", "30"))
+# SQLAlchemy compiled-statement cache entries per engine
+DB_QUERY_CACHE_SIZE = int(os.environ.get("DB_QUERY_CACHE_SIZE", "1200"))
+# psycopg prepares a statement server-side after this many executions ("off" for
+# PgBouncer in transaction mode, which can't keep prepared statements)
+DB_PREPARE_THRESHOLD = os.environ.get("DB_PREPARE_THRESHOLD", "5")
+
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": "5000",
+    "cache_size": "-20000",  # KiB
+    "temp_store": "MEMORY",
+    "mmap_size": str(128 * 1024 * 1024),
+}
+
+_CHECKED_IN_AT = "checked_in_at"
+
+
+def _is_memory_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def engine_options(url: str) -> dict:
+    """create_engine / create_async_engine keyword arguments for a database URL"""
+    u = make_url(url)
+    options = {"query_cache_size": DB_QUERY_CACHE_SIZE}
+    connect_args = {}
+
+    if u.get_backend_name() == "sqlite":
+        # Sessions are created and used on different threadpool threads
+        connect_args["check_same_thread"] = False
+    elif u.get_backend_name() == "postgresql" and u.get_driver_name() == "psycopg":
+        connect_args["prepare_threshold"] = None if DB_PREPARE_THRESHOLD.lower() == "off" else int(DB_PREPARE_THRESHOLD)
+
+    if not _is_memory_sqlite(u):
+        options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW,
+                       pool_timeout=DB_POOL_TIMEOUT, pool_recycle=DB_POOL_RECYCLE)
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+
+def install_sqlite_pragmas(engine: Engine):
+    memory = _is_memory_sqlite(engine.url)
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            if memory and name in ("journal_mode", "mmap_size"):
+                continue
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def install_disconnect_handler(engine: Engine, ping_idle_s: float = DB_PING_IDLE_S):
+    """
+    Replace pool_pre_ping: connections that were idle less than ping_idle_s are
+    handed out without a round trip; older ones get a `SELECT 1`, and a failure
+    raises DisconnectionError so the pool discards it and retries with a fresh
+    connection. Disconnects that still surface mid-query invalidate the whole
+    pool (SQLAlchemy's default), so one failed request flushes a restarted server.
+    """
+
+    @event.listens_for(engine, "checkin")
+    def _mark_idle(dbapi_connection, connection_record):
+        connection_record.info[_CHECKED_IN_AT] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def _ping_if_idle(dbapi_connection, connection_record, connection_proxy):
+        checked_in_at = connection_record.info.get(_CHECKED_IN_AT)
+        if checked_in_at is None or time.monotonic() - checked_in_at < ping_idle_s:
+            return
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("SELECT 1")
+        except Exception as e:
+            raise exc.DisconnectionError(f"Stale pooled connection: {e}") from e
+        finally:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+
+
+def configure_engine(engine: Engine) -> Engine:
+    if engine.url.get_backend_name() == "sqlite":
+        install_sqlite_pragmas(engine)
+    install_disconnect_handler(engine)
+    return engine
+
+
+def build_engine(url: str) -> Engine:
+    return configure_engine(create_engine(url, **engine_options(url)))
+
+
+def build_async_engine(url: str):
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+    options = engine_options(url)
+    if "pool_size" in options:
+        # aiosqlite defaults to NullPool, which opens a connection (and thread) per checkout
+        options["poolclass"] = AsyncAdaptedQueuePool
+    async_engine = create_async_engine(url, **options)
+    configure_engine(async_engine.sync_engine)
+    return async_engine
@@ -0,0 +1,86 @@
+"""
+Comments and reactions of many expenses at once.
+
+Expense lists embed per-expense comment counts and reaction tallies from two
+grouped aggregates over the whole page, and GET /trips/{trip_id}/engagement
+returns the comments and reactions themselves for a batch of expenses, one IN
+query each, instead of a comments and a reactions request (each with its own
+access check) per expense card.
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session, joinedload
+import models
+import schemas
+
+
+def _scope(query, model, trip_id: int, expense_ids: Optional[Iterable[int]]):
+    if expense_ids is not None:
+        return query.filter(model.expense_id.in_(list(expense_ids)))
+    # Whole trip: join rather than send every id
+    return query.join(models.Expense, models.Expense.id == model.expense_id).filter(models.Expense.trip_id == trip_id)
+
+
+def empty_engagement() -> schemas.ExpenseEngagement:
+    # Every field passed explicitly: list routes serialize with exclude_unset
+    return schemas.ExpenseEngagement(comment_count=0, reactions={}, viewer_reactions=[])
+
+
+def engagement_counts(db: Session, trip_id: int, user_sub: str,
+                      expense_ids: Optional[Iterable[int]] = None) -> Dict[int, schemas.ExpenseEngagement]:
+    """
+    ExpenseEngagement per expense of a trip (all of them, or just expense_ids),
+    with the emojis user_sub reacted with. Expenses without any are absent.
+    """
+    if expense_ids is not None:
+        expense_ids = list(expense_ids)
+        if not expense_ids:
+            return {}
+    result: Dict[int, schemas.ExpenseEngagement] = defaultdict(empty_engagement)
+
+    comments = db.query(models.Comment.expense_id, func.count(models.Comment.id))
+    for expense_id, n in _scope(comments, models.Comment, trip_id, expense_ids).group_by(models.Comment.expense_id):
+        result[expense_id].comment_count = n
+
+    reaction = models.Reaction
+    reactions = db.query(
+        reaction.expense_id, reaction.emoji, func.count(reaction.id),
+        func.max(case((reaction.user_id == user_sub, 1), else_=0)),
+    )
+    for expense_id, emoji, n, mine in _scope(reactions, reaction, trip_id, expense_ids).group_by(
+        reaction.expense_id, reaction.emoji
+    ):
+        tally = result[expense_id]
+        tally.reactions[emoji] = n
+        if mine:
+            tally.viewer_reactions.append(emoji)
+    return dict(result)
+
+
+def expense_threads(db: Session, trip_id: int, expense_ids: Iterable[int]) -> List[schemas.ExpenseThreadOut]:
+    """
+    Comments (oldest first) and reactions with their authors for the given
+    expenses, in the order asked. Ids that aren't expenses of the trip are
+    left out, so callers only need access to the trip.
+    """
+    expense_ids = list(dict.fromkeys(expense_ids))
+    if not expense_ids:
+        return []
+    known = {eid for (eid,) in db.query(models.Expense.id).filter(
+        models.Expense.trip_id == trip_id, models.Expense.id.in_(expense_ids)
+    )}
+    threads = {eid: schemas.ExpenseThreadOut(expense_id=eid) for eid in expense_ids if eid in known}
+    if not threads:
+        return []
+
+    comment, reaction = models.Comment, models.Reaction
+    for c in db.query(comment).filter(comment.expense_id.in_(list(threads))).options(
+        joinedload(comment.user)
+    ).order_by(comment.created_at, comment.id):
+        threads[c.expense_id].comments.append(schemas.CommentOut.model_validate(c, from_attributes=True))
+    for r in db.query(reaction).filter(reaction.expense_id.in_(list(threads))).options(
+        joinedload(reaction.user)
+    ).order_by(reaction.id):
+        threads[r.expense_id].reactions.append(schemas.ReactionOut.model_validate(r, from_attributes=True))
+    return list(threads.values())
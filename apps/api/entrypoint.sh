@@ -4,5 +4,11 @@ set -e
 echo "Running database migrations..."
 alembic upgrade head
 
-echo "Starting application..."
+# SERVER_MODE=prod runs multi-worker gunicorn (see gunicorn.conf.py); dev runs a single reloading uvicorn
+SERVER_MODE="${SERVER_MODE:-$([ "$ENV" = "prod" ] && echo prod || echo dev)}"
+
+echo "Starting application ($SERVER_MODE)..."
+if [ "$SERVER_MODE" = "prod" ]; then
+    exec gunicorn -c gunicorn.conf.py main:app
+fi
 exec uvicorn main:app --host 0.0.0.0 --port 8000 --proxy-headers --forwarded-allow-ips "*" --reload
@@ -0,0 +1,212 @@
+"""
+Bulk expense import.
+
+Parses streamed CSV or NDJSON request bodies record by record, validates each
+record against the trip's participants (loaded once), and inserts expenses and
+splits with executemany in chunks inside a single transaction. Invalid records
+are reported per row instead of failing the whole import.
+"""
+import csv
+import json
+import codecs
+from collections import defaultdict
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+import models
+import schemas
+import ledger
+import trip_summary
+import trip_version
+from utils import expense_total_cents
+
+CHUNK_SIZE = 1000
+
+FORMATS = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/json-lines": "ndjson",
+}
+
+
+def detect_format(content_type: Optional[str], override: Optional[str] = None) -> Optional[str]:
+    if override:
+        return override.lower() if override.lower() in ("csv", "ndjson") else None
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    return FORMATS.get(media_type)
+
+
+async def iter_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode a byte stream into lines (newline kept) without buffering the whole body"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    async for chunk in stream:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line + "\n"
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer
+
+
+async def iter_csv_records(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Dict[str, str]]]:
+    """
+    Yield (row_number, record) from CSV lines. A record is complete once its
+    quote count is even, so quoted fields may span lines.
+    """
+    header = None
+    pending, quotes, row_number = [], 0, 0
+    async for line in lines:
+        pending.append(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            continue
+        text, pending, quotes = "".join(pending), [], 0
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [h.strip() for h in values]
+            continue
+        row_number += 1
+        yield row_number, dict(zip(header, values))
+    if pending and "".join(pending).strip():
+        row_number += 1
+        yield row_number, {"__error__": "Unterminated quoted field"}
+
+
+async def iter_ndjson_records(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Dict]]:
+    row_number = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            record = {"__error__": f"Invalid JSON: {e}"}
+        if not isinstance(record, dict):
+            record = {"__error__": "Each line must be a JSON object"}
+        yield row_number, record
+
+
+def csv_record_to_payload(record: Dict[str, str]) -> Dict:
+    """
+    Map a CSV record onto ExpenseCreate fields. Empty cells are omitted;
+    `receipt_urls` is ';'-separated and `splits` is ';'-separated
+    `participant_id[:share_value]` with an optional `share_type` column.
+    """
+    data = {k: v.strip() for k, v in record.items() if k and v is not None and v.strip() != ""}
+    if "receipt_urls" in data:
+        data["receipt_urls"] = [u.strip() for u in data["receipt_urls"].split(";") if u.strip()]
+    share_type = data.pop("share_type", "equal")
+    if "splits" in data:
+        splits = []
+        for part in data["splits"].split(";"):
+            if not part.strip():
+                continue
+            pid, _, value = part.partition(":")
+            splits.append({"participant_id": pid.strip(), "share_type": share_type,
+                           "share_value": value.strip() or None})
+        data["splits"] = splits
+    return data
+
+
+def format_validation_error(e: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(p) for p in err['loc']) or 'row'}: {err['msg']}" for err in e.errors()
+    )
+
+
+class ExpenseImporter:
+    """Validates and inserts records for one trip; call finish() to post the ledger and commit"""
+
+    def __init__(self, db: Session, trip_id: int, chunk_size: int = CHUNK_SIZE):
+        self.db = db
+        self.trip_id = trip_id
+        self.chunk_size = chunk_size
+        self.weights = ledger.participant_weights(db, trip_id)
+        self.pending: List[schemas.ExpenseCreate] = []
+        self.deltas = defaultdict(int)
+        self.spent_cents = 0
+        self.inserted = 0
+        self.errors: List[schemas.BulkImportError] = []
+        ledger.ensure_trip_ledger(db, trip_id)
+        trip_summary.ensure_trip_summary(db, trip_id)
+
+    @property
+    def chunk_full(self) -> bool:
+        return len(self.pending) >= self.chunk_size
+
+    def add(self, row_number: int, data: Dict):
+        if "__error__" in data:
+            self.errors.append(schemas.BulkImportError(row=row_number, error=data["__error__"]))
+            return
+        try:
+            payload = schemas.ExpenseCreate.model_validate(data)
+        except ValidationError as e:
+            self.errors.append(schemas.BulkImportError(row=row_number, error=format_validation_error(e)))
+            return
+
+        if payload.payer_id not in self.weights:
+            self.errors.append(schemas.BulkImportError(row=row_number, error="Invalid payer for this trip"))
+            return
+        unknown = sorted({s.participant_id for s in payload.splits or []} - set(self.weights))
+        if unknown:
+            self.errors.append(schemas.BulkImportError(
+                row=row_number, error=f"Unknown split participants: {', '.join(map(str, unknown))}"
+            ))
+            return
+        self.pending.append(payload)
+
+    def flush(self):
+        if not self.pending:
+            return
+        rows = [{
+            "trip_id": self.trip_id,
+            "payer_id": p.payer_id,
+            "dt": p.dt,
+            "amount": p.amount,
+            "currency": p.currency.upper(),
+            "category": p.category,
+            "note": p.note,
+            "merchant_name": p.merchant_name,
+            "receipt_urls": p.receipt_urls,
+            "location_text": p.location_text,
+            "lat": p.lat,
+            "lng": p.lng,
+            "fx_rate_to_home": p.fx_rate_to_home,
+        } for p in self.pending]
+        ids = self.db.execute(
+            insert(models.Expense).returning(models.Expense.id, sort_by_parameter_order=True), rows
+        ).scalars().all()
+
+        split_rows = []
+        for expense_id, p in zip(ids, self.pending):
+            for s in p.splits or []:
+                split_rows.append({"expense_id": expense_id, "participant_id": s.participant_id,
+                                   "share_type": s.share_type, "share_value": s.share_value})
+            for pid, delta in ledger.expense_deltas(p.amount, p.fx_rate_to_home, p.payer_id,
+                                                    p.splits, self.weights).items():
+                self.deltas[pid] += delta
+            self.spent_cents += expense_total_cents(p.amount, p.fx_rate_to_home)
+        if split_rows:
+            self.db.execute(insert(models.ExpenseSplit), split_rows)
+
+        self.inserted += len(self.pending)
+        self.pending = []
+
+    def finish(self) -> schemas.BulkImportResult:
+        self.flush()
+        ledger.apply_deltas(self.db, self.trip_id, dict(self.deltas))
+        if self.inserted:
+            trip_summary.apply(self.db, self.trip_id, expenses=self.inserted, spent_cents=self.spent_cents)
+            # Core inserts skip the flush listener
+            trip_version.bump(self.db, [self.trip_id])
+        self.db.commit()
+        return schemas.BulkImportResult(inserted=self.inserted, errors=self.errors)
@@ -0,0 +1,307 @@
+"""
+FX rate service.
+
+Resolves (date, from_ccy, to_ccy) rates through three tiers: an in-memory rate
+graph, the `exchange_rates` table, and the upstream FX API. The graph answers
+inverse and cross rates (through a pivot currency) from whatever pairs are
+cached, and weekend dates from the nearest earlier business day within a
+window; if upstream fails, weekdays fall back the same way. Concurrent misses for
+the same key share one lookup (single-flight), upstream calls for the same
+(date, base) are merged into one request, and a single pooled HTTP client is
+reused for the life of the process. Database work runs in the threadpool so
+the event loop never blocks on a sync Session.
+"""
+import os
+import asyncio
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError
+from database import SessionLocal
+import models
+
+FX_BASE_URL = os.environ.get("FX_BASE_URL", "https://api.exchangerate.host")
+FX_CACHE_DAYS = int(os.environ.get("FX_CACHE_DAYS", "3650"))
+FX_PIVOT_CURRENCIES = [c.strip().upper() for c in os.environ.get("FX_PIVOT_CURRENCIES", "USD,EUR").split(",") if c.strip()]
+FX_FALLBACK_DAYS = int(os.environ.get("FX_FALLBACK_DAYS", "4"))
+FX_TIMEOUT_S = float(os.environ.get("FX_TIMEOUT_S", "10"))
+FX_MAX_CONNECTIONS = int(os.environ.get("FX_MAX_CONNECTIONS", "20"))
+
+RateKey = Tuple[date, str, str]
+RateResult = Tuple[float, bool]  # (rate, cached)
+
+
+class FxUnavailable(Exception):
+    """The upstream API could not provide a rate"""
+
+
+class RateGraph:
+    """
+    In-memory rates per date as a graph: each cached pair adds an edge and its
+    inverse, so any pair reachable in one hop (directly, inverted, or through a
+    shared currency, pivots first) resolves without a lookup. Dates are evicted
+    least-recently-used.
+    """
+
+    def __init__(self, max_dates: int, pivots: List[str]):
+        self.max_dates = max_dates
+        self.pivots = pivots
+        self._dates = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, on: date, from_ccy: str, to_ccy: str, rate: float):
+        if not rate or from_ccy == to_ccy:
+            return
+        with self._lock:
+            edges = self._dates.get(on)
+            if edges is None:
+                edges = self._dates[on] = defaultdict(dict)
+            self._dates.move_to_end(on)
+            edges[from_ccy][to_ccy] = rate
+            edges[to_ccy].setdefault(from_ccy, 1 / rate)  # never shadow a quoted rate
+            while len(self._dates) > self.max_dates:
+                self._dates.popitem(last=False)
+
+    def rate_on(self, on: date, from_ccy: str, to_ccy: str) -> Optional[float]:
+        with self._lock:
+            edges = self._dates.get(on)
+            if edges is None:
+                return None
+            self._dates.move_to_end(on)
+            out = edges.get(from_ccy)
+            if not out:
+                return None
+            if to_ccy in out:
+                return out[to_ccy]
+            for pivot in [p for p in self.pivots if p in out] + [c for c in out if c not in self.pivots]:
+                second = edges.get(pivot, {}).get(to_ccy)
+                if second is not None:
+                    return out[pivot] * second
+        return None
+
+    def resolve(self, on: date, from_ccy: str, to_ccy: str, window_days: int = 0,
+                business_days_only: bool = True) -> Tuple[Optional[float], Optional[date]]:
+        """Rate on `on`, else on the nearest earlier date within window_days; returns (rate, date used)"""
+        for back in range(window_days + 1):
+            day = on - timedelta(days=back)
+            if back and business_days_only and day.weekday() >= 5:
+                continue
+            rate = self.rate_on(day, from_ccy, to_ccy)
+            if rate is not None:
+                return rate, day
+        return None, None
+
+    def clear(self):
+        with self._lock:
+            self._dates.clear()
+
+    def __len__(self):
+        return len(self._dates)
+
+
+def _load_rates_on(dates: List[date]) -> List[Tuple[date, str, str, float]]:
+    db = SessionLocal()
+    try:
+        return [tuple(row) for row in db.query(
+            models.ExchangeRate.date, models.ExchangeRate.from_ccy, models.ExchangeRate.to_ccy, models.ExchangeRate.rate
+        ).filter(models.ExchangeRate.date.in_(dates)).all()]
+    finally:
+        db.close()
+
+
+def _store_rates(rates: Dict[RateKey, float]):
+    db = SessionLocal()
+    try:
+        db.add_all([models.ExchangeRate(date=on, from_ccy=f, to_ccy=t, rate=rate) for (on, f, t), rate in rates.items()])
+        try:
+            db.commit()
+            return
+        except IntegrityError:
+            # Another worker stored some of them first: keep theirs, add the rest
+            db.rollback()
+        rate = models.ExchangeRate
+        stored = set(db.query(rate.date, rate.from_ccy, rate.to_ccy).filter(
+            rate.date.in_({on for on, _, _ in rates})
+        ).all())
+        db.add_all([models.ExchangeRate(date=on, from_ccy=f, to_ccy=t, rate=value)
+                    for (on, f, t), value in rates.items() if (on, f, t) not in stored])
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()  # lost another race; these rates are cached in memory regardless
+    finally:
+        db.close()
+
+
+class FxService:
+    def __init__(self, base_url: str = FX_BASE_URL, cache_days: int = FX_CACHE_DAYS,
+                 pivots: List[str] = FX_PIVOT_CURRENCIES, fallback_days: int = FX_FALLBACK_DAYS,
+                 timeout_s: float = FX_TIMEOUT_S, max_connections: int = FX_MAX_CONNECTIONS):
+        self.base_url = base_url.rstrip("/")
+        self.timeout_s = timeout_s
+        self.max_connections = max_connections
+        self.pivots = pivots
+        self.fallback_days = fallback_days
+        self.graph = RateGraph(cache_days, pivots)
+        self.stats = Counter()
+        self._inflight: Dict[RateKey, asyncio.Future] = {}
+        self._client = None
+        self._client_loop = None
+
+    @property
+    def client(self):
+        import httpx  # imported on first upstream call; keeps API startup light
+        loop = asyncio.get_running_loop()
+        # Connections are bound to the loop that opened them
+        if self._client is None or self._client_loop is not loop:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout_s,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+            )
+            self._client_loop = loop
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def get_rate(self, on: date, from_ccy: str, to_ccy: str) -> RateResult:
+        key = (on, from_ccy.upper(), to_ccy.upper())
+        result = (await self.get_rates([key]))[key]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def get_rates(self, keys: Iterable[RateKey]) -> Dict[RateKey, Union[RateResult, Exception]]:
+        """Resolve many keys at once; failed keys map to their exception"""
+        keys = list(dict.fromkeys((on, f.upper(), t.upper()) for on, f, t in keys))
+        results: Dict[RateKey, Union[RateResult, Exception]] = {}
+
+        # Memory tier, then join lookups already in flight. No awaits until the
+        # remaining keys are registered, so concurrent callers can't double-fetch.
+        waiting, owned = {}, {}
+        loop = asyncio.get_running_loop()
+        for key in keys:
+            if key[1] == key[2]:
+                results[key] = (1.0, True)
+                continue
+            rate, _ = self.graph.resolve(*key, window_days=self._window(key[0]))
+            if rate is not None:
+                self.stats["memory_hits"] += 1
+                results[key] = (rate, True)
+            elif key in self._inflight:
+                self.stats["coalesced"] += 1
+                waiting[key] = self._inflight[key]
+            else:
+                owned[key] = self._inflight[key] = loop.create_future()
+
+        if owned:
+            try:
+                loaded = await self._load(list(owned))
+            except Exception as e:
+                loaded = {key: e for key in owned}
+            except BaseException:
+                # Cancelled owner: fail its lookups so callers that joined them don't wait forever
+                for key, future in owned.items():
+                    if not future.done():
+                        future.set_exception(FxUnavailable(f"FX lookup cancelled for {key[1]}->{key[2]}"))
+                        future.exception()
+                raise
+            finally:
+                for key in owned:
+                    self._inflight.pop(key, None)
+            for key, future in owned.items():
+                outcome = loaded[key]
+                results[key] = outcome
+                if isinstance(outcome, Exception):
+                    future.set_exception(outcome)
+                    future.exception()  # retrieved here; waiters re-raise it themselves
+                else:
+                    future.set_result(outcome)
+
+        for key, future in waiting.items():
+            try:
+                results[key] = await future
+            except Exception as e:
+                results[key] = e
+        return results
+
+    def _window(self, on: date) -> int:
+        # Markets are closed at weekends, so the previous business day's rate is the rate
+        return self.fallback_days if on.weekday() >= 5 else 0
+
+    def _business_day(self, on: date) -> date:
+        # Saturday and Sunday take Friday's rate, when the weekend is inside the fallback window
+        back = on.weekday() - 4 if on.weekday() >= 5 else 0
+        return on - timedelta(days=back) if back <= self.fallback_days else on
+
+    async def _load(self, keys: List[RateKey]) -> Dict[RateKey, Union[RateResult, Exception]]:
+        results: Dict[RateKey, Union[RateResult, Exception]] = {}
+
+        # Pull every stored pair for the candidate dates into the graph, so
+        # stored rows also serve inverse, cross and fallback lookups
+        dates = {on - timedelta(days=back) for on, _, _ in keys for back in range(self.fallback_days + 1)}
+        for on, from_ccy, to_ccy, rate in await run_in_threadpool(_load_rates_on, sorted(dates)):
+            self.graph.add(on, from_ccy, to_ccy, rate)
+        for key in keys:
+            rate, _ = self.graph.resolve(*key, window_days=self._window(key[0]))
+            if rate is not None:
+                self.stats["db_hits"] += 1
+                results[key] = (rate, True)
+
+        # One upstream request per (date, base) covering every wanted symbol,
+        # plus the pivots so later cross rates resolve from memory. Weekend
+        # dates ask for the business day before them, so a Saturday and a
+        # Sunday share one request and the rate stored is the one that applies.
+        groups = defaultdict(list)
+        for key in keys:
+            if key not in results:
+                groups[(self._business_day(key[0]), key[1])].append(key)
+        fetched = await asyncio.gather(*(
+            self._fetch(on, base, list(dict.fromkeys([k[2] for k in group] + [p for p in self.pivots if p != base])))
+            for (on, base), group in groups.items()
+        ), return_exceptions=True)
+
+        to_store = {}
+        for ((on, base), group), outcome in zip(groups.items(), fetched):
+            if not isinstance(outcome, Exception):
+                for symbol, rate in outcome.items():
+                    if rate:
+                        self.graph.add(on, base, symbol, float(rate))
+                        to_store[(on, base, symbol)] = float(rate)
+            for key in group:
+                symbol = key[2]
+                if not isinstance(outcome, Exception) and outcome.get(symbol):
+                    results[key] = (float(outcome[symbol]), False)
+                    continue
+                # Upstream failed or lacks the pair: derive it, or use the nearest earlier business day
+                rate, _ = self.graph.resolve(*key, window_days=self.fallback_days)
+                if rate is not None:
+                    self.stats["fallback_hits"] += 1
+                    results[key] = (rate, True)
+                elif isinstance(outcome, Exception):
+                    results[key] = outcome
+                else:
+                    results[key] = FxUnavailable(f"FX rate not available for {base}->{symbol} on {key[0].isoformat()}")
+        if to_store:
+            await run_in_threadpool(_store_rates, to_store)
+        return results
+
+    async def _fetch(self, on: date, base: str, symbols: List[str]) -> Dict[str, float]:
+        import httpx
+        self.stats["upstream_requests"] += 1
+        try:
+            r = await self.client.get(f"/{on.isoformat()}", params={"base": base, "symbols": ",".join(symbols)})
+            r.raise_for_status()
+            return r.json().get("rates", {}) or {}
+        except (httpx.HTTPError, ValueError) as e:
+            self.stats["upstream_errors"] += 1
+            raise FxUnavailable(f"FX upstream error for {base} on {on.isoformat()}: {e}") from e
+
+
+fx_service = FxService()
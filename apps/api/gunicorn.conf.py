@@ -0,0 +1,57 @@
+"""
+Production server profile: `gunicorn -c gunicorn.conf.py main:app`.
+
+Uvicorn workers on uvloop + httptools, one per available core by default. Each
+worker is recycled after roughly GUNICORN_MAX_REQUESTS requests (jittered so
+they don't all restart at once) to bound memory growth; a recycled worker
+drains its write-behind activity buffer before exiting. With preload the app is
+imported and the schema prepared once in the master; workers fork from it and
+drop the database connections they inherited.
+"""
+import os
+from uvicorn.workers import UvicornWorker
+
+
+def _cpu_count() -> int:
+    # Respect the CPU affinity a container or taskset gives us
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+class ProductionUvicornWorker(UvicornWorker):
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools", "lifespan": "on"}
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY") or _cpu_count())
+worker_class = ProductionUvicornWorker
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", str(max_requests // 10)))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", "5"))
+preload_app = os.environ.get("GUNICORN_PRELOAD", "true").lower() == "true"
+forwarded_allow_ips = os.environ.get("FORWARDED_ALLOW_IPS", "*")
+loglevel = os.environ.get("LOG_LEVEL", "info")
+
+
+def when_ready(server):
+    if not server.cfg.preload_app:
+        return
+    import main
+    from database import dispose_engines
+    main.prepare_schema()
+    dispose_engines()
+
+
+def post_fork(server, worker):
+    from database import dispose_engines
+    dispose_engines(close=False)
+
+
+def worker_exit(server, worker):
+    # Recycled (max_requests) or stopped workers drain buffered activity rows; the
+    # lifespan shutdown normally has already, this covers a worker that skipped it
+    from activity_log import writer
+    writer.close(timeout=graceful_timeout)
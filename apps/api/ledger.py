@@ -0,0 +1,180 @@
+"""
+Per-trip balance ledger.
+
+Net balances are materialized in `trip_balances` as integer cents in the trip's
+home currency. Expense writes apply a delta to the ledger in the same
+transaction, so reading balances is a single indexed query instead of a walk
+over every expense and split. Trips without ledger rows yet are computed on
+read and seeded by their next expense write.
+"""
+import math
+from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
+import models
+from utils import expense_total_cents
+import balance_engine
+import trip_summary
+
+
+def expense_weights(splits: Iterable, participant_weights: Dict[int, float]) -> List[Tuple[int, float]]:
+    """
+    Resolve who shares an expense and with what relative weight.
+
+    Mirrors the split rules: custom share_value fractions win, then participant
+    weights, then equal among listed participants; no splits means equal among
+    all trip participants.
+    """
+    splits = list(splits or [])
+    if not splits:
+        return [(pid, 1.0) for pid in sorted(participant_weights)]
+    if any(s.share_type == "custom" for s in splits):
+        return [(s.participant_id, s.share_value or 0) for s in splits]
+    if any(s.share_type == "weight" for s in splits):
+        return [(s.participant_id, participant_weights.get(s.participant_id, 1.0)) for s in splits]
+    return [(s.participant_id, 1.0) for s in splits]
+
+
+def allocate_cents(total_cents: int, weights: List[Tuple[int, float]]) -> Dict[int, int]:
+    """Split total_cents by weight using largest remainder so the parts sum exactly."""
+    total_w = sum(w for _, w in weights)
+    if not weights or not total_w:
+        return {}
+
+    sign = -1 if total_cents < 0 else 1
+    magnitude = abs(total_cents)
+    parts = []
+    for idx, (pid, w) in enumerate(weights):
+        raw = magnitude * w / total_w
+        parts.append([pid, math.floor(raw), raw - math.floor(raw), idx])
+
+    leftover = magnitude - sum(p[1] for p in parts)
+    for p in sorted(parts, key=lambda p: (-p[2], p[3]))[:max(leftover, 0)]:
+        p[1] += 1
+
+    shares = defaultdict(int)
+    for pid, cents, _, _ in parts:
+        shares[pid] += sign * cents
+    return dict(shares)
+
+
+def expense_deltas(amount, fx_rate_to_home, payer_id: int, splits: Iterable,
+                   participant_weights: Dict[int, float]) -> Dict[int, int]:
+    """Net effect of one expense on each participant, in home-currency cents"""
+    total_cents = expense_total_cents(amount, fx_rate_to_home)
+    deltas = defaultdict(int)
+    deltas[payer_id] += total_cents
+    for pid, share in allocate_cents(total_cents, expense_weights(splits, participant_weights)).items():
+        deltas[pid] -= share
+    return dict(deltas)
+
+
+def participant_weights(db: Session, trip_id: int) -> Dict[int, float]:
+    rows = db.query(models.Participant.id, models.Participant.weight).filter(
+        models.Participant.trip_id == trip_id
+    ).all()
+    return {pid: (weight or 1.0) for pid, weight in rows}
+
+
+def apply_deltas(db: Session, trip_id: int, deltas: Dict[int, int]):
+    """Add deltas to the ledger with relative UPDATEs, inserting missing rows"""
+    for pid, delta in deltas.items():
+        if not delta:
+            continue
+        result = db.execute(
+            update(models.TripBalance)
+            .where(models.TripBalance.trip_id == trip_id, models.TripBalance.participant_id == pid)
+            .values(net_cents=models.TripBalance.net_cents + delta)
+        )
+        if result.rowcount == 0:
+            db.add(models.TripBalance(trip_id=trip_id, participant_id=pid, net_cents=delta))
+            db.flush()
+
+
+def post_expense(db: Session, expense: models.Expense, splits: Iterable, sign: int = 1,
+                 weights: Dict[int, float] = None):
+    """
+    Apply (sign=1) or reverse (sign=-1) an expense's effect on the trip ledger
+    and the trip summary. Does not commit; callers post inside their own transaction.
+    """
+    if weights is None:
+        weights = participant_weights(db, expense.trip_id)
+    deltas = expense_deltas(expense.amount, expense.fx_rate_to_home, expense.payer_id, splits, weights)
+    apply_deltas(db, expense.trip_id, {pid: sign * d for pid, d in deltas.items()})
+    trip_summary.apply(db, expense.trip_id, expenses=sign,
+                       spent_cents=sign * expense_total_cents(expense.amount, expense.fx_rate_to_home))
+
+
+def recompute_trip_balances(db: Session, trip_id: int) -> Dict[int, int]:
+    """
+    Full recompute of a trip's balances in cents from expenses and splits.
+    Reference implementation for balance_engine (see scripts/check_balance_engine.py).
+    """
+    weights = participant_weights(db, trip_id)
+    balances = {pid: 0 for pid in weights}
+    expenses = db.query(models.Expense).options(selectinload(models.Expense.splits)).filter(
+        models.Expense.trip_id == trip_id
+    ).all()
+    for exp in expenses:
+        for pid, delta in expense_deltas(exp.amount, exp.fx_rate_to_home, exp.payer_id, exp.splits, weights).items():
+            balances[pid] = balances.get(pid, 0) + delta
+    return balances
+
+
+def read_trip_balances(db: Session, trip_id: int) -> Dict[int, int]:
+    """Ledger balances in cents for every participant of a trip"""
+    rows = db.query(models.Participant.id, models.TripBalance.net_cents).outerjoin(
+        models.TripBalance,
+        (models.TripBalance.participant_id == models.Participant.id)
+        & (models.TripBalance.trip_id == models.Participant.trip_id)
+    ).filter(models.Participant.trip_id == trip_id).order_by(models.Participant.id).all()
+    return {pid: (cents or 0) for pid, cents in rows}
+
+
+def rebuild_trip_ledger(db: Session, trip_id: int) -> Dict[int, int]:
+    """Replace a trip's ledger rows with a full recompute. Does not commit."""
+    balances = balance_engine.compute_trip_balances(db, trip_id)
+    db.query(models.TripBalance).filter(models.TripBalance.trip_id == trip_id).delete(synchronize_session=False)
+    db.add_all([
+        models.TripBalance(trip_id=trip_id, participant_id=pid, net_cents=cents)
+        for pid, cents in balances.items()
+    ])
+    db.flush()
+    return balances
+
+
+def _seeded(db: Session, trip_id: int) -> bool:
+    return db.query(models.TripBalance.id).filter(models.TripBalance.trip_id == trip_id).first() is not None
+
+
+def ensure_trip_ledger(db: Session, trip_id: int):
+    """
+    Seed the ledger for trips that predate it (or were bulk-seeded) before
+    posting deltas onto it. Does not commit. A concurrent request seeding the
+    same trip first wins; the loser keeps its transaction and uses those rows.
+    """
+    if _seeded(db, trip_id):
+        return
+    try:
+        with db.begin_nested():
+            rebuild_trip_ledger(db, trip_id)
+    except IntegrityError:
+        # uq_trip_balance_participant: the other transaction's rows are committed now
+        pass
+
+
+def current_trip_balances(db: Session, trip_id: int) -> Dict[int, int]:
+    """
+    Balances in cents for every participant: from the ledger, or for trips it
+    hasn't been seeded for, computed on the fly. Never writes, so reads can't
+    race each other into seeding; the first expense write seeds instead.
+    """
+    if _seeded(db, trip_id):
+        return read_trip_balances(db, trip_id)
+    computed = balance_engine.compute_trip_balances(db, trip_id)
+    participants = db.query(models.Participant.id).filter(
+        models.Participant.trip_id == trip_id
+    ).order_by(models.Participant.id)
+    return {pid: computed.get(pid, 0) for (pid,) in participants}
@@ -1,33 +1,74 @@
 import os
-from fastapi import FastAPI
+import importlib
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from database import Base, engine
-from routers import (
-    trips,
-    participants,
-    itinerary,
-    expenses,
-    balances,
-    exchange,
-    analytics,
-    accommodations,
-    category_budgets,
-    settlements,
-    users,
-    members,
-    invites,
-    activity,
-    comments,
-    reactions
-)
+from fastapi.responses import PlainTextResponse
+from database import Base, engine, DATABASE_REPLICA_URL, LAST_WRITE_HEADER, ReadYourWritesMiddleware
+from fx import fx_service
+from query_stats import QUERY_STATS, QueryStatsMiddleware
+import metrics
+import trip_version
+import activity_feed
+import activity_log
 
 ENV = os.environ.get("ENV", "local")
 CORS_ORIGINS = [o.strip() for o in os.environ.get("CORS_ORIGINS", "http://localhost:3000").split(",")]
 
-# Create tables (Alembic recommended for prod; this helps in dev)
-Base.metadata.create_all(bind=engine)
+# "alembic": schema belongs to migrations (entrypoint.sh runs `alembic upgrade head`);
+# startup only checks the revision. "create_all": create missing tables (dev, SQLite). "none": neither.
+SCHEMA_MANAGEMENT = os.environ.get("SCHEMA_MANAGEMENT", "alembic" if ENV == "prod" else "create_all")
+
+ROUTERS = (
+    "trips",
+    "participants",
+    "itinerary",
+    "expenses",
+    "balances",
+    "exchange",
+    "analytics",
+    "accommodations",
+    "category_budgets",
+    "settlements",
+    # Multi-user collaboration routers
+    "users",
+    "members",
+    "invites",
+    "activity",
+    "comments",
+    "reactions",
+    "engagement",
+)
+# Comma-separated subset to import and mount, e.g. for a worker that only serves reads
+ENABLED_ROUTERS = [r.strip() for r in os.environ.get("ENABLED_ROUTERS", "").split(",") if r.strip()] or list(ROUTERS)
+
+_schema_prepared = False
 
-app = FastAPI(title="Travel Tracker API", version="0.1.0")
+def prepare_schema():
+    # Under `gunicorn --preload` the master runs this once and forked workers inherit the flag
+    global _schema_prepared
+    if _schema_prepared:
+        return
+    if SCHEMA_MANAGEMENT == "alembic":
+        from schema_version import check_schema_version
+        check_schema_version(engine)
+    elif SCHEMA_MANAGEMENT == "create_all":
+        import models  # register every table, whichever routers are enabled
+        Base.metadata.create_all(bind=engine)
+    _schema_prepared = True
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await run_in_threadpool(prepare_schema)
+    yield
+    # Write buffered activity (ACTIVITY_LOG_MODE=async) before the process exits
+    await run_in_threadpool(activity_log.writer.close)
+    # Release pooled upstream connections
+    await fx_service.aclose()
+    await activity_feed.broker.aclose()
+
+app = FastAPI(title="Travel Tracker API", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -35,26 +76,28 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Server-Timing", "ETag", LAST_WRITE_HEADER],
 )
 
-app.include_router(trips.router)
-app.include_router(participants.router)
-app.include_router(itinerary.router)
-app.include_router(expenses.router)
-app.include_router(balances.router)
-app.include_router(exchange.router)
-app.include_router(analytics.router)
-app.include_router(accommodations.router)
-app.include_router(category_budgets.router)
-app.include_router(settlements.router)
+# Every Session bumps trip versions on flush and publishes committed activity, whichever routers are enabled
+trip_version.install()
+activity_feed.install()
+activity_log.install()
 
-# Multi-user collaboration routers
-app.include_router(users.router)
-app.include_router(members.router)
-app.include_router(invites.router)
-app.include_router(activity.router)
-app.include_router(comments.router)
-app.include_router(reactions.router)
+if DATABASE_REPLICA_URL:
+    app.add_middleware(ReadYourWritesMiddleware)
+if QUERY_STATS:
+    app.add_middleware(QueryStatsMiddleware)
+if metrics.METRICS:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+# Enabled routers are imported here, while main itself is imported; nothing is
+# deferred to first use. The saving is that disabled routers (and whatever only
+# they import) are never loaded, on top of create_all and httpx being off this path.
+for name in ENABLED_ROUTERS:
+    if name not in ROUTERS:
+        raise RuntimeError(f"Unknown router in ENABLED_ROUTERS: {name}")
+    app.include_router(importlib.import_module(f"routers.{name}").router)
 
 @app.get("/")
 def root():
@@ -68,3 +111,9 @@ def root():
 @app.get("/health")
 def health():
     return {"status": "ok", "env": ENV}
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    if not metrics.METRICS:
+        raise HTTPException(404, "Metrics are disabled")
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,270 @@
+"""
+In-process Prometheus metrics, rendered in the text exposition format at /metrics.
+
+Counters, gauges and histograms are plain locked dicts keyed by label values, so
+there is no client library or push gateway. Request latency and in-flight
+requests come from MetricsMiddleware; DB pool and FX cache figures are read from
+their owners at scrape time. Each process keeps its own registry: under gunicorn
+a scrape reflects whichever worker answered it.
+"""
+import os
+import time
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+METRICS = os.environ.get("METRICS", "true").lower() == "true"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+
+
+class _Value(_Metric):
+    """Counter/gauge storage; `collect` computes (labels, value) pairs at scrape time instead"""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (),
+                 collect: Optional[Callable[[], Iterable[Tuple[Labels, float]]]] = None):
+        super().__init__(name, help, labels)
+        self._values: Dict[Labels, float] = {}
+        self._collect = collect
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        if self._collect is not None:
+            items = sorted(self._collect())
+        else:
+            with self._lock:
+                items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.label_names, k)} {_format_value(v)}"
+                                for k, v in items]
+
+
+class Counter(_Value):
+    type = "counter"
+
+
+class Gauge(_Value):
+    type = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # labels -> [per-bucket counts, sum, count]
+        self._values: Dict[Labels, list] = {}
+
+    def observe(self, value: float, *labels: str):
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def time(self, *labels: str):
+        return _Timer(self, labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._values.items())
+        lines = self.header()
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {count}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.t0, *self.labels)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route template and status", ["method", "route", "status"]))
+http_latency = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ["method", "route"]))
+http_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled"))
+http_in_flight.set(0)
+settlement_solver_seconds = registry.register(Histogram(
+    "settlement_solver_seconds", "Time spent in the settlement solver", ["algorithm"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)))
+
+
+def _engines():
+    import database
+    yield "primary", database.engine
+    if database.replica_engine is not None:
+        yield "replica", database.replica_engine
+    if database.AsyncSessionLocal is not None:
+        yield "async_primary", database.AsyncSessionLocal.kw["bind"].sync_engine
+    if database.AsyncReplicaSessionLocal is not None:
+        yield "async_replica", database.AsyncReplicaSessionLocal.kw["bind"].sync_engine
+
+
+def _pool_stat(method: str):
+    def collect():
+        for name, engine in _engines():
+            fn = getattr(engine.pool, method, None)
+            if fn is not None:
+                yield (name,), fn()
+    return collect
+
+
+for _method, _help in (("checkedout", "Connections checked out of the pool"),
+                       ("checkedin", "Idle connections in the pool"),
+                       ("overflow", "Connections beyond pool_size (negative while the pool is filling)"),
+                       ("size", "Configured pool_size")):
+    registry.register(Gauge(f"db_pool_{_method}", _help, ["engine"], collect=_pool_stat(_method)))
+
+
+FX_EVENTS = ("memory_hits", "db_hits", "fallback_hits", "coalesced", "upstream_requests", "upstream_errors")
+
+
+def _fx_events():
+    from fx import fx_service
+    stats = fx_service.stats
+    return [((event,), stats[event]) for event in sorted(set(FX_EVENTS) | set(stats))]
+
+
+registry.register(Counter(
+    "fx_events_total", "FX rate service events: memory/db/fallback hits, coalesced lookups, "
+    "upstream requests and errors", ["event"], collect=_fx_events))
+
+
+def _activity_streams():
+    from activity_feed import broker
+    return [((), broker.subscriber_count())]
+
+
+registry.register(Gauge(
+    "activity_streams_open", "Open live activity streams in this process", collect=_activity_streams))
+
+
+ACTIVITY_LOG_EVENTS = ("queued", "written", "batches", "waits", "dropped")
+
+
+def _activity_log_events():
+    from activity_log import writer
+    return [((event,), writer.stats[event]) for event in ACTIVITY_LOG_EVENTS]
+
+
+def _activity_log_pending():
+    from activity_log import writer
+    return [((), writer.pending())]
+
+
+registry.register(Counter(
+    "activity_log_events_total", "Write-behind activity log events: queued, written, batches, "
+    "waits on a full buffer and dropped after failed writes", ["event"], collect=_activity_log_events))
+registry.register(Gauge(
+    "activity_log_pending", "Activity events buffered and not yet written", collect=_activity_log_pending))
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and in-flight count per route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_in_flight.inc()
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - t0
+            http_in_flight.dec()
+            # Templates, not raw paths, keep label cardinality bounded
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            http_latency.observe(elapsed, scope["method"], route)
+            http_requests.inc(scope["method"], route, str(status))
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Enum, Text, Numeric, UniqueConstraint, Boolean, ARRAY, JSON
+from sqlalchemy import Column, Integer, BigInteger, String, Float, Date, DateTime, ForeignKey, Enum, Text, Numeric, UniqueConstraint, Index, Boolean, ARRAY, JSON
 from sqlalchemy.orm import relationship
 from database import Base
 import enum
@@ -34,6 +34,8 @@ class Trip(Base):
     total_budget = Column(Numeric(12,2), nullable=True)
     per_diem_budget = Column(Numeric(12,2), nullable=True)
     destination = Column(String, nullable=True)
+    # Bumped by every write under the trip (trip_version.py); drives ETags
+    version = Column(BigInteger, nullable=False, default=1, server_default="1")
 
     participants = relationship("Participant", back_populates="trip", cascade="all, delete-orphan")
     itinerary_items = relationship("ItineraryItem", back_populates="trip", cascade="all, delete-orphan")
@@ -45,6 +47,8 @@ class Trip(Base):
     members = relationship("TripMember", back_populates="trip", cascade="all, delete-orphan")
     invites = relationship("TripInvite", back_populates="trip", cascade="all, delete-orphan")
     activities = relationship("ActivityLog", back_populates="trip", cascade="all, delete-orphan")
+    balances = relationship("TripBalance", back_populates="trip", cascade="all, delete-orphan")
+    summary = relationship("TripSummary", back_populates="trip", uselist=False, cascade="all, delete-orphan")
 
 class Participant(Base):
     __tablename__ = "participants"
@@ -92,11 +96,14 @@ class Expense(Base):
 
     trip = relationship("Trip", back_populates="expenses")
     payer = relationship("Participant", back_populates="pays")
-    splits = relationship("ExpenseSplit", back_populates="expense", cascade="all, delete-orphan")
+    splits = relationship("ExpenseSplit", back_populates="expense", cascade="all, delete-orphan", order_by="ExpenseSplit.id")
     # Multi-user relationships
     comments = relationship("Comment", back_populates="expense", cascade="all, delete-orphan")
     reactions = relationship("Reaction", back_populates="expense", cascade="all, delete-orphan")
 
+    # Keyset pagination of a trip's expenses by (dt, id)
+    __table_args__ = (Index('ix_expenses_trip_dt_id', 'trip_id', 'dt', 'id'),)
+
 class ExpenseSplit(Base):
     __tablename__ = "expense_splits"
     id = Column(Integer, primary_key=True, index=True)
@@ -108,6 +115,28 @@ class ExpenseSplit(Base):
     expense = relationship("Expense", back_populates="splits")
     participant = relationship("Participant", back_populates="splits")
 
+class TripBalance(Base):
+    """Materialized net balance per participant, in home-currency cents"""
+    __tablename__ = "trip_balances"
+    id = Column(Integer, primary_key=True, index=True)
+    trip_id = Column(Integer, ForeignKey("trips.id", ondelete="CASCADE"), nullable=False, index=True)
+    participant_id = Column(Integer, ForeignKey("participants.id", ondelete="CASCADE"), nullable=False)
+    net_cents = Column(BigInteger, nullable=False, default=0)  # positive = should receive
+
+    trip = relationship("Trip", back_populates="balances")
+    __table_args__ = (UniqueConstraint('trip_id', 'participant_id', name='uq_trip_balance_participant'),)
+
+class TripSummary(Base):
+    """Denormalized per-trip figures for the trips list, kept up to date by writes"""
+    __tablename__ = "trip_summaries"
+    trip_id = Column(Integer, ForeignKey("trips.id", ondelete="CASCADE"), primary_key=True)
+    participant_count = Column(Integer, nullable=False, default=0)
+    expense_count = Column(Integer, nullable=False, default=0)
+    total_spent_cents = Column(BigInteger, nullable=False, default=0)  # home currency
+    last_activity_at = Column(DateTime, nullable=True)
+
+    trip = relationship("Trip", back_populates="summary")
+
 class ExchangeRate(Base):
     __tablename__ = "exchange_rates"
     id = Column(Integer, primary_key=True, index=True)
@@ -223,7 +252,7 @@ class ActivityLog(Base):
     """Activity feed for trips"""
     __tablename__ = "activity_log"
     id = Column(Integer, primary_key=True, index=True)
-    trip_id = Column(Integer, ForeignKey("trips.id", ondelete="CASCADE"), nullable=False, index=True)
+    trip_id = Column(Integer, ForeignKey("trips.id", ondelete="CASCADE"), nullable=False)
     user_id = Column(String, ForeignKey("user_profiles.id"), nullable=False)
     action_type = Column(String, nullable=False)  # expense_added, member_joined, etc.
     action_metadata = Column(JSON, nullable=True)
@@ -233,6 +262,9 @@ class ActivityLog(Base):
     trip = relationship("Trip", back_populates="activities")
     user = relationship("UserProfile", back_populates="activities")
 
+    # Feed order and keyset paging per trip; also serves trip_id lookups
+    __table_args__ = (Index('ix_activity_log_trip_created_id', 'trip_id', created_at.desc(), id.desc()),)
+
 
 class Comment(Base):
     """Comments on expenses"""
@@ -0,0 +1,140 @@
+"""
+Per-request SQL instrumentation.
+
+Cursor-execute listeners on every Engine add each statement's count and time to
+the current request's QueryStats (a context variable, so it follows the request
+into the threadpool and async sessions). The middleware reports the totals and
+the slowest statement in a Server-Timing header and one log line per request,
+logs statements slower than QUERY_SLOW_MS, and warns when one statement repeats
+QUERY_N_PLUS_ONE_THRESHOLD or more times in a request (the N+1 pattern). Costs
+two perf_counter() calls and a dict increment per statement.
+"""
+import os
+import time
+import logging
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("query_stats")
+
+QUERY_STATS = os.environ.get("QUERY_STATS", "true").lower() == "true"
+# Adds the Server-Timing header; turn off to keep DB timings out of public responses
+QUERY_STATS_HEADER = os.environ.get("QUERY_STATS_HEADER", "true").lower() == "true"
+QUERY_SLOW_MS = float(os.environ.get("QUERY_SLOW_MS", "200"))
+# Repeats of one statement within a request that trigger an N+1 warning (0 = off)
+QUERY_N_PLUS_ONE_THRESHOLD = int(os.environ.get("QUERY_N_PLUS_ONE_THRESHOLD", "10"))
+
+_current: ContextVar[Optional["QueryStats"]] = ContextVar("query_stats", default=None)
+
+
+class QueryStats:
+    """Statements issued while handling one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_s = 0.0
+        self.slowest_s = 0.0
+        self.slowest_statement: Optional[str] = None
+        self.statements = Counter()
+
+    def record(self, statement: str, elapsed_s: float):
+        self.count += 1
+        self.total_s += elapsed_s
+        self.statements[statement] += 1
+        if elapsed_s > self.slowest_s:
+            self.slowest_s = elapsed_s
+            self.slowest_statement = statement
+
+    def repeated(self, threshold: int):
+        """(statement, count) for statements run at least `threshold` times"""
+        return [(s, n) for s, n in self.statements.most_common() if n >= threshold] if threshold > 0 else []
+
+    def server_timing(self) -> str:
+        return (f'db;dur={self.total_s * 1000:.1f};desc="{self.count} queries", '
+                f"db-slowest;dur={self.slowest_s * 1000:.1f}")
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _current.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _current.get() is not None:
+        context._query_stats_t0 = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    t0 = getattr(context, "_query_stats_t0", None)
+    if stats is None or t0 is None:
+        return
+    elapsed = time.perf_counter() - t0
+    stats.record(statement, elapsed)
+    if elapsed * 1000 >= QUERY_SLOW_MS:
+        logger.warning("slow_query ms=%.1f statement=%r", elapsed * 1000, _shorten(statement))
+
+
+def _shorten(statement: str, limit: int = 500) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= limit else statement[:limit] + "…"
+
+
+def install():
+    """Listen on every Engine (sync, replica and the async engines' sync side)"""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class QueryStatsMiddleware:
+    """ASGI middleware reporting each HTTP request's SQL statements"""
+
+    def __init__(self, app, header: bool = QUERY_STATS_HEADER, n_plus_one_threshold: int = QUERY_N_PLUS_ONE_THRESHOLD):
+        self.app = app
+        self.header = header
+        self.n_plus_one_threshold = n_plus_one_threshold
+        install()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.header and stats.count:
+                    # Streaming responses only count statements run before the first byte
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", stats.server_timing().encode("latin-1"))
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            self._report(scope, status, stats)
+
+    def _report(self, scope, status: int, stats: QueryStats):
+        if not stats.count:
+            return
+        route = scope.get("route")
+        path = getattr(route, "path", None) or scope["path"]
+        slowest = _shorten(stats.slowest_statement or "", 200)
+        logger.info(
+            "request method=%s route=%s status=%d queries=%d db_ms=%.1f slowest_ms=%.1f slowest=%r",
+            scope["method"], path, status, stats.count, stats.total_s * 1000, stats.slowest_s * 1000, slowest,
+            extra={"route": path, "status": status, "queries": stats.count, "db_ms": round(stats.total_s * 1000, 1),
+                   "slowest_ms": round(stats.slowest_s * 1000, 1), "slowest_statement": slowest},
+        )
+        for statement, n in stats.repeated(self.n_plus_one_threshold):
+            logger.warning("n_plus_one route=%s repeats=%d statement=%r", path, n, _shorten(statement))
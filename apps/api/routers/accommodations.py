@@ -1,10 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from database import get_db
-from models import Trip, Accommodation
+from models import Accommodation
 from schemas import AccommodationCreate, AccommodationOut
 from auth import get_user_sub
+from access import require_trip_access
 from typing import List
+from trip_version import trip_etag
 
 router = APIRouter()
 
@@ -19,13 +21,7 @@ def create_accommodation(
     Add a new accommodation to a trip.
     """
     # Verify trip ownership
-    trip = db.query(Trip).filter(
-        Trip.id == trip_id,
-        Trip.owner_sub == user_sub
-    ).first()
-
-    if not trip:
-        raise HTTPException(status_code=404, detail="Trip not found")
+    require_trip_access(db, trip_id, user_sub, "owner", status_code=404, detail="Trip not found")
 
     # Calculate total_cost if nightly_rate is provided
     total_cost = accommodation.total_cost
@@ -58,7 +54,7 @@ def create_accommodation(
     return db_accommodation
 
 
-@router.get("/accommodations/{trip_id}", response_model=List[AccommodationOut])
+@router.get("/accommodations/{trip_id}", response_model=List[AccommodationOut], dependencies=[Depends(trip_etag("owner"))])
 def list_accommodations(
     trip_id: int,
     db: Session = Depends(get_db),
@@ -68,13 +64,7 @@ def list_accommodations(
     List all accommodations for a trip, sorted by check-in date.
     """
     # Verify trip ownership
-    trip = db.query(Trip).filter(
-        Trip.id == trip_id,
-        Trip.owner_sub == user_sub
-    ).first()
-
-    if not trip:
-        raise HTTPException(status_code=404, detail="Trip not found")
+    require_trip_access(db, trip_id, user_sub, "owner", status_code=404, detail="Trip not found")
 
     accommodations = db.query(Accommodation).filter(
         Accommodation.trip_id == trip_id
@@ -83,7 +73,7 @@ def list_accommodations(
     return accommodations
 
 
-@router.get("/accommodations/{trip_id}/{accommodation_id}", response_model=AccommodationOut)
+@router.get("/accommodations/{trip_id}/{accommodation_id}", response_model=AccommodationOut, dependencies=[Depends(trip_etag("owner"))])
 def get_accommodation(
     trip_id: int,
     accommodation_id: int,
@@ -94,13 +84,7 @@ def get_accommodation(
     Get a specific accommodation by ID.
     """
     # Verify trip ownership
-    trip = db.query(Trip).filter(
-        Trip.id == trip_id,
-        Trip.owner_sub == user_sub
-    ).first()
-
-    if not trip:
-        raise HTTPException(status_code=404, detail="Trip not found")
+    require_trip_access(db, trip_id, user_sub, "owner", status_code=404, detail="Trip not found")
 
     accommodation = db.query(Accommodation).filter(
         Accommodation.id == accommodation_id,
@@ -125,13 +109,7 @@ def update_accommodation(
     Update an existing accommodation.
     """
     # Verify trip ownership
-    trip = db.query(Trip).filter(
-        Trip.id == trip_id,
-        Trip.owner_sub == user_sub
-    ).first()
-
-    if not trip:
-        raise HTTPException(status_code=404, detail="Trip not found")
+    require_trip_access(db, trip_id, user_sub, "owner", status_code=404, detail="Trip not found")
 
     accommodation = db.query(Accommodation).filter(
         Accommodation.id == accommodation_id,
@@ -179,13 +157,7 @@ def delete_accommodation(
     Delete an accommodation.
     """
     # Verify trip ownership
-    trip = db.query(Trip).filter(
-        Trip.id == trip_id,
-        Trip.owner_sub == user_sub
-    ).first()
-
-    if not trip:
-        raise HTTPException(status_code=404, detail="Trip not found")
+    require_trip_access(db, trip_id, user_sub, "owner", status_code=404, detail="Trip not found")
 
     accommodation = db.query(Accommodation).filter(
         Accommodation.id == accommodation_id,
@@ -1,50 +1,155 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from database import get_db
+import os
+import json
+import time
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session, joinedload
+from typing import List, Optional, Tuple
+from database import SessionLocal, get_async_db
 import models
 import schemas
 from auth import require_user_sub
+from access import require_trip_access
+from trip_version import trip_etag
+import activity_feed
 
 router = APIRouter(prefix="/trips/{trip_id}/activity", tags=["activity"])
 
+MAX_PAGE_SIZE = 500
 
-def check_trip_access(trip_id: int, user_sub: str, db: Session):
-    """Check if user has access to trip"""
-    trip = db.query(models.Trip).filter(models.Trip.id == trip_id).first()
-    if not trip:
-        raise HTTPException(404, "Trip not found")
+# Comment line sent on idle streams so proxies keep them open
+ACTIVITY_STREAM_HEARTBEAT_S = float(os.environ.get("ACTIVITY_STREAM_HEARTBEAT_S", "15"))
+# Streams end after this long; clients reconnect with Last-Event-ID (re-checking access)
+ACTIVITY_STREAM_MAX_S = float(os.environ.get("ACTIVITY_STREAM_MAX_S", "300"))
+# Rows replayed to a resuming client; a longer gap gets a `reset` event (refetch the GET) instead
+ACTIVITY_STREAM_BACKLOG = 100
 
-    if trip.owner_sub == user_sub:
-        return trip
 
-    membership = db.query(models.TripMember).filter(
-        models.TripMember.trip_id == trip_id,
-        models.TripMember.user_id == user_sub,
-        models.TripMember.invite_status == "accepted"
-    ).first()
+def _activity_feed(db: Session, trip_id: int, sub: str, limit: int, offset: int,
+                   before_id: Optional[int], after_id: Optional[int]) -> List[schemas.ActivityLogOut]:
+    require_trip_access(db, trip_id, sub, detail="Access denied to this trip")
 
-    if not membership:
-        raise HTTPException(403, "Access denied to this trip")
+    log = models.ActivityLog
+    query = db.query(log).filter(log.trip_id == trip_id).options(
+        # One query for the rows and their actors instead of a lookup per row
+        joinedload(log.user)
+    )
 
-    return trip
+    cursor_id = before_id if before_id is not None else after_id
+    if cursor_id is not None:
+        # Position of the cursor row in feed order; an unknown id matches nothing
+        cursor_at = select(log.created_at).where(log.trip_id == trip_id, log.id == cursor_id).scalar_subquery()
+        # Row-value comparison, so the index seeks straight to the cursor
+        position, cursor = tuple_(log.created_at, log.id), tuple_(cursor_at, cursor_id)
+        query = query.filter(position < cursor if before_id is not None else position > cursor)
 
+    if after_id is not None:
+        # The `limit` rows right after the cursor, still returned newest first
+        activities = query.order_by(log.created_at, log.id).limit(limit).all()[::-1]
+    else:
+        activities = query.order_by(log.created_at.desc(), log.id.desc()).limit(limit).offset(offset).all()
 
-@router.get("", response_model=List[schemas.ActivityLogOut])
-def get_activity_feed(
+    return [schemas.ActivityLogOut.model_validate(a, from_attributes=True) for a in activities]
+
+
+@router.get("", response_model=List[schemas.ActivityLogOut], dependencies=[Depends(trip_etag(async_db=True))])
+async def get_activity_feed(
     trip_id: int,
     limit: int = 50,
     offset: int = 0,
-    db: Session = Depends(get_db),
+    before_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+    db=Depends(get_async_db),
+    sub: str = Depends(require_user_sub)
+):
+    """
+    Activity feed for a trip, newest first, with each actor's display name and avatar.
+
+    Page back with `before_id` (the last row's id); `after_id` returns the
+    `limit` rows that followed a row, e.g. to catch up. Both seek through the
+    (trip_id, created_at, id) index; `offset` still works but scans the rows it skips.
+    """
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(400, f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    if before_id is not None and after_id is not None:
+        raise HTTPException(400, "Pass before_id or after_id, not both")
+    if offset and (before_id is not None or after_id is not None):
+        raise HTTPException(400, "offset can't be combined with before_id or after_id")
+    return await db.run_sync(_activity_feed, trip_id, sub, limit, offset, before_id, after_id)
+
+
+def _stream_backlog(trip_id: int, sub: str, after_id: Optional[int]) -> Tuple[List[dict], Optional[int]]:
+    """
+    Check access and load rows after after_id, on a session closed before
+    streaming starts. Returns (rows, reset_id): when more than
+    ACTIVITY_STREAM_BACKLOG rows were missed none are replayed, and reset_id is
+    the newest row's id for the client to refetch up to and resume from.
+    """
+    db = SessionLocal()
+    try:
+        if after_id is None:
+            require_trip_access(db, trip_id, sub, detail="Access denied to this trip")
+            return [], None
+        rows = _activity_feed(db, trip_id, sub, ACTIVITY_STREAM_BACKLOG + 1, 0, None, after_id)
+        if len(rows) > ACTIVITY_STREAM_BACKLOG:
+            newest = _activity_feed(db, trip_id, sub, 1, 0, None, None)
+            return [], newest[0].id
+        return [row.model_dump(mode="json") for row in reversed(rows)], None
+    finally:
+        db.close()
+
+
+def _sse(event: dict) -> str:
+    return f"id: {event['id']}\nevent: activity\ndata: {json.dumps(event, separators=(',', ':'))}\n\n"
+
+
+def _sse_reset(last_id: int) -> str:
+    return f"id: {last_id}\nevent: reset\ndata: {{}}\n\n"
+
+
+@router.get("/stream")
+async def stream_activity(
+    trip_id: int,
+    after_id: Optional[int] = None,
+    last_event_id: Optional[int] = Header(None),
     sub: str = Depends(require_user_sub)
 ):
-    """Get activity feed for a trip"""
-    check_trip_access(trip_id, sub, db)
+    """
+    Server-sent events with the trip's new activity rows as they commit (same
+    JSON as the feed, `event: activity`, `id:` the row id). Pass `after_id` (or
+    reconnect with Last-Event-ID) to first replay rows committed since then; if
+    that's more than ACTIVITY_STREAM_BACKLOG rows, an `event: reset` (with the
+    newest row's id) replaces them and the client should refetch the feed.
+    """
+    after_id = after_id if after_id is not None else last_event_id
+    # Subscribe before reading the backlog so nothing committed in between is lost
+    subscription = await activity_feed.broker.subscribe(trip_id)
+    try:
+        backlog, reset_id = await run_in_threadpool(_stream_backlog, trip_id, sub, after_id)
+    except BaseException:
+        await activity_feed.broker.unsubscribe(subscription)
+        raise
 
-    activities = db.query(models.ActivityLog).filter(
-        models.ActivityLog.trip_id == trip_id
-    ).order_by(
-        models.ActivityLog.created_at.desc()
-    ).limit(limit).offset(offset).all()
+    async def events():
+        replayed = {event["id"] for event in backlog}
+        deadline = time.monotonic() + ACTIVITY_STREAM_MAX_S
+        try:
+            yield "retry: 3000\n\n"
+            if reset_id is not None:
+                yield _sse_reset(reset_id)
+            for event in backlog:
+                yield _sse(event)
+            while time.monotonic() < deadline and not subscription.lagged:
+                # StreamingResponse cancels this generator when the client disconnects
+                event = await subscription.get(min(ACTIVITY_STREAM_HEARTBEAT_S, deadline - time.monotonic()))
+                if event is None:
+                    yield ": keepalive\n\n"
+                elif event["id"] not in replayed:
+                    yield _sse(event)
+        finally:
+            await activity_feed.broker.unsubscribe(subscription)
 
-    return activities
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -1,52 +1,50 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_async_db
 from models import Trip, Expense, CategoryBudget, Participant
-from schemas import BudgetAnalytics, CategorySpending, DailyTrends, DailySpending
+from schemas import BudgetAnalytics, CategorySpending, DailyTrends, DailySpending, CategoryTotal, AnalyticsSummary
 from auth import get_user_sub
-from sqlalchemy import func
+from access import require_trip_access
+from sqlalchemy import func, case, or_
 from typing import List
-from datetime import timedelta
 from collections import defaultdict
+from trip_version import trip_etag
 
 router = APIRouter()
 
-@router.get("/analytics/{trip_id}/budget-vs-actual", response_model=BudgetAnalytics)
-def get_budget_vs_actual(
-    trip_id: int,
-    db: Session = Depends(get_db),
-    user_sub: str = Depends(get_user_sub)
-):
+def verify_trip_owner(trip_id: int, user_sub: str, db: Session) -> Trip:
+    """Verify trip ownership"""
+    return require_trip_access(db, trip_id, user_sub, "owner", status_code=404, detail="Trip not found").trip
+
+
+def spending_by_category_and_day(db: Session, trip_id: int):
     """
-    Get budget vs actual spending analysis by category.
-    Returns planned amounts, actual spending, variance, and percentage utilization.
+    Aggregate expenses in home currency grouped by (category, dt).
+    Only the amount/fx/category/date columns are read; no ORM rows are loaded.
+    Returns (category, dt, amount_home, num_expenses) tuples.
     """
-    # Verify trip ownership
-    trip = db.query(Trip).filter(
-        Trip.id == trip_id,
-        Trip.owner_sub == user_sub
-    ).first()
+    amount_home = Expense.amount * case(
+        (or_(Expense.fx_rate_to_home.is_(None), Expense.fx_rate_to_home == 0), 1.0),
+        else_=Expense.fx_rate_to_home
+    )
+    category = case(
+        (or_(Expense.category.is_(None), Expense.category == ""), "other"),
+        else_=Expense.category
+    )
+    rows = db.query(
+        category.label("category"),
+        Expense.dt,
+        func.sum(amount_home),
+        func.count(Expense.id)
+    ).filter(Expense.trip_id == trip_id).group_by(category, Expense.dt).all()
 
-    if not trip:
-        raise HTTPException(status_code=404, detail="Trip not found")
+    return [(cat, dt, float(total or 0), count) for cat, dt, total, count in rows]
 
-    # Get all category budgets
-    category_budgets = db.query(CategoryBudget).filter(
-        CategoryBudget.trip_id == trip_id
-    ).all()
-
-    # Calculate actual spending per category (converted to home currency)
-    expenses = db.query(Expense).filter(Expense.trip_id == trip_id).all()
 
+def build_budget_analytics(trip: Trip, category_budgets: List[CategoryBudget], rows) -> BudgetAnalytics:
     actual_by_category = defaultdict(float)
-    for expense in expenses:
-        category = expense.category or "other"
-        # Convert to home currency
-        if expense.fx_rate_to_home:
-            amount_home = float(expense.amount) * expense.fx_rate_to_home
-        else:
-            amount_home = float(expense.amount)
-        actual_by_category[category] += amount_home
+    for category, _, amount, _ in rows:
+        actual_by_category[category] += amount
 
     # Build category spending list
     categories_list = []
@@ -54,19 +52,13 @@ def get_budget_vs_actual(
     total_spent = 0
 
     # Get all categories (from budgets and actual expenses)
-    all_categories = set()
+    planned_by_category = {}
     for cb in category_budgets:
-        all_categories.add(cb.category)
-    for cat in actual_by_category.keys():
-        all_categories.add(cat)
+        planned_by_category.setdefault(cb.category, float(cb.planned_amount))
+    all_categories = set(planned_by_category) | set(actual_by_category)
 
     for category in all_categories:
-        planned = 0
-        for cb in category_budgets:
-            if cb.category == category:
-                planned = float(cb.planned_amount)
-                break
-
+        planned = planned_by_category.get(category, 0)
         actual = actual_by_category.get(category, 0)
         variance = actual - planned
         variance_percent = ((variance / planned) * 100) if planned > 0 else 0
@@ -98,39 +90,12 @@ def get_budget_vs_actual(
     )
 
 
-@router.get("/analytics/{trip_id}/daily-trends", response_model=DailyTrends)
-def get_daily_trends(
-    trip_id: int,
-    db: Session = Depends(get_db),
-    user_sub: str = Depends(get_user_sub)
-):
-    """
-    Get daily spending trends with burn rate analysis.
-    Shows spending per day, average daily spend, and projected total.
-    """
-    # Verify trip ownership
-    trip = db.query(Trip).filter(
-        Trip.id == trip_id,
-        Trip.owner_sub == user_sub
-    ).first()
-
-    if not trip:
-        raise HTTPException(status_code=404, detail="Trip not found")
-
-    # Get expenses grouped by date
-    expenses = db.query(Expense).filter(Expense.trip_id == trip_id).all()
-
+def build_daily_trends(trip: Trip, rows) -> DailyTrends:
     # Group by date
     daily_map = defaultdict(lambda: {"amount": 0, "count": 0})
-    for expense in expenses:
-        # Convert to home currency
-        if expense.fx_rate_to_home:
-            amount_home = float(expense.amount) * expense.fx_rate_to_home
-        else:
-            amount_home = float(expense.amount)
-
-        daily_map[expense.dt]["amount"] += amount_home
-        daily_map[expense.dt]["count"] += 1
+    for _, dt, amount, count in rows:
+        daily_map[dt]["amount"] += amount
+        daily_map[dt]["count"] += count
 
     # Build daily spending list
     days_list = []
@@ -159,43 +124,94 @@ def get_daily_trends(
     )
 
 
-@router.get("/analytics/{trip_id}/category-breakdown")
-def get_category_breakdown(
+def build_category_breakdown(rows) -> List[CategoryTotal]:
+    category_totals = defaultdict(float)
+    for category, _, amount, _ in rows:
+        category_totals[category] += amount
+    return [CategoryTotal(category=cat, total=amount) for cat, amount in category_totals.items()]
+
+
+def _analytics_summary(db: Session, trip_id: int, user_sub: str) -> AnalyticsSummary:
+    trip = verify_trip_owner(trip_id, user_sub, db)
+    category_budgets = db.query(CategoryBudget).filter(CategoryBudget.trip_id == trip_id).all()
+    rows = spending_by_category_and_day(db, trip_id)
+
+    return AnalyticsSummary(
+        budget=build_budget_analytics(trip, category_budgets, rows),
+        daily_trends=build_daily_trends(trip, rows),
+        category_breakdown=build_category_breakdown(rows)
+    )
+
+
+def _budget_vs_actual(db: Session, trip_id: int, user_sub: str) -> BudgetAnalytics:
+    trip = verify_trip_owner(trip_id, user_sub, db)
+
+    # Get all category budgets
+    category_budgets = db.query(CategoryBudget).filter(
+        CategoryBudget.trip_id == trip_id
+    ).all()
+
+    # Calculate actual spending per category (converted to home currency)
+    return build_budget_analytics(trip, category_budgets, spending_by_category_and_day(db, trip_id))
+
+
+def _daily_trends(db: Session, trip_id: int, user_sub: str) -> DailyTrends:
+    trip = verify_trip_owner(trip_id, user_sub, db)
+    return build_daily_trends(trip, spending_by_category_and_day(db, trip_id))
+
+
+def _category_breakdown(db: Session, trip_id: int, user_sub: str) -> List[CategoryTotal]:
+    verify_trip_owner(trip_id, user_sub, db)
+    return build_category_breakdown(spending_by_category_and_day(db, trip_id))
+
+
+@router.get("/analytics/{trip_id}/summary", response_model=AnalyticsSummary, dependencies=[Depends(trip_etag("owner", async_db=True))])
+async def get_analytics_summary(
     trip_id: int,
-    db: Session = Depends(get_db),
+    db=Depends(get_async_db),
     user_sub: str = Depends(get_user_sub)
 ):
     """
-    Get simple category breakdown showing total spent per category.
-    Useful for pie/donut charts.
+    Budget vs actual, daily trends and category breakdown in one response.
+    Verifies the trip once and aggregates expenses with a single GROUP BY.
     """
-    # Verify trip ownership
-    trip = db.query(Trip).filter(
-        Trip.id == trip_id,
-        Trip.owner_sub == user_sub
-    ).first()
+    return await db.run_sync(_analytics_summary, trip_id, user_sub)
 
-    if not trip:
-        raise HTTPException(status_code=404, detail="Trip not found")
 
-    # Get expenses
-    expenses = db.query(Expense).filter(Expense.trip_id == trip_id).all()
+@router.get("/analytics/{trip_id}/budget-vs-actual", response_model=BudgetAnalytics, dependencies=[Depends(trip_etag("owner", async_db=True))])
+async def get_budget_vs_actual(
+    trip_id: int,
+    db=Depends(get_async_db),
+    user_sub: str = Depends(get_user_sub)
+):
+    """
+    Get budget vs actual spending analysis by category.
+    Returns planned amounts, actual spending, variance, and percentage utilization.
+    """
+    return await db.run_sync(_budget_vs_actual, trip_id, user_sub)
 
-    # Group by category
-    category_totals = defaultdict(float)
-    for expense in expenses:
-        category = expense.category or "other"
-        # Convert to home currency
-        if expense.fx_rate_to_home:
-            amount_home = float(expense.amount) * expense.fx_rate_to_home
-        else:
-            amount_home = float(expense.amount)
-        category_totals[category] += amount_home
-
-    # Return as list of dicts
-    result = [
-        {"category": cat, "total": amount}
-        for cat, amount in category_totals.items()
-    ]
-
-    return result
+
+@router.get("/analytics/{trip_id}/daily-trends", response_model=DailyTrends, dependencies=[Depends(trip_etag("owner", async_db=True))])
+async def get_daily_trends(
+    trip_id: int,
+    db=Depends(get_async_db),
+    user_sub: str = Depends(get_user_sub)
+):
+    """
+    Get daily spending trends with burn rate analysis.
+    Shows spending per day, average daily spend, and projected total.
+    """
+    return await db.run_sync(_daily_trends, trip_id, user_sub)
+
+
+@router.get("/analytics/{trip_id}/category-breakdown", response_model=List[CategoryTotal], dependencies=[Depends(trip_etag("owner", async_db=True))])
+async def get_category_breakdown(
+    trip_id: int,
+    db=Depends(get_async_db),
+    user_sub: str = Depends(get_user_sub)
+):
+    """
+    Get simple category breakdown showing total spent per category.
+    Useful for pie/donut charts.
+    """
+    return await db.run_sync(_category_breakdown, trip_id, user_sub)
@@ -1,63 +1,43 @@
+import os
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from typing import Dict, List
+from typing import List
 from database import get_db
-import models
 import schemas
 from auth import require_user_sub
-from utils import min_cash_flow
+from access import require_trip_access
+from utils import min_cash_flow, optimal_cash_flow, from_cents, OPTIMAL_MAX_PARTICIPANTS
+import ledger
+from metrics import settlement_solver_seconds
+from trip_version import trip_etag
 
 router = APIRouter(prefix="/balances", tags=["balances"])
 
-@router.get("/{trip_id}/net", response_model=List[schemas.BalanceLine])
-def compute_net(trip_id: int, db: Session = Depends(get_db), sub: str = Depends(require_user_sub)):
-    trip = db.query(models.Trip).filter(models.Trip.id == trip_id, models.Trip.owner_sub == sub).first()
-    if not trip:
-        raise HTTPException(404, "Trip not found")
-
-    parts = db.query(models.Participant).filter(models.Participant.trip_id == trip_id).all()
-    ids = [p.id for p in parts]
-    id_to_weight = {p.id: (p.weight or 1.0) for p in parts}
+SETTLEMENT_TIME_BUDGET_MS = int(os.environ.get("SETTLEMENT_TIME_BUDGET_MS", "1000"))
+SETTLEMENT_ALGORITHMS = ("greedy", "optimal")
 
-    balances = {pid: 0.0 for pid in ids}
-
-    for exp in trip.expenses:
-        fx = exp.fx_rate_to_home or 1.0  # assume already home currency if None
-        total_home = float(exp.amount) * fx
+@router.get("/{trip_id}/net", response_model=List[schemas.BalanceLine], dependencies=[Depends(trip_etag("owner"))])
+def compute_net(trip_id: int, db: Session = Depends(get_db), sub: str = Depends(require_user_sub)):
+    require_trip_access(db, trip_id, sub, "owner", status_code=404, detail="Trip not found")
 
-        # Payer pays upfront
-        balances[exp.payer_id] += total_home
+    balances = ledger.current_trip_balances(db, trip_id)
 
-        # Determine shares
-        splits = exp.splits or []
-        if not splits:
-            # equal among all
-            share = total_home / len(ids)
-            for pid in ids:
-                balances[pid] -= share
-        else:
-            # weighted/custom
-            if any(s.share_type == "custom" for s in splits):
-                total_custom = sum((s.share_value or 0) for s in splits)
-                for s in splits:
-                    frac = (s.share_value or 0) / total_custom if total_custom else 0
-                    balances[s.participant_id] -= total_home * frac
-            elif any(s.share_type == "weight" for s in splits):
-                total_w = sum(id_to_weight.get(s.participant_id, 1.0) for s in splits)
-                for s in splits:
-                    w = id_to_weight.get(s.participant_id, 1.0)
-                    balances[s.participant_id] -= total_home * (w / total_w if total_w else 0)
-            else:
-                # equal among listed
-                listed = [s.participant_id for s in splits]
-                share = total_home / (len(listed) or 1)
-                for pid in listed:
-                    balances[pid] -= share
+    return [{"participant_id": pid, "net_amount_home": from_cents(cents)} for pid, cents in balances.items()]
 
-    return [{"participant_id": pid, "net_amount_home": round(amt, 2)} for pid, amt in balances.items()]
+@router.get("/{trip_id}/settlements", response_model=List[schemas.SettlementLine], dependencies=[Depends(trip_etag("owner"))])
+def settlements(trip_id: int, algorithm: str = "greedy", db: Session = Depends(get_db), sub: str = Depends(require_user_sub)):
+    """
+    Suggested transfers to settle the trip.
+    algorithm=greedy pairs largest debtor with largest creditor; algorithm=optimal
+    finds the minimum number of transfers (falls back to greedy for large groups).
+    """
+    if algorithm not in SETTLEMENT_ALGORITHMS:
+        raise HTTPException(400, f"algorithm must be one of: {', '.join(SETTLEMENT_ALGORITHMS)}")
 
-@router.get("/{trip_id}/settlements", response_model=List[schemas.SettlementLine])
-def settlements(trip_id: int, db: Session = Depends(get_db), sub: str = Depends(require_user_sub)):
     net = compute_net(trip_id, db, sub)  # reuse logic
     balances = {row["participant_id"]: row["net_amount_home"] for row in net} if isinstance(net, list) else {r.participant_id: r.net_amount_home for r in net}
-    return min_cash_flow(balances)
+    with settlement_solver_seconds.time(algorithm):
+        if algorithm == "optimal":
+            return optimal_cash_flow(balances, max_participants=OPTIMAL_MAX_PARTICIPANTS,
+                                     time_budget_s=SETTLEMENT_TIME_BUDGET_MS / 1000)
+        return min_cash_flow(balances)
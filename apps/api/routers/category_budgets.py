@@ -1,10 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from database import get_db
-from models import Trip, CategoryBudget
+from models import CategoryBudget
 from schemas import CategoryBudgetCreate, CategoryBudgetOut
 from auth import get_user_sub
+from access import require_trip_access
 from typing import List
+from trip_version import trip_etag
 
 router = APIRouter()
 
@@ -19,13 +21,7 @@ def create_category_budget(
     Create or update a category budget for a trip.
     """
     # Verify trip ownership
-    trip = db.query(Trip).filter(
-        Trip.id == trip_id,
-        Trip.owner_sub == user_sub
-    ).first()
-
-    if not trip:
-        raise HTTPException(status_code=404, detail="Trip not found")
+    require_trip_access(db, trip_id, user_sub, "owner", status_code=404, detail="Trip not found")
 
     # Check if budget for this category already exists
     existing = db.query(CategoryBudget).filter(
@@ -54,7 +50,7 @@ def create_category_budget(
         return db_category_budget
 
 
-@router.get("/category-budgets/{trip_id}", response_model=List[CategoryBudgetOut])
+@router.get("/category-budgets/{trip_id}", response_model=List[CategoryBudgetOut], dependencies=[Depends(trip_etag("owner"))])
 def list_category_budgets(
     trip_id: int,
     db: Session = Depends(get_db),
@@ -64,13 +60,7 @@ def list_category_budgets(
     List all category budgets for a trip.
     """
     # Verify trip ownership
-    trip = db.query(Trip).filter(
-        Trip.id == trip_id,
-        Trip.owner_sub == user_sub
-    ).first()
-
-    if not trip:
-        raise HTTPException(status_code=404, detail="Trip not found")
+    require_trip_access(db, trip_id, user_sub, "owner", status_code=404, detail="Trip not found")
 
     budgets = db.query(CategoryBudget).filter(
         CategoryBudget.trip_id == trip_id
@@ -90,13 +80,7 @@ def delete_category_budget(
     Delete a category budget.
     """
     # Verify trip ownership
-    trip = db.query(Trip).filter(
-        Trip.id == trip_id,
-        Trip.owner_sub == user_sub
-    ).first()
-
-    if not trip:
-        raise HTTPException(status_code=404, detail="Trip not found")
+    require_trip_access(db, trip_id, user_sub, "owner", status_code=404, detail="Trip not found")
 
     budget = db.query(CategoryBudget).filter(
         CategoryBudget.id == category_budget_id,
@@ -124,13 +108,7 @@ def bulk_create_category_budgets(
     Useful for setting up a complete budget plan.
     """
     # Verify trip ownership
-    trip = db.query(Trip).filter(
-        Trip.id == trip_id,
-        Trip.owner_sub == user_sub
-    ).first()
-
-    if not trip:
-        raise HTTPException(status_code=404, detail="Trip not found")
+    require_trip_access(db, trip_id, user_sub, "owner", status_code=404, detail="Trip not found")
 
     created_budgets = []
 
@@ -6,33 +6,12 @@ from database import get_db
 import models
 import schemas
 from auth import require_user_sub
+import activity_log
+from access import require_expense_access
 
 router = APIRouter(tags=["comments"])
 
 
-def check_expense_access(expense_id: int, user_sub: str, db: Session):
-    """Check if user has access to the expense's trip"""
-    expense = db.query(models.Expense).filter(models.Expense.id == expense_id).first()
-    if not expense:
-        raise HTTPException(404, "Expense not found")
-
-    trip = db.query(models.Trip).filter(models.Trip.id == expense.trip_id).first()
-
-    if trip.owner_sub == user_sub:
-        return expense
-
-    membership = db.query(models.TripMember).filter(
-        models.TripMember.trip_id == expense.trip_id,
-        models.TripMember.user_id == user_sub,
-        models.TripMember.invite_status == "accepted"
-    ).first()
-
-    if not membership:
-        raise HTTPException(403, "Access denied to this expense")
-
-    return expense
-
-
 @router.get("/expenses/{expense_id}/comments", response_model=List[schemas.CommentOut])
 def list_comments(
     expense_id: int,
@@ -40,7 +19,7 @@ def list_comments(
     sub: str = Depends(require_user_sub)
 ):
     """List all comments on an expense"""
-    check_expense_access(expense_id, sub, db)
+    require_expense_access(db, expense_id, sub)
 
     comments = db.query(models.Comment).filter(
         models.Comment.expense_id == expense_id
@@ -57,7 +36,7 @@ def create_comment(
     sub: str = Depends(require_user_sub)
 ):
     """Add a comment to an expense"""
-    expense = check_expense_access(expense_id, sub, db)
+    expense = require_expense_access(db, expense_id, sub)
 
     comment = models.Comment(
         expense_id=expense_id,
@@ -67,16 +46,10 @@ def create_comment(
         updated_at=datetime.utcnow()
     )
     db.add(comment)
+    db.flush()  # assigns comment.id for the activity metadata
 
-    # Log activity
-    activity = models.ActivityLog(
-        trip_id=expense.trip_id,
-        user_id=sub,
-        action_type="comment_added",
-        action_metadata={"expense_id": expense_id, "comment_id": comment.id},
-        created_at=datetime.utcnow()
-    )
-    db.add(activity)
+    activity_log.record(db, expense.trip_id, sub, "comment_added",
+                        {"expense_id": expense_id, "comment_id": comment.id})
 
     db.commit()
     db.refresh(comment)
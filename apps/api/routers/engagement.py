@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import List
+from database import get_async_db
+import schemas
+from auth import require_user_sub
+from access import require_trip_access
+from trip_version import trip_etag
+from engagement import expense_threads
+
+router = APIRouter(prefix="/trips/{trip_id}/engagement", tags=["engagement"])
+
+# Expenses per request, the same as one expense list page
+MAX_EXPENSE_IDS = 500
+
+
+def _engagement(db: Session, trip_id: int, sub: str, expense_ids: List[int]) -> List[schemas.ExpenseThreadOut]:
+    require_trip_access(db, trip_id, sub, detail="Access denied to this trip")
+    return expense_threads(db, trip_id, expense_ids)
+
+
+@router.get("", response_model=List[schemas.ExpenseThreadOut], dependencies=[Depends(trip_etag(async_db=True))])
+async def get_engagement(
+    trip_id: int,
+    expense_ids: str,
+    db=Depends(get_async_db),
+    sub: str = Depends(require_user_sub)
+):
+    """
+    Comments and reactions of many expenses of a trip at once, e.g. the page an
+    expense list shows. `expense_ids` is comma-separated (up to 500); the trip
+    is authorized once and each kind is fetched with one query, grouped by
+    expense in the order given. Ids that aren't expenses of this trip are omitted.
+    """
+    try:
+        ids = [int(i) for i in expense_ids.split(",") if i.strip()]
+    except ValueError:
+        raise HTTPException(400, "expense_ids must be comma-separated integers")
+    if not ids:
+        raise HTTPException(400, "expense_ids is empty")
+    if len(ids) > MAX_EXPENSE_IDS:
+        raise HTTPException(400, f"At most {MAX_EXPENSE_IDS} expense_ids per request")
+    return await db.run_sync(_engagement, trip_id, sub, ids)
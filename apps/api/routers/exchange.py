@@ -1,30 +1,28 @@
-import os
 from datetime import date
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-import httpx
-from database import get_db
-import models
+from fastapi import APIRouter, HTTPException
+from fx import fx_service, FxUnavailable
+import schemas
 
 router = APIRouter(prefix="/fx", tags=["fx"])
 
-FX_BASE_URL = os.environ.get("FX_BASE_URL", "https://api.exchangerate.host")
-
 @router.get("/rate")
-async def get_fx_rate(on: date, from_ccy: str, to_ccy: str, db: Session = Depends(get_db)):
-    from_ccy, to_ccy = from_ccy.upper(), to_ccy.upper()
-    # Check cache
-    fx = db.query(models.ExchangeRate).filter(models.ExchangeRate.date == on, models.ExchangeRate.from_ccy == from_ccy, models.ExchangeRate.to_ccy == to_ccy).first()
-    if fx:
-        return {"rate": fx.rate, "cached": True}
-    # Fetch
-    async with httpx.AsyncClient() as client:
-        r = await client.get(f"{FX_BASE_URL}/{on.isoformat()}", params={"base": from_ccy, "symbols": to_ccy})
-        r.raise_for_status()
-        data = r.json()
-        rate = data.get("rates", {}).get(to_ccy)
-        if rate is None:
-            raise RuntimeError("FX rate not available")
-        fx = models.ExchangeRate(date=on, from_ccy=from_ccy, to_ccy=to_ccy, rate=rate)
-        db.add(fx); db.commit()
-        return {"rate": rate, "cached": False}
+async def get_fx_rate(on: date, from_ccy: str, to_ccy: str):
+    try:
+        rate, cached = await fx_service.get_rate(on, from_ccy, to_ccy)
+    except FxUnavailable as e:
+        raise HTTPException(502, str(e))
+    return {"rate": rate, "cached": cached}
+
+@router.post("/rates", response_model=schemas.FxBatchResponse)
+async def get_fx_rates(payload: schemas.FxBatchRequest):
+    """Resolve many rates in one call; misses for the same date and base share one upstream request"""
+    keys = [(q.on, q.from_ccy.upper(), q.to_ccy.upper()) for q in payload.items]
+    resolved = await fx_service.get_rates(keys)
+    rates = []
+    for on, from_ccy, to_ccy in keys:
+        result = resolved[(on, from_ccy, to_ccy)]
+        if isinstance(result, Exception):
+            rates.append(schemas.FxRateResult(on=on, from_ccy=from_ccy, to_ccy=to_ccy, error=str(result)))
+        else:
+            rates.append(schemas.FxRateResult(on=on, from_ccy=from_ccy, to_ccy=to_ccy, rate=result[0], cached=result[1]))
+    return schemas.FxBatchResponse(rates=rates)
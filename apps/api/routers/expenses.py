@@ -1,47 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session, selectinload, load_only
+from typing import List, Optional
+from datetime import date
+from database import get_db, get_async_db
 import models
 import schemas
 from auth import require_user_sub
+from access import require_trip_access
+import ledger
+import trip_summary
+import expense_import
+from utils import encode_cursor, decode_cursor
+from engagement import engagement_counts, empty_engagement
+from trip_version import trip_etag
 
 router = APIRouter(prefix="/expenses", tags=["expenses"])
 
 
-def check_trip_access(trip_id: int, user_sub: str, db: Session, require_edit: bool = False):
-    """Check if user has access to trip"""
-    trip = db.query(models.Trip).filter(models.Trip.id == trip_id).first()
-    if not trip:
-        raise HTTPException(404, "Trip not found")
-
-    is_owner = trip.owner_sub == user_sub
-    membership = db.query(models.TripMember).filter(
-        models.TripMember.trip_id == trip_id,
-        models.TripMember.user_id == user_sub,
-        models.TripMember.invite_status == "accepted"
-    ).first()
-
-    has_access = is_owner or membership is not None
-    if not has_access:
-        raise HTTPException(403, "Access denied")
-
-    if require_edit:
-        can_edit = is_owner or (membership and membership.role in ["admin", "member"])
-        if not can_edit:
-            raise HTTPException(403, "Only owner, admin, or member can edit")
-
-    return trip
-
-
 @router.post("/{trip_id}", response_model=schemas.ExpenseOut)
 def add_expense(trip_id: int, payload: schemas.ExpenseCreate, db: Session = Depends(get_db), sub: str = Depends(require_user_sub)):
-    check_trip_access(trip_id, sub, db, require_edit=True)
+    require_trip_access(db, trip_id, sub, "member", detail="Only owner, admin, or member can edit")
 
     payer = db.query(models.Participant).filter(models.Participant.id == payload.payer_id, models.Participant.trip_id == trip_id).first()
     if not payer:
         raise HTTPException(400, "Invalid payer for this trip")
 
+    # Seed the ledger from existing expenses before this one is added
+    ledger.ensure_trip_ledger(db, trip_id)
+    trip_summary.ensure_trip_summary(db, trip_id)
+
     exp = models.Expense(trip_id=trip_id, payer_id=payload.payer_id, dt=payload.dt, amount=payload.amount,
                          currency=payload.currency.upper(), category=payload.category, note=payload.note,
                          fx_rate_to_home=payload.fx_rate_to_home)
@@ -52,14 +43,149 @@ def add_expense(trip_id: int, payload: schemas.ExpenseCreate, db: Session = Depe
     for s in splits:
         db.add(models.ExpenseSplit(expense_id=exp.id, participant_id=s.participant_id,
                                    share_type=s.share_type, share_value=s.share_value))
+    ledger.post_expense(db, exp, splits)
     db.commit()
     db.refresh(exp)
     return exp
 
-@router.get("/{trip_id}", response_model=List[schemas.ExpenseOut])
-def list_expenses(trip_id: int, db: Session = Depends(get_db), sub: str = Depends(require_user_sub)):
-    check_trip_access(trip_id, sub, db)
-    return db.query(models.Expense).filter(models.Expense.trip_id == trip_id).order_by(models.Expense.dt.desc()).all()
+@router.post("/{trip_id}/bulk", response_model=schemas.BulkImportResult)
+async def bulk_import_expenses(
+    trip_id: int,
+    request: Request,
+    format: Optional[str] = None,
+    db: Session = Depends(get_db),
+    sub: str = Depends(require_user_sub)
+):
+    """
+    Import many expenses from a streamed CSV (text/csv) or NDJSON
+    (application/x-ndjson) body; `format=csv|ndjson` overrides the content type.
+    Valid rows are inserted in one transaction; invalid rows are returned as
+    per-row errors. CSV columns follow ExpenseCreate, with `splits` written as
+    `participant_id[:share_value];...` plus an optional `share_type` column.
+    """
+    fmt = expense_import.detect_format(request.headers.get("content-type"), format)
+    if fmt is None:
+        raise HTTPException(415, "Send text/csv or application/x-ndjson (or pass format=csv|ndjson)")
+
+    await run_in_threadpool(require_trip_access, db, trip_id, sub, "member",
+                            detail="Only owner, admin, or member can edit")
+    importer = await run_in_threadpool(expense_import.ExpenseImporter, db, trip_id)
+
+    lines = expense_import.iter_lines(request.stream())
+    records = expense_import.iter_csv_records(lines) if fmt == "csv" else expense_import.iter_ndjson_records(lines)
+    async for row_number, record in records:
+        importer.add(row_number, expense_import.csv_record_to_payload(record) if fmt == "csv" else record)
+        if importer.chunk_full:
+            await run_in_threadpool(importer.flush)
+
+    return await run_in_threadpool(importer.finish)
+
+
+# Projectable columns; engagement is opted into with its own flag
+EXPENSE_FIELDS = tuple(f for f in schemas.ExpenseOut.model_fields if f != "engagement")
+MAX_PAGE_SIZE = 500
+
+
+def _list_expenses(db: Session, trip_id: int, sub: str, limit: Optional[int], cursor: Optional[str],
+                   selected: Optional[List[str]], with_engagement: bool = False):
+    """Returns (rows, next_cursor); rows are ExpenseOut, or dicts of the selected fields"""
+    require_trip_access(db, trip_id, sub)
+
+    query = db.query(models.Expense).filter(models.Expense.trip_id == trip_id)
+
+    if selected is None or "splits" in selected:
+        query = query.options(selectinload(models.Expense.splits))
+    if selected is not None:
+        columns = [getattr(models.Expense, f) for f in selected if f != "splits"]
+        query = query.options(load_only(models.Expense.id, models.Expense.dt, *columns))
+
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+            after_dt, after_id = date.fromisoformat(after["dt"]), int(after["id"])
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(400, "Invalid cursor")
+        query = query.filter(or_(
+            models.Expense.dt < after_dt,
+            and_(models.Expense.dt == after_dt, models.Expense.id < after_id)
+        ))
+
+    query = query.order_by(models.Expense.dt.desc(), models.Expense.id.desc())
+    if limit is not None:
+        query = query.limit(limit + 1)
+    expenses = query.all()
+
+    next_cursor = None
+    if limit is not None and len(expenses) > limit:
+        expenses = expenses[:limit]
+        last = expenses[-1]
+        next_cursor = encode_cursor({"dt": last.dt.isoformat(), "id": last.id})
+
+    counts = None
+    if with_engagement:
+        # A page is matched by id; the full list by trip, without sending every id
+        counts = engagement_counts(db, trip_id, sub, [e.id for e in expenses] if limit is not None else None)
+
+    if selected is None:
+        rows = [schemas.ExpenseOut.model_validate(e, from_attributes=True) for e in expenses]
+        if counts is not None:
+            for row in rows:
+                row.engagement = counts.get(row.id) or empty_engagement()
+        return rows, next_cursor
+
+    rows = [
+        {f: ([schemas.ExpenseSplitCreate.model_validate(sp, from_attributes=True) for sp in e.splits] if f == "splits" else getattr(e, f))
+         for f in selected}
+        for e in expenses
+    ]
+    if counts is not None:
+        for row, e in zip(rows, expenses):
+            row["engagement"] = counts.get(e.id) or empty_engagement()
+    return rows, next_cursor
+
+
+# exclude_unset drops `engagement` unless it was requested
+@router.get("/{trip_id}", response_model=List[schemas.ExpenseOut], response_model_exclude_unset=True,
+            dependencies=[Depends(trip_etag(async_db=True))])
+async def list_expenses(
+    trip_id: int,
+    response: Response,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    engagement: bool = False,
+    db=Depends(get_async_db),
+    sub: str = Depends(require_user_sub)
+):
+    """
+    List expenses newest first, ordered by (dt, id) descending.
+
+    Pass `limit` to page through results; when more remain, the opaque cursor
+    for the next page is returned in the X-Next-Cursor header. `fields` is a
+    comma-separated projection (e.g. `fields=id,dt,amount,currency`); splits
+    are only loaded when requested. `engagement=true` adds each expense's
+    comment count and reaction tallies (with the caller's own reactions),
+    aggregated for the whole page in two grouped queries.
+    """
+    if limit is not None and not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(400, f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    selected = None
+    if fields:
+        selected = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in selected if f not in EXPENSE_FIELDS]
+        if unknown:
+            raise HTTPException(400, f"Unknown fields: {', '.join(unknown)}")
+
+    rows, next_cursor = await db.run_sync(_list_expenses, trip_id, sub, limit, cursor, selected, engagement)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+
+    if selected is None:
+        response.headers.update(headers)
+        return rows
+    # A returned Response skips the dependency headers (ETag) set on `response`
+    headers.update({k: v for k, v in response.headers.items() if k in ("etag", "cache-control")})
+    return JSONResponse(jsonable_encoder(rows), headers=headers)
 
 
 @router.put("/{trip_id}/{expense_id}", response_model=schemas.ExpenseOut)
@@ -71,7 +197,7 @@ def update_expense(
     sub: str = Depends(require_user_sub)
 ):
     """Update an expense"""
-    check_trip_access(trip_id, sub, db, require_edit=True)
+    require_trip_access(db, trip_id, sub, "member", detail="Only owner, admin, or member can edit")
 
     expense = db.query(models.Expense).filter(
         models.Expense.id == expense_id,
@@ -81,6 +207,12 @@ def update_expense(
     if not expense:
         raise HTTPException(404, "Expense not found")
 
+    # Reverse the old expense on the ledger before changing it
+    ledger.ensure_trip_ledger(db, trip_id)
+    trip_summary.ensure_trip_summary(db, trip_id)
+    weights = ledger.participant_weights(db, trip_id)
+    ledger.post_expense(db, expense, expense.splits, sign=-1, weights=weights)
+
     # Update expense fields
     expense.dt = payload.dt
     expense.amount = payload.amount
@@ -105,6 +237,7 @@ def update_expense(
             share_type=s.share_type,
             share_value=s.share_value
         ))
+    ledger.post_expense(db, expense, splits, weights=weights)
 
     db.commit()
     db.refresh(expense)
@@ -119,7 +252,7 @@ def delete_expense(
     sub: str = Depends(require_user_sub)
 ):
     """Delete an expense"""
-    check_trip_access(trip_id, sub, db, require_edit=True)
+    require_trip_access(db, trip_id, sub, "member", detail="Only owner, admin, or member can edit")
 
     expense = db.query(models.Expense).filter(
         models.Expense.id == expense_id,
@@ -129,6 +262,9 @@ def delete_expense(
     if not expense:
         raise HTTPException(404, "Expense not found")
 
+    ledger.ensure_trip_ledger(db, trip_id)
+    trip_summary.ensure_trip_summary(db, trip_id)
+    ledger.post_expense(db, expense, expense.splits, sign=-1)
     db.delete(expense)
     db.commit()
     return {"success": True}
@@ -7,31 +7,13 @@ from database import get_db
 import models
 import schemas
 from auth import require_user_sub
+import activity_log
+from access import require_trip_access, invalidate_trip_access
+from trip_version import trip_etag
 
 router = APIRouter(tags=["invites"])
 
 
-def check_trip_access(trip_id: int, user_sub: str, db: Session):
-    """Check if user has access to trip"""
-    trip = db.query(models.Trip).filter(models.Trip.id == trip_id).first()
-    if not trip:
-        raise HTTPException(404, "Trip not found")
-
-    if trip.owner_sub == user_sub:
-        return trip
-
-    membership = db.query(models.TripMember).filter(
-        models.TripMember.trip_id == trip_id,
-        models.TripMember.user_id == user_sub,
-        models.TripMember.invite_status == "accepted"
-    ).first()
-
-    if not membership or membership.role not in ["owner", "admin"]:
-        raise HTTPException(403, "Only admins can manage invites")
-
-    return trip
-
-
 @router.post("/trips/{trip_id}/invites", response_model=schemas.TripInviteOut)
 def create_invite(
     trip_id: int,
@@ -40,7 +22,7 @@ def create_invite(
     sub: str = Depends(require_user_sub)
 ):
     """Create an invite link for a trip (requires admin)"""
-    check_trip_access(trip_id, sub, db)
+    require_trip_access(db, trip_id, sub, "admin", detail="Only admins can manage invites")
 
     invite = models.TripInvite(
         id=str(uuid.uuid4()),
@@ -57,14 +39,14 @@ def create_invite(
     return invite
 
 
-@router.get("/trips/{trip_id}/invites", response_model=List[schemas.TripInviteOut])
+@router.get("/trips/{trip_id}/invites", response_model=List[schemas.TripInviteOut], dependencies=[Depends(trip_etag("admin"))])
 def list_invites(
     trip_id: int,
     db: Session = Depends(get_db),
     sub: str = Depends(require_user_sub)
 ):
     """List all invite links for a trip"""
-    check_trip_access(trip_id, sub, db)
+    require_trip_access(db, trip_id, sub, "admin", detail="Only admins can manage invites")
 
     invites = db.query(models.TripInvite).filter(
         models.TripInvite.trip_id == trip_id
@@ -134,17 +116,10 @@ def accept_invite(
     # Increment invite usage count
     invite.used_count += 1
 
-    # Log activity
-    activity = models.ActivityLog(
-        trip_id=invite.trip_id,
-        user_id=sub,
-        action_type="member_joined",
-        action_metadata={"invite_id": invite_id},
-        created_at=datetime.utcnow()
-    )
-    db.add(activity)
+    activity_log.record(db, invite.trip_id, sub, "member_joined", {"invite_id": invite_id})
 
     db.commit()
+    invalidate_trip_access(invite.trip_id, sub, db)
     db.refresh(member)
     return member
 
@@ -161,7 +136,7 @@ def delete_invite(
         raise HTTPException(404, "Invite not found")
 
     # Check if user has permission to delete
-    check_trip_access(invite.trip_id, sub, db)
+    require_trip_access(db, invite.trip_id, sub, "admin", detail="Only admins can manage invites")
 
     db.delete(invite)
     db.commit()
@@ -5,39 +5,16 @@ from database import get_db
 import models
 import schemas
 from auth import require_user_sub
+from access import require_trip_access
+from trip_version import trip_etag
 
 router = APIRouter(prefix="/itinerary", tags=["itinerary"])
 
-def check_trip_access(trip_id: int, user_sub: str, db: Session, require_edit: bool = False):
-    """Check if user has access to trip (and optionally edit rights)"""
-    trip = db.query(models.Trip).filter(models.Trip.id == trip_id).first()
-    if not trip:
-        raise HTTPException(404, "Trip not found")
-
-    is_owner = trip.owner_sub == user_sub
-    membership = db.query(models.TripMember).filter(
-        models.TripMember.trip_id == trip_id,
-        models.TripMember.user_id == user_sub,
-        models.TripMember.invite_status == "accepted"
-    ).first()
-
-    has_access = is_owner or membership is not None
-
-    if not has_access:
-        raise HTTPException(403, "Access denied")
-
-    if require_edit:
-        can_edit = is_owner or (membership and membership.role in ["admin", "member"])
-        if not can_edit:
-            raise HTTPException(403, "Only owner, admin, or member can edit")
-
-    return trip
-
 
 @router.post("/{trip_id}", response_model=schemas.ItineraryItemOut)
 def add_item(trip_id: int, payload: schemas.ItineraryItemCreate, db: Session = Depends(get_db), sub: str = Depends(require_user_sub)):
     """Add itinerary item (owner/admin/member)"""
-    check_trip_access(trip_id, sub, db, require_edit=True)
+    require_trip_access(db, trip_id, sub, "member", detail="Only owner, admin, or member can edit")
     item = models.ItineraryItem(trip_id=trip_id, **payload.model_dump())
     db.add(item)
     db.commit()
@@ -45,10 +22,10 @@ def add_item(trip_id: int, payload: schemas.ItineraryItemCreate, db: Session = D
     return item
 
 
-@router.get("/{trip_id}", response_model=List[schemas.ItineraryItemOut])
+@router.get("/{trip_id}", response_model=List[schemas.ItineraryItemOut], dependencies=[Depends(trip_etag())])
 def list_items(trip_id: int, db: Session = Depends(get_db), sub: str = Depends(require_user_sub)):
     """List all itinerary items"""
-    check_trip_access(trip_id, sub, db)
+    require_trip_access(db, trip_id, sub)
     return db.query(models.ItineraryItem).filter(models.ItineraryItem.trip_id == trip_id).order_by(models.ItineraryItem.start_dt).all()
 
 
@@ -61,7 +38,7 @@ def update_item(
     sub: str = Depends(require_user_sub)
 ):
     """Update itinerary item"""
-    check_trip_access(trip_id, sub, db, require_edit=True)
+    require_trip_access(db, trip_id, sub, "member", detail="Only owner, admin, or member can edit")
 
     item = db.query(models.ItineraryItem).filter(
         models.ItineraryItem.id == item_id,
@@ -87,7 +64,7 @@ def delete_item(
     sub: str = Depends(require_user_sub)
 ):
     """Delete itinerary item"""
-    check_trip_access(trip_id, sub, db, require_edit=True)
+    require_trip_access(db, trip_id, sub, "member", detail="Only owner, admin, or member can edit")
 
     item = db.query(models.ItineraryItem).filter(
         models.ItineraryItem.id == item_id,
@@ -6,49 +6,20 @@ from database import get_db
 import models
 import schemas
 from auth import require_user_sub
+from access import require_trip_access, invalidate_trip_access
+from trip_version import trip_etag
 
 router = APIRouter(prefix="/trips/{trip_id}/members", tags=["members"])
 
 
-def check_trip_access(trip_id: int, user_sub: str, db: Session, required_role: str = None):
-    """Check if user has access to trip and optionally a specific role"""
-    # Check if user is the owner
-    trip = db.query(models.Trip).filter(models.Trip.id == trip_id).first()
-    if not trip:
-        raise HTTPException(404, "Trip not found")
-
-    if trip.owner_sub == user_sub:
-        return trip, "owner"
-
-    # Check if user is a member
-    membership = db.query(models.TripMember).filter(
-        models.TripMember.trip_id == trip_id,
-        models.TripMember.user_id == user_sub,
-        models.TripMember.invite_status == "accepted"
-    ).first()
-
-    if not membership:
-        raise HTTPException(403, "Access denied to this trip")
-
-    # Check role if required
-    if required_role:
-        role_hierarchy = {"owner": 4, "admin": 3, "member": 2, "viewer": 1}
-        user_level = role_hierarchy.get(membership.role, 0)
-        required_level = role_hierarchy.get(required_role, 0)
-        if user_level < required_level:
-            raise HTTPException(403, f"Requires {required_role} role")
-
-    return trip, membership.role
-
-
-@router.get("", response_model=List[schemas.TripMemberOut])
+@router.get("", response_model=List[schemas.TripMemberOut], dependencies=[Depends(trip_etag())])
 def list_trip_members(
     trip_id: int,
     db: Session = Depends(get_db),
     sub: str = Depends(require_user_sub)
 ):
     """List all members of a trip"""
-    check_trip_access(trip_id, sub, db)
+    require_trip_access(db, trip_id, sub, detail="Access denied to this trip")
 
     members = db.query(models.TripMember).filter(
         models.TripMember.trip_id == trip_id
@@ -65,7 +36,7 @@ def update_trip_member(
     sub: str = Depends(require_user_sub)
 ):
     """Update a trip member's role or status (requires admin)"""
-    check_trip_access(trip_id, sub, db, required_role="admin")
+    access = require_trip_access(db, trip_id, sub, "admin", detail="Requires admin role")
 
     member = db.query(models.TripMember).filter(
         models.TripMember.id == member_id,
@@ -77,15 +48,18 @@ def update_trip_member(
 
     if payload.role is not None:
         # Don't allow changing the owner's role
-        trip = db.query(models.Trip).filter(models.Trip.id == trip_id).first()
-        if member.user_id == trip.owner_sub:
+        if member.user_id == access.trip.owner_sub:
             raise HTTPException(400, "Cannot change owner's role")
+        # Nor let an admin raise (or drop) their own
+        if member.user_id == sub:
+            raise HTTPException(400, "Cannot change your own role")
         member.role = payload.role
 
     if payload.invite_status is not None:
         member.invite_status = payload.invite_status
 
     db.commit()
+    invalidate_trip_access(trip_id, member.user_id, db)
     db.refresh(member)
     return member
 
@@ -98,7 +72,7 @@ def remove_trip_member(
     sub: str = Depends(require_user_sub)
 ):
     """Remove a member from a trip (requires admin)"""
-    check_trip_access(trip_id, sub, db, required_role="admin")
+    access = require_trip_access(db, trip_id, sub, "admin", detail="Requires admin role")
 
     member = db.query(models.TripMember).filter(
         models.TripMember.id == member_id,
@@ -109,10 +83,11 @@ def remove_trip_member(
         raise HTTPException(404, "Member not found")
 
     # Don't allow removing the owner
-    trip = db.query(models.Trip).filter(models.Trip.id == trip_id).first()
-    if member.user_id == trip.owner_sub:
+    if member.user_id == access.trip.owner_sub:
         raise HTTPException(400, "Cannot remove trip owner")
 
+    user_id = member.user_id
     db.delete(member)
     db.commit()
+    invalidate_trip_access(trip_id, user_id, db)
     return {"success": True}
@@ -1,27 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from typing import List
 from database import get_db
 import models
 import schemas
 from auth import require_user_sub
+from access import require_trip_access
+import ledger
+import trip_summary
+from trip_version import trip_etag
 
 router = APIRouter(prefix="/participants", tags=["participants"])
 
 @router.post("/{trip_id}", response_model=schemas.ParticipantOut)
 def add_participant(trip_id: int, payload: schemas.ParticipantCreate, db: Session = Depends(get_db), sub: str = Depends(require_user_sub)):
-    trip = db.query(models.Trip).filter(models.Trip.id == trip_id, models.Trip.owner_sub == sub).first()
-    if not trip:
-        raise HTTPException(404, "Trip not found")
+    require_trip_access(db, trip_id, sub, "owner", status_code=404, detail="Trip not found")
     part = models.Participant(trip_id=trip_id, display_name=payload.display_name, weight=payload.weight)
     db.add(part)
+    db.flush()
+    # Expenses without splits are shared by everyone, so a new participant changes past shares
+    ledger.rebuild_trip_ledger(db, trip_id)
+    trip_summary.apply(db, trip_id, participants=1)
     db.commit()
     db.refresh(part)
     return part
 
-@router.get("/{trip_id}", response_model=List[schemas.ParticipantOut])
+@router.get("/{trip_id}", response_model=List[schemas.ParticipantOut], dependencies=[Depends(trip_etag("owner"))])
 def list_participants(trip_id: int, db: Session = Depends(get_db), sub: str = Depends(require_user_sub)):
-    trip = db.query(models.Trip).filter(models.Trip.id == trip_id, models.Trip.owner_sub == sub).first()
-    if not trip:
-        raise HTTPException(404, "Trip not found")
+    require_trip_access(db, trip_id, sub, "owner", status_code=404, detail="Trip not found")
     return db.query(models.Participant).filter(models.Participant.trip_id == trip_id).all()
@@ -6,33 +6,12 @@ from database import get_db
 import models
 import schemas
 from auth import require_user_sub
+import activity_log
+from access import require_expense_access
 
 router = APIRouter(tags=["reactions"])
 
 
-def check_expense_access(expense_id: int, user_sub: str, db: Session):
-    """Check if user has access to the expense's trip"""
-    expense = db.query(models.Expense).filter(models.Expense.id == expense_id).first()
-    if not expense:
-        raise HTTPException(404, "Expense not found")
-
-    trip = db.query(models.Trip).filter(models.Trip.id == expense.trip_id).first()
-
-    if trip.owner_sub == user_sub:
-        return expense
-
-    membership = db.query(models.TripMember).filter(
-        models.TripMember.trip_id == expense.trip_id,
-        models.TripMember.user_id == user_sub,
-        models.TripMember.invite_status == "accepted"
-    ).first()
-
-    if not membership:
-        raise HTTPException(403, "Access denied to this expense")
-
-    return expense
-
-
 @router.get("/expenses/{expense_id}/reactions", response_model=List[schemas.ReactionOut])
 def list_reactions(
     expense_id: int,
@@ -40,7 +19,7 @@ def list_reactions(
     sub: str = Depends(require_user_sub)
 ):
     """List all reactions on an expense"""
-    check_expense_access(expense_id, sub, db)
+    require_expense_access(db, expense_id, sub)
 
     reactions = db.query(models.Reaction).filter(
         models.Reaction.expense_id == expense_id
@@ -57,7 +36,7 @@ def add_reaction(
     sub: str = Depends(require_user_sub)
 ):
     """Add a reaction to an expense"""
-    expense = check_expense_access(expense_id, sub, db)
+    expense = require_expense_access(db, expense_id, sub)
 
     # Check if user already reacted with this emoji
     existing = db.query(models.Reaction).filter(
@@ -77,15 +56,8 @@ def add_reaction(
     )
     db.add(reaction)
 
-    # Log activity
-    activity = models.ActivityLog(
-        trip_id=expense.trip_id,
-        user_id=sub,
-        action_type="reaction_added",
-        action_metadata={"expense_id": expense_id, "emoji": payload.emoji},
-        created_at=datetime.utcnow()
-    )
-    db.add(activity)
+    activity_log.record(db, expense.trip_id, sub, "reaction_added",
+                        {"expense_id": expense_id, "emoji": payload.emoji})
 
     db.commit()
     db.refresh(reaction)
@@ -1,11 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from database import get_db
-from models import Trip, Settlement, Participant
+from models import Settlement, Participant
 from schemas import SettlementCreate, SettlementUpdate, SettlementOut
 from auth import get_user_sub
+from access import require_trip_access
 from typing import List
 from datetime import datetime
+from trip_version import trip_etag
 
 router = APIRouter()
 
@@ -20,13 +22,7 @@ def create_settlement(
     Create a new settlement (payment) between participants.
     """
     # Verify trip ownership
-    trip = db.query(Trip).filter(
-        Trip.id == trip_id,
-        Trip.owner_sub == user_sub
-    ).first()
-
-    if not trip:
-        raise HTTPException(status_code=404, detail="Trip not found")
+    require_trip_access(db, trip_id, user_sub, "owner", status_code=404, detail="Trip not found")
 
     # Verify both participants exist and belong to this trip
     from_participant = db.query(Participant).filter(
@@ -67,7 +63,7 @@ def create_settlement(
     return db_settlement
 
 
-@router.get("/settlements/{trip_id}", response_model=List[SettlementOut])
+@router.get("/settlements/{trip_id}", response_model=List[SettlementOut], dependencies=[Depends(trip_etag("owner"))])
 def list_settlements(
     trip_id: int,
     status: str = None,
@@ -79,13 +75,7 @@ def list_settlements(
     Optionally filter by status (pending, completed, cancelled).
     """
     # Verify trip ownership
-    trip = db.query(Trip).filter(
-        Trip.id == trip_id,
-        Trip.owner_sub == user_sub
-    ).first()
-
-    if not trip:
-        raise HTTPException(status_code=404, detail="Trip not found")
+    require_trip_access(db, trip_id, user_sub, "owner", status_code=404, detail="Trip not found")
 
     query = db.query(Settlement).filter(Settlement.trip_id == trip_id)
 
@@ -109,13 +99,7 @@ def update_settlement_status(
     Update a settlement's status (e.g., mark as completed).
     """
     # Verify trip ownership
-    trip = db.query(Trip).filter(
-        Trip.id == trip_id,
-        Trip.owner_sub == user_sub
-    ).first()
-
-    if not trip:
-        raise HTTPException(status_code=404, detail="Trip not found")
+    require_trip_access(db, trip_id, user_sub, "owner", status_code=404, detail="Trip not found")
 
     settlement = db.query(Settlement).filter(
         Settlement.id == settlement_id,
@@ -155,13 +139,7 @@ def delete_settlement(
     Delete a settlement.
     """
     # Verify trip ownership
-    trip = db.query(Trip).filter(
-        Trip.id == trip_id,
-        Trip.owner_sub == user_sub
-    ).first()
-
-    if not trip:
-        raise HTTPException(status_code=404, detail="Trip not found")
+    require_trip_access(db, trip_id, user_sub, "owner", status_code=404, detail="Trip not found")
 
     settlement = db.query(Settlement).filter(
         Settlement.id == settlement_id,
@@ -1,10 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import and_, case, literal, or_, select, union_all
 from sqlalchemy.orm import Session
-from typing import List
-from database import get_db
+from typing import List, Optional
+from datetime import date, datetime
+from database import get_db, get_async_db
 import models
 import schemas
 from auth import require_user_sub
+from access import require_trip_access, invalidate_trip_access
+from utils import encode_cursor, decode_cursor, from_cents
+import trip_summary
+from trip_version import trip_etag
 
 router = APIRouter(prefix="/trips", tags=["trips"])
 
@@ -24,48 +30,95 @@ def create_trip(payload: schemas.TripCreate, db: Session = Depends(get_db), sub:
     if payload.participants:
         for p in payload.participants:
             db.add(models.Participant(trip_id=trip.id, display_name=p.display_name, weight=p.weight))
+    db.add(models.TripSummary(trip_id=trip.id, participant_count=len(payload.participants or []),
+                              last_activity_at=datetime.utcnow()))
     db.commit()
     db.refresh(trip)
     return trip
 
-@router.get("", response_model=List[schemas.TripOut])
-def list_trips(db: Session = Depends(get_db), sub: str = Depends(require_user_sub)):
-    """List all trips (owned + shared)"""
-    # Get trips where user is owner
-    owned_trips = db.query(models.Trip).filter(models.Trip.owner_sub == sub).all()
-
-    # Get trips where user is a member
-    memberships = db.query(models.TripMember).filter(
-        models.TripMember.user_id == sub,
-        models.TripMember.invite_status == "accepted"
-    ).all()
-
-    shared_trip_ids = [m.trip_id for m in memberships]
-    shared_trips = db.query(models.Trip).filter(models.Trip.id.in_(shared_trip_ids)).all() if shared_trip_ids else []
-
-    # Combine and deduplicate
-    all_trips = {trip.id: trip for trip in owned_trips + shared_trips}
-    return list(all_trips.values())
+MAX_PAGE_SIZE = 500
+TRIP_FIELDS = [f for f in schemas.TripSummaryOut.model_fields if hasattr(models.Trip, f)]
+
+
+def _list_trips(db: Session, sub: str, limit: Optional[int], cursor: Optional[str]):
+    """Returns (TripSummaryOut rows, next_cursor), newest start date first"""
+    # Owned trips and accepted memberships in one UNION, joined to their summaries
+    access = union_all(
+        select(models.Trip.id.label("trip_id"), literal("owner").label("role")).where(models.Trip.owner_sub == sub),
+        # Only Trip.owner_sub makes an owner (see access.member_role_level)
+        select(models.TripMember.trip_id,
+               case((models.TripMember.role == "owner", "admin"), else_=models.TripMember.role).label("role"))
+        .join(models.Trip, models.Trip.id == models.TripMember.trip_id)
+        .where(models.TripMember.user_id == sub, models.TripMember.invite_status == "accepted",
+               models.Trip.owner_sub != sub),
+    ).subquery()
+    summary = models.TripSummary
+    query = (
+        select(models.Trip, access.c.role, summary.trip_id.label("summary_trip_id"), summary.participant_count,
+               summary.expense_count, summary.total_spent_cents, summary.last_activity_at)
+        .join(access, access.c.trip_id == models.Trip.id)
+        .outerjoin(summary, summary.trip_id == models.Trip.id)
+    )
 
-@router.get("/{trip_id}", response_model=schemas.TripOut)
-def get_trip(trip_id: int, db: Session = Depends(get_db), sub: str = Depends(require_user_sub)):
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+            after_start, after_id = date.fromisoformat(after["start_date"]), int(after["id"])
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(400, "Invalid cursor")
+        query = query.where(or_(
+            models.Trip.start_date < after_start,
+            and_(models.Trip.start_date == after_start, models.Trip.id < after_id)
+        ))
+
+    query = query.order_by(models.Trip.start_date.desc(), models.Trip.id.desc())
+    if limit is not None:
+        query = query.limit(limit + 1)
+    rows = db.execute(query).all()
+
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1].Trip
+        next_cursor = encode_cursor({"start_date": last.start_date.isoformat(), "id": last.id})
+
+    # Trips without a summary row yet are computed on the fly
+    missing = trip_summary.compute_trip_summaries(db, [r.Trip.id for r in rows if r.summary_trip_id is None])
+    trips = []
+    for row in rows:
+        figures = missing.get(row.Trip.id) or {
+            "participant_count": row.participant_count, "expense_count": row.expense_count,
+            "total_spent_cents": row.total_spent_cents, "last_activity_at": row.last_activity_at,
+        }
+        trips.append(schemas.TripSummaryOut(
+            **{f: getattr(row.Trip, f) for f in TRIP_FIELDS}, role=row.role,
+            participant_count=figures["participant_count"], expense_count=figures["expense_count"],
+            total_spent_home=from_cents(figures["total_spent_cents"]), last_activity_at=figures["last_activity_at"],
+        ))
+    return trips, next_cursor
+
+@router.get("", response_model=List[schemas.TripSummaryOut])
+async def list_trips(response: Response, limit: Optional[int] = None, cursor: Optional[str] = None,
+                     db=Depends(get_async_db), sub: str = Depends(require_user_sub)):
+    """
+    List trips the user owns or is a member of, newest start date first, with
+    their role, participant and expense counts, total spent and last activity.
+    Pass `limit` to page; the cursor for the next page is in X-Next-Cursor.
+    """
+    if limit is not None and not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(400, f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    trips, next_cursor = await db.run_sync(_list_trips, sub, limit, cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return trips
+
+def _get_trip(db: Session, trip_id: int, sub: str) -> schemas.TripOut:
+    return schemas.TripOut.model_validate(require_trip_access(db, trip_id, sub).trip, from_attributes=True)
+
+@router.get("/{trip_id}", response_model=schemas.TripOut, dependencies=[Depends(trip_etag(async_db=True))])
+async def get_trip(trip_id: int, db=Depends(get_async_db), sub: str = Depends(require_user_sub)):
     """Get trip details (owner or member)"""
-    trip = db.query(models.Trip).filter(models.Trip.id == trip_id).first()
-    if not trip:
-        raise HTTPException(404, "Trip not found")
-
-    # Check if user is owner or member
-    is_owner = trip.owner_sub == sub
-    is_member = db.query(models.TripMember).filter(
-        models.TripMember.trip_id == trip_id,
-        models.TripMember.user_id == sub,
-        models.TripMember.invite_status == "accepted"
-    ).first() is not None
-
-    if not (is_owner or is_member):
-        raise HTTPException(403, "Access denied")
-
-    return trip
+    return await db.run_sync(_get_trip, trip_id, sub)
 
 
 @router.put("/{trip_id}", response_model=schemas.TripOut)
@@ -76,21 +129,7 @@ def update_trip(
     sub: str = Depends(require_user_sub)
 ):
     """Update trip details (owner or admin only)"""
-    trip = db.query(models.Trip).filter(models.Trip.id == trip_id).first()
-    if not trip:
-        raise HTTPException(404, "Trip not found")
-
-    # Check if user is owner or admin
-    is_owner = trip.owner_sub == sub
-    membership = db.query(models.TripMember).filter(
-        models.TripMember.trip_id == trip_id,
-        models.TripMember.user_id == sub,
-        models.TripMember.invite_status == "accepted"
-    ).first()
-    is_admin = membership and membership.role == "admin"
-
-    if not (is_owner or is_admin):
-        raise HTTPException(403, "Only owner or admin can edit trip")
+    trip = require_trip_access(db, trip_id, sub, "admin", detail="Only owner or admin can edit trip").trip
 
     # Update fields
     if payload.title is not None:
@@ -114,16 +153,11 @@ def update_trip(
 @router.delete("/{trip_id}", response_model=dict)
 def delete_trip(trip_id: int, db: Session = Depends(get_db), sub: str = Depends(require_user_sub)):
     """Delete a trip (owner only)"""
-    trip = db.query(models.Trip).filter(models.Trip.id == trip_id).first()
-    if not trip:
-        raise HTTPException(404, "Trip not found")
-
-    # Only owner can delete the trip
-    if trip.owner_sub != sub:
-        raise HTTPException(403, "Only the trip owner can delete this trip")
+    trip = require_trip_access(db, trip_id, sub, "owner", detail="Only the trip owner can delete this trip").trip
 
     db.delete(trip)
     db.commit()
+    invalidate_trip_access(trip_id, db=db)
 
     return {"message": "Trip deleted successfully", "trip_id": trip_id}
 
@@ -169,6 +203,7 @@ def fix_trip_ownership(db: Session = Depends(get_db), sub: str = Depends(require
             member.user_id = sub
 
     db.commit()
+    invalidate_trip_access(db=db)
 
     return {
         "message": f"Successfully transferred ownership of {trips_updated} trip(s) to your account",
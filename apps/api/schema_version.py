@@ -0,0 +1,55 @@
+"""
+Startup schema check for Alembic-managed databases.
+
+Compares the database's `alembic_version` with the head revision(s) in
+alembic/versions. Heads are read from the migration files' `revision` /
+`down_revision` lines rather than by importing Alembic, so the check costs one
+small query and no extra imports.
+"""
+import re
+from pathlib import Path
+from typing import Set
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+
+VERSIONS_DIR = Path(__file__).parent / "alembic" / "versions"
+
+_REVISION_RE = re.compile(r"^revision\s*(?::[^=]*)?=\s*['\"]([^'\"]+)['\"]", re.M)
+_DOWN_REVISION_RE = re.compile(r"^down_revision\s*(?::[^=]*)?=\s*(.+)$", re.M)
+
+
+class SchemaVersionError(RuntimeError):
+    """The database isn't migrated to the revision this code expects"""
+
+
+def alembic_heads(versions_dir: Path = VERSIONS_DIR) -> Set[str]:
+    revisions, parents = set(), set()
+    for path in versions_dir.glob("*.py"):
+        source = path.read_text()
+        revision = _REVISION_RE.search(source)
+        if not revision:
+            continue
+        revisions.add(revision.group(1))
+        down = _DOWN_REVISION_RE.search(source)
+        if down:
+            parents.update(re.findall(r"['\"]([^'\"]+)['\"]", down.group(1)))
+    return revisions - parents
+
+
+def database_revisions(engine: Engine) -> Set[str]:
+    try:
+        with engine.connect() as conn:
+            return {row[0] for row in conn.execute(text("SELECT version_num FROM alembic_version"))}
+    except DBAPIError:
+        # No alembic_version table: never migrated
+        return set()
+
+
+def check_schema_version(engine: Engine, versions_dir: Path = VERSIONS_DIR):
+    expected, current = alembic_heads(versions_dir), database_revisions(engine)
+    if current != expected:
+        raise SchemaVersionError(
+            f"Database schema is at {', '.join(sorted(current)) or 'no revision'}, "
+            f"code expects {', '.join(sorted(expected))}; run `alembic upgrade head`"
+        )
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Dict, Optional, List, Literal
 from datetime import date, datetime
 
 class ParticipantCreate(BaseModel):
@@ -36,6 +36,24 @@ class TripOut(BaseModel):
     class Config: from_attributes = True
 
 
+class TripSummaryOut(BaseModel):
+    """A trip card on the trips list: trip fields plus the caller's role and denormalized totals"""
+    id: int
+    owner_sub: str
+    title: str
+    home_currency: str
+    start_date: date
+    end_date: date
+    total_budget: Optional[float] = None
+    per_diem_budget: Optional[float] = None
+    destination: Optional[str] = None
+    role: str
+    participant_count: int = 0
+    expense_count: int = 0
+    total_spent_home: float = 0.0
+    last_activity_at: Optional[datetime] = None
+
+
 class TripUpdate(BaseModel):
     title: Optional[str] = None
     destination: Optional[str] = None
@@ -79,6 +97,12 @@ class ExpenseCreate(BaseModel):
     fx_rate_to_home: Optional[float] = None
     splits: Optional[List[ExpenseSplitCreate]] = None
 
+class ExpenseEngagement(BaseModel):
+    """Comment count and reaction tallies of an expense, for expense cards"""
+    comment_count: int = 0
+    reactions: Dict[str, int] = {}  # emoji -> count
+    viewer_reactions: List[str] = []  # emojis the requesting user added
+
 class ExpenseOut(BaseModel):
     id: int
     dt: date
@@ -94,8 +118,36 @@ class ExpenseOut(BaseModel):
     payer_id: int
     fx_rate_to_home: Optional[float] = None
     splits: List[ExpenseSplitCreate] = []
+    engagement: Optional[ExpenseEngagement] = None  # only with ?engagement=true
     class Config: from_attributes = True
 
+class BulkImportError(BaseModel):
+    row: int
+    error: str
+
+class BulkImportResult(BaseModel):
+    inserted: int
+    errors: List[BulkImportError] = []
+
+class FxRateQuery(BaseModel):
+    on: date
+    from_ccy: str
+    to_ccy: str
+
+class FxBatchRequest(BaseModel):
+    items: List[FxRateQuery] = Field(max_length=500)
+
+class FxRateResult(BaseModel):
+    on: date
+    from_ccy: str
+    to_ccy: str
+    rate: Optional[float] = None
+    cached: bool = False
+    error: Optional[str] = None
+
+class FxBatchResponse(BaseModel):
+    rates: List[FxRateResult]
+
 class BalanceLine(BaseModel):
     participant_id: int
     net_amount_home: float
@@ -188,6 +240,15 @@ class DailyTrends(BaseModel):
     per_diem_budget: Optional[float]
     projected_total: float
 
+class CategoryTotal(BaseModel):
+    category: str
+    total: float
+
+class AnalyticsSummary(BaseModel):
+    budget: BudgetAnalytics
+    daily_trends: DailyTrends
+    category_breakdown: List[CategoryTotal]
+
 
 # ==================== Multi-User Collaboration Schemas ====================
 
@@ -232,7 +293,7 @@ class TripMemberOut(BaseModel):
 
 class TripMemberUpdate(BaseModel):
     """Update trip member role or status"""
-    role: Optional[str] = None
+    role: Optional[Literal["admin", "member", "viewer"]] = None
     invite_status: Optional[str] = None
 
 
@@ -302,3 +363,10 @@ class ReactionOut(BaseModel):
     created_at: datetime
     user: Optional[UserProfileOut] = None
     class Config: from_attributes = True
+
+
+class ExpenseThreadOut(BaseModel):
+    """Comments and reactions of one expense, for bulk engagement fetches"""
+    expense_id: int
+    comments: List[CommentOut] = []
+    reactions: List[ReactionOut] = []
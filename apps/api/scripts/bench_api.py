@@ -0,0 +1,200 @@
+"""
+API benchmark suite: per-endpoint latency and query-count budgets.
+
+Generates datasets of several sizes (datagen presets, one user prefix each) into
+a scratch database, starts the app in-process with TestClient and requests each
+key endpoint --samples times per dataset, recording p50/p95/p99 latency and the
+number of SQL statements per request.
+
+Query counts are compared with the committed baseline
+(scripts/baselines/bench_api.json): an endpoint issuing more statements than
+its baseline fails the run (an N+1 shows up as a count that grows with the
+dataset). Latency depends on the machine, so against the committed baseline a
+p95 beyond --max-regression-pct plus --slack-ms is only a warning. To gate on
+latency too, record a baseline on the machine that runs the suite
+(--record, once; kept out of git) and later runs fail on p95 regressions
+against it.
+
+Usage:
+    python scripts/bench_api.py                                   # run and compare to the stored baselines
+    python scripts/bench_api.py --datasets small,wide --samples 50
+    python scripts/bench_api.py --record                          # first run on this machine: save its latencies
+    python scripts/bench_api.py --output scripts/baselines/bench_api.json   # refresh the committed baseline
+"""
+import os
+import sys
+import time
+import json
+import argparse
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+API_DIR = Path(__file__).parent.parent
+DEFAULT_BASELINE = Path(__file__).parent / "baselines" / "bench_api.json"
+# Latency recorded on this machine with --record; gitignored
+LOCAL_BASELINE = Path(__file__).parent / "baselines" / "bench_api.local.json"
+
+DATASETS = {
+    "small": dict(preset="small"),
+    "medium": dict(preset="medium"),
+    "wide": dict(preset="wide", trips=4),
+}
+
+# (label, path template); {trip_id} is the dataset's benchmark trip
+ENDPOINTS = [
+    ("GET /trips", "/trips"),
+    ("GET /trips/{trip_id}", "/trips/{trip_id}"),
+    ("GET /expenses/{trip_id}", "/expenses/{trip_id}"),
+    ("GET /expenses/{trip_id}?limit=50", "/expenses/{trip_id}?limit=50"),
+    ("GET /balances/{trip_id}/net", "/balances/{trip_id}/net"),
+    ("GET /balances/{trip_id}/settlements", "/balances/{trip_id}/settlements"),
+    ("GET /analytics/{trip_id}/summary", "/analytics/{trip_id}/summary"),
+    ("GET /analytics/{trip_id}/budget-vs-actual", "/analytics/{trip_id}/budget-vs-actual"),
+    ("GET /analytics/{trip_id}/daily-trends", "/analytics/{trip_id}/daily-trends"),
+    ("GET /analytics/{trip_id}/category-breakdown", "/analytics/{trip_id}/category-breakdown"),
+    ("GET /trips/{trip_id}/activity", "/trips/{trip_id}/activity"),
+]
+
+class QueryCounter:
+    """Counts SQL statements sent by any engine"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+def measure(client, path: str, headers, counter: QueryCounter, samples: int, warmup: int):
+    latencies, queries = [], []
+    for i in range(warmup + samples):
+        before = counter.count
+        t0 = time.perf_counter()
+        r = client.get(path, headers=headers)
+        elapsed = (time.perf_counter() - t0) * 1000
+        if r.status_code != 200:
+            raise RuntimeError(f"GET {path} returned {r.status_code}: {r.text[:200]}")
+        if i >= warmup:
+            latencies.append(elapsed)
+            queries.append(counter.count - before)
+    return {
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "queries": max(queries),
+    }
+
+def compare(results, baseline, latency_baseline, max_regression_pct: float, slack_ms: float) -> bool:
+    """
+    Print per-endpoint changes; True unless queries grew against `baseline` or
+    p95 regressed against `latency_baseline` (same-machine figures, if any).
+    p95 regressions against `baseline` alone are printed as warnings.
+    """
+    ok = True
+    for key, now in results.items():
+        before = baseline.get(key)
+        local = (latency_baseline or {}).get(key)
+        if before is None and local is None:
+            print(f"· {key}: new (p95 {now['p95_ms']:.1f} ms, {now['queries']} queries)")
+            continue
+        problems, warnings = [], []
+        if before is not None and now["queries"] > before["queries"]:
+            problems.append(f"queries {before['queries']} → {now['queries']}")
+        reference = local or before
+        budget = reference["p95_ms"] * (1 + max_regression_pct / 100) + slack_ms
+        if now["p95_ms"] > budget:
+            message = f"p95 {reference['p95_ms']:.1f} → {now['p95_ms']:.1f} ms (budget {budget:.1f})"
+            (problems if local is not None else warnings).append(message)
+        ok = ok and not problems
+        mark = "✗" if problems else "!" if warnings else "✓"
+        queries = now["queries"] if before is None else f"{now['queries']}/{before['queries']}"
+        detail = "; ".join(problems + warnings) or f"p95 {reference['p95_ms']:.1f} → {now['p95_ms']:.1f} ms"
+        print(f"{mark} {key}: {detail}, {queries} queries")
+    if latency_baseline is None:
+        print("\nLatency warnings (!) compare with another machine's figures; run with --record to gate on them here.")
+    return ok
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite:////tmp/bench_api.db")
+    parser.add_argument("--datasets", default=",".join(DATASETS), help=f"Comma-separated: {', '.join(DATASETS)}")
+    parser.add_argument("--samples", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write results as JSON (e.g. to refresh the baseline)")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE) if DEFAULT_BASELINE.exists() else None,
+                        help="Committed baseline: query counts gate, latency only warns")
+    parser.add_argument("--latency-baseline", default=str(LOCAL_BASELINE),
+                        help="Same-machine baseline whose p95s gate the run, when it exists")
+    parser.add_argument("--record", action="store_true",
+                        help="Save this run as the --latency-baseline (e.g. the first run on a machine)")
+    parser.add_argument("--max-regression-pct", type=float, default=50.0)
+    parser.add_argument("--slack-ms", type=float, default=5.0, help="Absolute p95 allowance on top of the percentage")
+    args = parser.parse_args()
+
+    url = args.database_url
+    if url.startswith("sqlite:///") and not url.startswith("sqlite:///:memory:"):
+        Path(url[len("sqlite:///"):]).unlink(missing_ok=True)
+    os.environ.update(DATABASE_URL=url, SCHEMA_MANAGEMENT="create_all")
+
+    # The app binds its engine on import, so import after DATABASE_URL is set
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from datagen import DatasetSpec, generate_dataset
+    from database import SessionLocal
+    import main
+
+    results = {}
+    counter = QueryCounter()
+    with TestClient(main.app) as client:
+        for name in args.datasets.split(","):
+            options = dict(DATASETS[name])
+            spec = DatasetSpec.preset(options.pop("preset"), seed=args.seed, prefix=f"bench-{name}", **options)
+            db = SessionLocal()
+            try:
+                t0 = time.perf_counter()
+                dataset = generate_dataset(db, spec)
+            finally:
+                db.close()
+            trip_id = dataset["trip_ids"][len(dataset["trip_ids"]) // 2]
+            print(f"{name}: {dataset['trips']} trips, {dataset['expenses']} expenses "
+                  f"(generated in {time.perf_counter() - t0:.1f}s); benchmarking trip {trip_id}")
+
+            headers = {"x-user-sub": dataset["owners"][0]}
+            event.listen(Engine, "before_cursor_execute", counter)
+            try:
+                for label, template in ENDPOINTS:
+                    stats = measure(client, template.format(trip_id=trip_id), headers, counter,
+                                    args.samples, args.warmup)
+                    results[f"{name} {label}"] = stats
+                    print(f"  {label:<44} p50 {stats['p50_ms']:7.1f}  p95 {stats['p95_ms']:7.1f}  "
+                          f"p99 {stats['p99_ms']:7.1f} ms  {stats['queries']:3d} queries")
+            finally:
+                event.remove(Engine, "before_cursor_execute", counter)
+            print()
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(json.dumps(results, indent=2, ensure_ascii=False) + "\n")
+        print(f"Wrote {args.output}")
+
+    if args.record:
+        Path(args.latency_baseline).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.latency_baseline).write_text(json.dumps(results, indent=2, ensure_ascii=False) + "\n")
+        print(f"Recorded this machine's latencies in {args.latency_baseline}")
+
+    if args.baseline and Path(args.baseline).resolve() != Path(args.output or "").resolve():
+        print(f"Comparing with {args.baseline}")
+        baseline = json.loads(Path(args.baseline).read_text())
+        latency_baseline = results if args.record else None  # just recorded: nothing to gate on
+        if not args.record and Path(args.latency_baseline).exists():
+            print(f"Latency budgets from {args.latency_baseline}")
+            latency_baseline = json.loads(Path(args.latency_baseline).read_text())
+        sys.exit(0 if compare(results, baseline, latency_baseline, args.max_regression_pct, args.slack_ms) else 1)
+
+if __name__ == "__main__":
+    run()
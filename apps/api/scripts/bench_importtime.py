@@ -0,0 +1,118 @@
+"""
+Cold-start benchmark: `python -X importtime -c "import main"`.
+
+Runs a fresh interpreter per sample, parses the importtime report, and prints
+the median cumulative import time of `main` plus the slowest top-level
+packages. Also times interpreter start through app startup (lifespan, which
+runs the schema check or create_all). Save results with --output and compare
+later runs with --baseline; the script exits 1 when `main` regresses by more
+than --max-regression-pct.
+
+Usage:
+    python scripts/bench_importtime.py
+    python scripts/bench_importtime.py --runs 10 --output importtime.json
+    python scripts/bench_importtime.py --baseline importtime.json --max-regression-pct 15
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from collections import defaultdict
+from pathlib import Path
+
+API_DIR = Path(__file__).parent.parent
+
+STARTUP_SNIPPET = (
+    "from fastapi.testclient import TestClient\n"
+    "import main\n"
+    "with TestClient(main.app):\n"
+    "    pass\n"
+)
+
+def parse_importtime(stderr: str):
+    """{module: (self_us, cumulative_us)} from -X importtime output"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            self_us, cumulative_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # header line
+        modules[parts[2].strip()] = (self_us, cumulative_us)
+    return modules
+
+def sample_importtime(env):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                            cwd=API_DIR, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import main failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+def sample_startup(env) -> float:
+    t0 = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", STARTUP_SNIPPET], cwd=API_DIR, env=env,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"app startup failed:\n{result.stderr[-2000:]}")
+    return (time.perf_counter() - t0) * 1000
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--database-url", default="sqlite:////tmp/bench_importtime.db")
+    parser.add_argument("--output", help="Write results as JSON")
+    parser.add_argument("--baseline", help="Compare against a JSON file written by --output")
+    parser.add_argument("--max-regression-pct", type=float, default=20.0)
+    args = parser.parse_args()
+
+    env = dict(os.environ, DATABASE_URL=args.database_url, PYTHONDONTWRITEBYTECODE="0")
+    sample_importtime(env)  # warm the bytecode cache so runs measure imports, not compilation
+
+    main_ms, package_ms = [], defaultdict(list)
+    for _ in range(args.runs):
+        modules = sample_importtime(env)
+        main_ms.append(modules["main"][1] / 1000)
+        # Attribute self time to top-level packages
+        totals = defaultdict(int)
+        for name, (self_us, _) in modules.items():
+            totals[name.split(".")[0]] += self_us
+        for package, us in totals.items():
+            package_ms[package].append(us / 1000)
+    startup_ms = [sample_startup(env) for _ in range(args.runs)]
+
+    results = {
+        "import_main_ms": round(statistics.median(main_ms), 1),
+        "startup_ms": round(statistics.median(startup_ms), 1),
+        "packages_ms": {p: round(statistics.median(v), 1) for p, v in
+                        sorted(package_ms.items(), key=lambda kv: -statistics.median(kv[1]))[:args.top]},
+    }
+
+    print(f"import main (median of {args.runs}): {results['import_main_ms']:.1f} ms")
+    print(f"interpreter + app startup:          {results['startup_ms']:.1f} ms\n")
+    print("Slowest packages (self time):")
+    for package, ms in results["packages_ms"].items():
+        print(f"  {ms:8.1f} ms  {package}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2) + "\n")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        print()
+        regressed = False
+        for key in ("import_main_ms", "startup_ms"):
+            before, after = baseline[key], results[key]
+            change = (after - before) / before * 100 if before else 0.0
+            bad = key == "import_main_ms" and change > args.max_regression_pct
+            regressed = regressed or bad
+            print(f"{'✗' if bad else '✓'} {key}: {before:.1f} → {after:.1f} ms ({change:+.1f}%)")
+        sys.exit(1 if regressed else 0)
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,55 @@
+"""
+Benchmark: greedy min_cash_flow vs optimal_cash_flow.
+
+Generates random trip balances (deterministic from --seed) for several group
+sizes and reports average transfer counts and latency for both solvers.
+
+Usage:
+    python scripts/bench_settlements.py
+    python scripts/bench_settlements.py --sizes 5 10 15 20 25 30 --runs 20 --seed 3
+"""
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils import min_cash_flow, optimal_cash_flow, OPTIMAL_TIME_BUDGET_S
+
+def random_balances(rng: random.Random, n: int):
+    """Balances shaped like a real trip: a few big payers, many small debtors, round-ish amounts"""
+    cents = [rng.choice([-1, 1]) * rng.choice([rng.randint(1, 40) * 500, rng.randint(1, 20000)]) for _ in range(n - 1)]
+    cents.append(-sum(cents))
+    return {pid: c / 100 for pid, c in enumerate(cents, start=1)}
+
+def timed(fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - t0) * 1000
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 10, 15, 20, 25, 30])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--time-budget-s", type=float, default=OPTIMAL_TIME_BUDGET_S)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'people':>6} {'greedy tx':>10} {'optimal tx':>11} {'saved':>6} {'greedy ms':>10} {'optimal ms':>11}")
+    for n in args.sizes:
+        g_tx = o_tx = g_ms = o_ms = 0.0
+        for _ in range(args.runs):
+            balances = random_balances(rng, n)
+            greedy, g = timed(min_cash_flow, balances)
+            optimal, o = timed(optimal_cash_flow, balances, time_budget_s=args.time_budget_s)
+            g_tx += len(greedy)
+            o_tx += len(optimal)
+            g_ms += g
+            o_ms += o
+        r = args.runs
+        print(f"{n:>6} {g_tx / r:>10.1f} {o_tx / r:>11.1f} {(g_tx - o_tx) / r:>6.1f} {g_ms / r:>10.2f} {o_ms / r:>11.2f}")
+
+if __name__ == "__main__":
+    run()
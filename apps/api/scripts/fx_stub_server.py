@@ -0,0 +1,86 @@
+"""
+Local stub of the upstream FX API for testing the FX service offline.
+
+Serves `GET /{YYYY-MM-DD}?base=XXX&symbols=AAA,BBB` with deterministic rates
+derived from the date and currency pair, in the same shape as the real API.
+Point the API at it with FX_BASE_URL=http://127.0.0.1:8099.
+
+Usage:
+    python scripts/fx_stub_server.py
+    python scripts/fx_stub_server.py --port 8099 --delay-ms 200 --missing XTS
+"""
+import json
+import time
+import zlib
+import argparse
+import threading
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+def stub_rate(on: str, base: str, symbol: str) -> float:
+    """Deterministic rate in (0.5, 2.5); inverse pairs aren't reciprocal, which is fine for a stub"""
+    if base == symbol:
+        return 1.0
+    return round(0.5 + (zlib.crc32(f"{on}:{base}:{symbol}".encode()) % 20000) / 10000, 6)
+
+
+def make_handler(delay_s: float, missing: set):
+    counter = {"requests": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            with lock:
+                counter["requests"] += 1
+                n = counter["requests"]
+            url = urlparse(self.path)
+            on = url.path.strip("/")
+            try:
+                date.fromisoformat(on)
+            except ValueError:
+                self.send_error(404, "Unknown date")
+                return
+            query = parse_qs(url.query)
+            base = query.get("base", ["EUR"])[0].upper()
+            symbols = [s.upper() for s in query.get("symbols", [""])[0].split(",") if s]
+            if delay_s:
+                time.sleep(delay_s)
+
+            rates = {s: stub_rate(on, base, s) for s in symbols if s not in missing}
+            body = json.dumps({"base": base, "date": on, "rates": rates}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            print(f"#{n} {on} {base} -> {','.join(symbols) or '-'}", flush=True)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--delay-ms", type=float, default=0, help="Simulated upstream latency per request")
+    parser.add_argument("--missing", default="", help="Comma-separated symbols to leave out of responses")
+    args = parser.parse_args()
+
+    missing = {s.strip().upper() for s in args.missing.split(",") if s.strip()}
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args.delay_ms / 1000, missing))
+    print(f"✓ FX stub listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,58 @@
+"""
+Rebuild or verify the per-trip balance ledger (trip_balances).
+
+Usage:
+    python scripts/rebuild_ledger.py              # rebuild every trip
+    python scripts/rebuild_ledger.py --check      # compare ledger to a full recompute, no writes
+    python scripts/rebuild_ledger.py --trip-id 3  # limit to one trip
+"""
+import sys
+import argparse
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import Trip
+import ledger
+
+def check_trip(db: Session, trip_id: int) -> bool:
+    """Return True when the ledger matches a full recompute"""
+    expected = ledger.recompute_trip_balances(db, trip_id)
+    actual = ledger.read_trip_balances(db, trip_id)
+    drift = {
+        pid: (actual.get(pid, 0), cents)
+        for pid, cents in expected.items()
+        if actual.get(pid, 0) != cents
+    }
+    for pid, (have, want) in drift.items():
+        print(f"  ✗ trip {trip_id} participant {pid}: ledger={have} recompute={want} (cents)")
+    return not drift
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trip-id", type=int, default=None)
+    parser.add_argument("--check", action="store_true", help="Only verify, do not write")
+    args = parser.parse_args()
+
+    db: Session = SessionLocal()
+    try:
+        query = db.query(Trip.id).order_by(Trip.id)
+        if args.trip_id is not None:
+            query = query.filter(Trip.id == args.trip_id)
+        trip_ids = [tid for (tid,) in query.all()]
+
+        if args.check:
+            bad = [tid for tid in trip_ids if not check_trip(db, tid)]
+            print(f"Checked {len(trip_ids)} trip(s): {len(bad)} with drift")
+            sys.exit(1 if bad else 0)
+
+        for tid in trip_ids:
+            ledger.rebuild_trip_ledger(db, tid)
+        db.commit()
+        print(f"✓ Rebuilt ledger for {len(trip_ids)} trip(s)")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,70 @@
+"""
+Rebuild or verify the denormalized trip summaries (trip_summaries).
+
+Usage:
+    python scripts/rebuild_trip_summaries.py              # rebuild every trip
+    python scripts/rebuild_trip_summaries.py --check      # compare to a full recompute, no writes
+    python scripts/rebuild_trip_summaries.py --trip-id 3  # limit to one trip
+"""
+import sys
+import argparse
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import Trip, TripSummary
+import trip_summary
+
+BATCH = 500
+FIELDS = ("participant_count", "expense_count", "total_spent_cents", "last_activity_at")
+
+def check(db: Session, trip_ids) -> int:
+    """Number of trips whose stored summary differs from a recompute"""
+    bad = 0
+    for i in range(0, len(trip_ids), BATCH):
+        batch = trip_ids[i:i + BATCH]
+        expected = trip_summary.compute_trip_summaries(db, batch)
+        stored = {s.trip_id: s for s in db.query(TripSummary).filter(TripSummary.trip_id.in_(batch))}
+        for tid in batch:
+            row = stored.get(tid)
+            if row is None:
+                print(f"  · trip {tid}: no summary row (computed on read)")
+                continue
+            drift = {f: (getattr(row, f), expected[tid][f]) for f in FIELDS if getattr(row, f) != expected[tid][f]}
+            # Writes move last_activity_at forward even without an activity log entry
+            if "last_activity_at" in drift and (drift["last_activity_at"][1] is None
+                                                or drift["last_activity_at"][0] > drift["last_activity_at"][1]):
+                del drift["last_activity_at"]
+            for field, (have, want) in drift.items():
+                print(f"  ✗ trip {tid} {field}: stored={have} recompute={want}")
+            bad += bool(drift)
+    return bad
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trip-id", type=int, default=None)
+    parser.add_argument("--check", action="store_true", help="Only verify, do not write")
+    args = parser.parse_args()
+
+    db: Session = SessionLocal()
+    try:
+        query = db.query(Trip.id).order_by(Trip.id)
+        if args.trip_id is not None:
+            query = query.filter(Trip.id == args.trip_id)
+        trip_ids = [tid for (tid,) in query.all()]
+
+        if args.check:
+            bad = check(db, trip_ids)
+            print(f"Checked {len(trip_ids)} trip(s): {bad} with drift")
+            sys.exit(1 if bad else 0)
+
+        for i in range(0, len(trip_ids), BATCH):
+            trip_summary.rebuild_trip_summaries(db, trip_ids[i:i + BATCH])
+            db.commit()
+        print(f"✓ Rebuilt summaries for {len(trip_ids)} trip(s)")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    run()
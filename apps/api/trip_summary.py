@@ -0,0 +1,95 @@
+"""
+Denormalized trip summaries for the trips list.
+
+`trip_summaries` holds each trip's participant and expense counts, total spent
+in home-currency cents and last activity time. Writes adjust it with relative
+UPDATEs in the same transaction (expense posts go through ledger.post_expense),
+so listing trips is one query instead of loading every trip's participants.
+Trips without a row (created before the table, or bulk-loaded) are computed on
+read and seeded before the first write.
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+from sqlalchemy import case, func, update
+from sqlalchemy.orm import Session
+import models
+from utils import expense_total_cents
+
+
+def compute_trip_summaries(db: Session, trip_ids: Iterable[int]) -> Dict[int, Dict]:
+    """Summary figures for trips from the source tables"""
+    trip_ids = list(trip_ids)
+    summaries = {tid: {"participant_count": 0, "expense_count": 0, "total_spent_cents": 0, "last_activity_at": None}
+                 for tid in trip_ids}
+    if not trip_ids:
+        return summaries
+
+    for tid, n in db.query(models.Participant.trip_id, func.count(models.Participant.id)).filter(
+        models.Participant.trip_id.in_(trip_ids)
+    ).group_by(models.Participant.trip_id):
+        summaries[tid]["participant_count"] = n
+
+    # Summed in Python so cents round exactly as the ledger does
+    totals, counts = defaultdict(int), defaultdict(int)
+    for tid, amount, fx in db.query(models.Expense.trip_id, models.Expense.amount, models.Expense.fx_rate_to_home).filter(
+        models.Expense.trip_id.in_(trip_ids)
+    ).yield_per(5000):
+        totals[tid] += expense_total_cents(amount, fx)
+        counts[tid] += 1
+    for tid in counts:
+        summaries[tid]["expense_count"] = counts[tid]
+        summaries[tid]["total_spent_cents"] = totals[tid]
+
+    for tid, at in db.query(models.ActivityLog.trip_id, func.max(models.ActivityLog.created_at)).filter(
+        models.ActivityLog.trip_id.in_(trip_ids)
+    ).group_by(models.ActivityLog.trip_id):
+        summaries[tid]["last_activity_at"] = at
+    return summaries
+
+
+def rebuild_trip_summaries(db: Session, trip_ids: Iterable[int]) -> Dict[int, Dict]:
+    """Replace the summary rows of trips with a full recompute. Does not commit."""
+    summaries = compute_trip_summaries(db, trip_ids)
+    if not summaries:
+        return summaries
+    db.query(models.TripSummary).filter(models.TripSummary.trip_id.in_(list(summaries))).delete(
+        synchronize_session=False
+    )
+    db.add_all([models.TripSummary(trip_id=tid, **values) for tid, values in summaries.items()])
+    db.flush()
+    return summaries
+
+
+def ensure_trip_summary(db: Session, trip_id: int):
+    """Seed a trip's summary before applying deltas to it. Does not commit."""
+    if db.get(models.TripSummary, trip_id) is None:
+        rebuild_trip_summaries(db, [trip_id])
+
+
+def apply(db: Session, trip_id: int, participants: int = 0, expenses: int = 0, spent_cents: int = 0,
+          at: Optional[datetime] = None):
+    """
+    Adjust a trip's summary and move its last activity forward to `at` (now by
+    default). A missing row is rebuilt from the source tables instead, so
+    callers either ensure_trip_summary() first or apply after flushing their change.
+    """
+    at = at or datetime.utcnow()
+    summary = models.TripSummary
+    result = db.execute(
+        update(summary)
+        .where(summary.trip_id == trip_id)
+        .values(
+            participant_count=summary.participant_count + participants,
+            expense_count=summary.expense_count + expenses,
+            total_spent_cents=summary.total_spent_cents + spent_cents,
+            last_activity_at=case(
+                ((summary.last_activity_at.is_(None)) | (summary.last_activity_at < at), at),
+                else_=summary.last_activity_at,
+            ),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        db.flush()
+        rebuild_trip_summaries(db, [trip_id])
@@ -0,0 +1,157 @@
+"""
+Per-trip version counters and conditional GETs.
+
+`trips.version` goes up in every transaction that adds, changes or deletes the
+trip or a row under it. A before_flush listener on all Sessions collects the
+trip ids of pending rows (comments, reactions and splits through their expense)
+and bumps each once per transaction with a relative UPDATE, so mutating routes
+need no explicit call. Core statements that bypass the ORM call bump()
+themselves; derived rows (ledger, summaries) don't count. User profiles are
+embedded in trip responses (members, activity actors, comment and reaction
+authors), so changing one bumps every trip that can show it.
+
+GET routes under a trip depend on trip_etag(): after the access check it sends
+a weak ETag built from the version and the viewer, and answers a matching
+If-None-Match with 304 before the route runs any query of its own. The version
+is read before the route's data, so a concurrent write can only make the ETag
+older than the body, never newer.
+"""
+import os
+import hashlib
+from typing import Iterable, Optional, Set
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy import event, select, union, update
+from sqlalchemy.orm import Session
+from auth import require_user_sub
+from access import resolve_trip_access
+from database import get_db, get_async_db
+import models
+
+CONDITIONAL_GET = os.environ.get("CONDITIONAL_GET", "true").lower() == "true"
+
+# Projections of other rows; they change only alongside rows that bump already
+DERIVED_MODELS = (models.TripBalance, models.TripSummary)
+
+_SESSION_KEY = "trip_versions_bumped"
+
+
+def bump(db: Session, trip_ids: Iterable[int]):
+    """Increment trip versions. Does not commit."""
+    trip_ids = sorted(set(trip_ids))
+    if trip_ids:
+        db.execute(
+            update(models.Trip)
+            .where(models.Trip.id.in_(trip_ids))
+            .values(version=models.Trip.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def profile_trip_ids(session: Session, user_id: str) -> Set[int]:
+    """Trips whose responses can include a user's profile"""
+    m = models
+    trips = union(
+        select(m.Trip.id).where(m.Trip.owner_sub == user_id),
+        select(m.TripMember.trip_id).where(m.TripMember.user_id == user_id),
+        select(m.ActivityLog.trip_id).where(m.ActivityLog.user_id == user_id),
+        select(m.Expense.trip_id).join(m.Comment, m.Comment.expense_id == m.Expense.id).where(m.Comment.user_id == user_id),
+        select(m.Expense.trip_id).join(m.Reaction, m.Reaction.expense_id == m.Expense.id).where(m.Reaction.user_id == user_id),
+    )
+    return set(session.execute(trips).scalars())
+
+
+def _trip_id(session: Session, obj) -> Optional[int]:
+    if isinstance(obj, DERIVED_MODELS):
+        return None
+    if isinstance(obj, models.Trip):
+        return obj.id
+    trip_id = getattr(obj, "trip_id", None)
+    if trip_id is None and getattr(obj, "expense_id", None) is not None:
+        # Usually already in the identity map from the route's access check
+        expense = session.get(models.Expense, obj.expense_id)
+        trip_id = expense.trip_id if expense is not None else None
+    return trip_id
+
+
+def _before_flush(session: Session, flush_context, instances):
+    changed = [obj for obj in session.dirty if session.is_modified(obj, include_collections=False)]
+    changed += [obj for obj in session.new if not isinstance(obj, models.Trip)]
+    changed += [obj for obj in session.deleted if not isinstance(obj, models.Trip)]
+    if not changed:
+        return
+    bumped: Set[int] = session.info.setdefault(_SESSION_KEY, set())
+    trip_ids = {_trip_id(session, obj) for obj in changed} - {None}
+    # Edited profiles (new ones aren't shown anywhere yet); rare, so the lookup is fine
+    for obj in changed:
+        if isinstance(obj, models.UserProfile) and obj not in session.new:
+            trip_ids |= profile_trip_ids(session, obj.id)
+    trip_ids -= bumped
+    # Trips being deleted in this flush have nothing left to version
+    trip_ids -= {obj.id for obj in session.deleted if isinstance(obj, models.Trip)}
+    if trip_ids:
+        bump(session, trip_ids)
+        bumped.update(trip_ids)
+
+
+def _reset(session: Session, *args):
+    session.info.pop(_SESSION_KEY, None)
+
+
+def install():
+    """Bump versions on every Session's flush"""
+    if not event.contains(Session, "before_flush", _before_flush):
+        event.listen(Session, "before_flush", _before_flush)
+        event.listen(Session, "after_commit", _reset)
+        event.listen(Session, "after_rollback", _reset)
+
+
+def make_etag(trip_id: int, version: int, user_sub: str) -> str:
+    # Bodies can differ by viewer (role, own reactions), so the viewer is part of the tag
+    viewer = hashlib.blake2s(user_sub.encode(), digest_size=4).hexdigest()
+    return f'W/"{trip_id}.{version}.{viewer}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison against an If-None-Match header"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    strip = lambda tag: tag.strip().removeprefix("W/")
+    return strip(etag) in {strip(tag) for tag in if_none_match.split(",")}
+
+
+def current_etag(db: Session, trip_id: int, user_sub: str, min_role: str) -> Optional[str]:
+    """The viewer's ETag for a trip, or None when the route will refuse them anyway"""
+    access = resolve_trip_access(db, trip_id, user_sub)
+    if access.role is None or not access.has_role(min_role):
+        return None
+    return make_etag(trip_id, access.trip.version, user_sub)
+
+
+def _respond(request: Request, response: Response, etag: Optional[str]):
+    if etag is None:
+        return
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(304, headers=headers)
+    response.headers.update(headers)
+
+
+def trip_etag(min_role: str = "viewer", async_db: bool = False):
+    """
+    Route dependency for GETs under /{trip_id}. Pass the route's own min_role
+    so a 304 never answers someone the route would refuse, and async_db=True on
+    routes using get_async_db so both share one session (and its access memo).
+    """
+    if async_db:
+        async def dependency(trip_id: int, request: Request, response: Response,
+                             db=Depends(get_async_db), sub: str = Depends(require_user_sub)):
+            if CONDITIONAL_GET:
+                _respond(request, response, await db.run_sync(current_etag, trip_id, sub, min_role))
+    else:
+        def dependency(trip_id: int, request: Request, response: Response,
+                       db: Session = Depends(get_db), sub: str = Depends(require_user_sub)):
+            if CONDITIONAL_GET:
+                _respond(request, response, current_etag(db, trip_id, sub, min_role))
+    return dependency
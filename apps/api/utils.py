@@ -1,3 +1,6 @@
+import json
+import time
+import base64
 from typing import Dict, List
 from decimal import Decimal, ROUND_HALF_UP
 
@@ -7,6 +10,11 @@ def to_cents(value: float) -> int:
 def from_cents(cents: int) -> float:
     return float(Decimal(cents) / Decimal(100))
 
+def expense_total_cents(amount, fx_rate_to_home) -> int:
+    """An expense's amount in home-currency cents"""
+    # Amounts are stored as Numeric(12,2); round request floats the same way
+    return to_cents(round(float(amount), 2) * (fx_rate_to_home or 1.0))
+
 def min_cash_flow(balances: Dict[int, float]) -> List[Dict]:
     # balances: participant_id -> net_amount (positive = should receive, negative = owes)
     cents = {pid: to_cents(v) for pid, v in balances.items() if abs(v) > 1e-8}
@@ -35,3 +43,114 @@ def min_cash_flow(balances: Dict[int, float]) -> List[Dict]:
         if d_amt == 0: i += 1
         if c_amt == 0: j += 1
     return settlements
+
+
+OPTIMAL_MAX_PARTICIPANTS = 20
+OPTIMAL_TIME_BUDGET_S = 1.0
+
+
+class SolverTimeout(Exception):
+    pass
+
+
+def _zero_sum_groups(amounts: List[int], deadline: float) -> List[List[int]]:
+    """
+    Partition indexes of amounts (summing to zero) into the maximum number of
+    zero-sum groups. Bitmask DP: dp[mask] is the most zero-sum groups that
+    the members of mask can be split into along some ordering of them.
+    """
+    n = len(amounts)
+    full = (1 << n) - 1
+    sums = [0] * (full + 1)
+    dp = [0] * (full + 1)
+    for mask in range(1, full + 1):
+        if not mask & 0xFFF and time.perf_counter() > deadline:
+            raise SolverTimeout()
+        low = mask & -mask
+        rest = mask ^ low
+        sums[mask] = sums[rest] + amounts[low.bit_length() - 1]
+        best = 0
+        m = mask
+        while m:
+            b = m & -m
+            v = dp[mask ^ b]
+            if v > best:
+                best = v
+            m ^= b
+        dp[mask] = best + (1 if sums[mask] == 0 else 0)
+
+    # Walk back down, cutting a group each time the remaining mask sums to zero
+    groups, current, mask = [], [], full
+    while mask:
+        zero = 1 if sums[mask] == 0 else 0
+        if zero and current:
+            groups.append(current)
+            current = []
+        m = mask
+        while m:
+            b = m & -m
+            if dp[mask ^ b] + zero == dp[mask]:
+                break
+            m ^= b
+        current.append(b.bit_length() - 1)
+        mask ^= b
+    if current:
+        groups.append(current)
+    return groups
+
+
+def optimal_cash_flow(balances: Dict[int, float],
+                      max_participants: int = OPTIMAL_MAX_PARTICIPANTS,
+                      time_budget_s: float = OPTIMAL_TIME_BUDGET_S) -> List[Dict]:
+    """
+    Minimum number of transfers: settle each zero-sum subgroup on its own, so
+    a group of k people needs k - 1 transfers. Exact up to max_participants
+    non-zero balances; falls back to min_cash_flow above that or when the
+    time budget runs out.
+    """
+    cents = {pid: to_cents(v) for pid, v in balances.items() if abs(v) > 1e-8}
+    cents = {pid: amt for pid, amt in cents.items() if amt != 0}
+
+    # A debtor and creditor with exactly opposite balances always settle in one transfer
+    settlements = []
+    by_amount = {}
+    for pid, amt in sorted(cents.items()):
+        match = by_amount.get(-amt)
+        if match:
+            other = match.pop()
+            frm, to = (pid, other) if amt < 0 else (other, pid)
+            settlements.append({"from_participant_id": frm, "to_participant_id": to, "amount_home": from_cents(abs(amt))})
+        else:
+            by_amount.setdefault(amt, []).append(pid)
+    remaining = {pid: amt for amt, pids in by_amount.items() for pid in pids}
+
+    if sum(remaining.values()) != 0 or len(remaining) > max_participants:
+        return settlements + min_cash_flow({pid: from_cents(amt) for pid, amt in remaining.items()})
+
+    pids = sorted(remaining)
+    try:
+        groups = _zero_sum_groups([remaining[pid] for pid in pids], time.perf_counter() + time_budget_s)
+    except SolverTimeout:
+        return settlements + min_cash_flow({pid: from_cents(amt) for pid, amt in remaining.items()})
+
+    for group in groups:
+        settlements.extend(min_cash_flow({pids[i]: from_cents(remaining[pids[i]]) for i in group}))
+    return settlements
+
+
+def encode_cursor(values: Dict) -> str:
+    """Opaque keyset-pagination cursor (urlsafe base64 of compact JSON)"""
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict:
+    """Inverse of encode_cursor; raises ValueError on anything malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(values, dict):
+        raise ValueError("Invalid cursor")
+    return values
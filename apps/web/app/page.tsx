@@ -108,7 +108,7 @@ export default function Home() {
               </div>
               <div>
                 <div className="text-3xl font-bold text-primary">
-                  {data?.reduce((acc: number, t: any) => acc + (t.participants?.length || 0), 0) || 0}
+                  {data?.reduce((acc: number, t: any) => acc + (t.participant_count || 0), 0) || 0}
                 </div>
                 <div className="text-sm text-muted-foreground">Travelers</div>
               </div>
@@ -198,7 +198,7 @@ export default function Home() {
                     )}
                     <div className="pt-2 border-t border-border">
                       <span className="text-sm text-muted-foreground">
-                        {trip.participants?.length || 0} traveler{trip.participants?.length !== 1 ? "s" : ""}
+                        {trip.participant_count || 0} traveler{trip.participant_count !== 1 ? "s" : ""}
                       </span>
                     </div>
                   </CardContent>
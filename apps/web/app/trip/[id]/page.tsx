@@ -63,7 +63,9 @@ export default function TripDetailPage() {
   const { data: expenses = [] } = useQuery({
     queryKey: ["expenses", id],
     queryFn: async () => {
+      // Comment and reaction counts come with the list instead of a request per card
       const res = await axios.get(`${process.env.NEXT_PUBLIC_API_URL}/expenses/${id}`, {
+        params: { engagement: true },
         headers: { "x-user-sub": user?.id || "" },
       })
       return res.data
@@ -71,27 +73,18 @@ export default function TripDetailPage() {
     enabled: !!user,
   })
 
-  const { data: analytics } = useQuery({
+  const { data: analyticsSummary } = useQuery({
     queryKey: ["analytics", id],
     queryFn: async () => {
-      const res = await axios.get(`${process.env.NEXT_PUBLIC_API_URL}/analytics/${id}/budget-vs-actual`, {
+      const res = await axios.get(`${process.env.NEXT_PUBLIC_API_URL}/analytics/${id}/summary`, {
         headers: { "x-user-sub": user?.id || "" },
       })
       return res.data
     },
     enabled: !!trip && !!user,
   })
-
-  const { data: dailyTrends } = useQuery({
-    queryKey: ["daily-trends", id],
-    queryFn: async () => {
-      const res = await axios.get(`${process.env.NEXT_PUBLIC_API_URL}/analytics/${id}/daily-trends`, {
-        headers: { "x-user-sub": user?.id || "" },
-      })
-      return res.data
-    },
-    enabled: !!user,
-  })
+  const analytics = analyticsSummary?.budget
+  const dailyTrends = analyticsSummary?.daily_trends
 
   const { data: itinerary = [] } = useQuery({
     queryKey: ["itinerary", id],
@@ -143,7 +136,6 @@ export default function TripDetailPage() {
     // Invalidate queries to refresh data
     queryClient.invalidateQueries({ queryKey: ["expenses", id] })
     queryClient.invalidateQueries({ queryKey: ["analytics", id] })
-    queryClient.invalidateQueries({ queryKey: ["daily-trends", id] })
   }
 
   const handleEditExpense = async (expenseData: any) => {
@@ -153,7 +145,6 @@ export default function TripDetailPage() {
     // Invalidate queries to refresh data
     queryClient.invalidateQueries({ queryKey: ["expenses", id] })
     queryClient.invalidateQueries({ queryKey: ["analytics", id] })
-    queryClient.invalidateQueries({ queryKey: ["daily-trends", id] })
     setExpenseToEdit(null)
   }
 
@@ -164,7 +155,6 @@ export default function TripDetailPage() {
     // Invalidate queries to refresh data
     queryClient.invalidateQueries({ queryKey: ["expenses", id] })
     queryClient.invalidateQueries({ queryKey: ["analytics", id] })
-    queryClient.invalidateQueries({ queryKey: ["daily-trends", id] })
   }
 
   if (!trip) {
@@ -1,6 +1,7 @@
 'use client';
 
-import { useQuery } from '@tanstack/react-query';
+import { useEffect } from 'react';
+import { useQuery, useQueryClient } from '@tanstack/react-query';
 import { useAuth } from '@/contexts/auth-context';
 import {
   Activity,
@@ -91,8 +92,71 @@ function getActivityMessage(activity: ActivityLog): string {
   }
 }
 
+// Parses the server-sent events of /trips/{id}/activity/stream from a fetch body
+// (EventSource can't send the x-user-sub header), resuming from the newest loaded row
+// and then from the last id seen, so nothing committed between fetches is missed.
+// A `reset` event means the gap was too long to replay: refetch the feed instead.
+function useActivityStream(
+  tripId: number,
+  userSub: string | undefined,
+  latestId: number | undefined,
+  enabled: boolean,
+  onActivity: (a: ActivityLog) => void,
+  onReset: () => void
+) {
+  useEffect(() => {
+    if (!userSub || !enabled) return;
+    const controller = new AbortController();
+    let lastId: string | null = latestId ? String(latestId) : null;
+    let retryMs = 3000;
+
+    const connect = async () => {
+      while (!controller.signal.aborted) {
+        try {
+          const params = lastId ? `?after_id=${lastId}` : '';
+          const res = await fetch(`${API_URL}/trips/${tripId}/activity/stream${params}`, {
+            headers: { 'x-user-sub': userSub },
+            signal: controller.signal,
+          });
+          if (!res.ok || !res.body) throw new Error(`stream ${res.status}`);
+          const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+          let buffer = '';
+          for (;;) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += value;
+            let end;
+            while ((end = buffer.indexOf('\n\n')) >= 0) {
+              const block = buffer.slice(0, end);
+              buffer = buffer.slice(end + 2);
+              let data = '';
+              let event = 'message';
+              for (const line of block.split('\n')) {
+                if (line.startsWith('id: ')) lastId = line.slice(4);
+                else if (line.startsWith('event: ')) event = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+                else if (line.startsWith('retry: ')) retryMs = Number(line.slice(7)) || retryMs;
+              }
+              if (event === 'reset') onReset();
+              else if (data) onActivity(JSON.parse(data));
+            }
+          }
+        } catch {
+          if (controller.signal.aborted) return;
+        }
+        await new Promise((resolve) => setTimeout(resolve, retryMs));
+      }
+    };
+    connect();
+    return () => controller.abort();
+    // latestId only seeds the first connection
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [tripId, userSub, enabled]);
+}
+
 export function ActivityFeed({ tripId }: { tripId: number }) {
   const { user } = useAuth();
+  const queryClient = useQueryClient();
 
   const { data: activities = [], isLoading } = useQuery<ActivityLog[]>({
     queryKey: ['trip-activity', tripId],
@@ -104,9 +168,22 @@ export function ActivityFeed({ tripId }: { tripId: number }) {
       return data;
     },
     enabled: !!user,
-    refetchInterval: 30000, // Refetch every 30 seconds for near real-time updates
   });
 
+  // New activity is pushed over the stream instead of polling
+  useActivityStream(
+    tripId,
+    user?.id,
+    activities[0]?.id,
+    !isLoading,
+    (activity) => {
+      queryClient.setQueryData<ActivityLog[]>(['trip-activity', tripId], (old = []) =>
+        old.some((a) => a.id === activity.id) ? old : [activity, ...old].slice(0, 50)
+      );
+    },
+    () => queryClient.invalidateQueries({ queryKey: ['trip-activity', tripId] })
+  );
+
   if (isLoading) {
     return (
       <div className="space-y-3">
@@ -2,7 +2,7 @@
 
 import { motion } from "framer-motion"
 import { formatCurrency, formatDate, cn } from "@/lib/utils"
-import { MapPin, Receipt, Edit2, Trash2 } from "lucide-react"
+import { MapPin, Receipt, Edit2, Trash2, MessageCircle } from "lucide-react"
 
 interface ExpenseCardProps {
   expense: {
@@ -15,6 +15,11 @@ interface ExpenseCardProps {
     note?: string
     location_text?: string
     payer_id: number
+    engagement?: {
+      comment_count: number
+      reactions: Record<string, number>
+      viewer_reactions: string[]
+    }
   }
   index: number
   onEdit?: (expense: any) => void
@@ -88,6 +93,29 @@ export function ExpenseCard({ expense, index, onEdit, onDelete }: ExpenseCardPro
               <span>{expense.location_text}</span>
             </div>
           )}
+
+          {expense.engagement &&
+            (expense.engagement.comment_count > 0 || Object.keys(expense.engagement.reactions).length > 0) && (
+            <div className="flex items-center gap-2 mt-2 text-xs text-muted-foreground">
+              {expense.engagement.comment_count > 0 && (
+                <span className="flex items-center gap-1">
+                  <MessageCircle className="w-3 h-3" />
+                  {expense.engagement.comment_count}
+                </span>
+              )}
+              {Object.entries(expense.engagement.reactions).map(([emoji, count]) => (
+                <span
+                  key={emoji}
+                  className={cn(
+                    "px-1.5 py-0.5 rounded-full bg-muted",
+                    expense.engagement?.viewer_reactions.includes(emoji) && "ring-1 ring-primary"
+                  )}
+                >
+                  {emoji} {count}
+                </span>
+              ))}
+            </div>
+          )}
         </div>
 
         <div className="text-right">
@@ -105,6 +105,7 @@ export function ExpenseDetailModal({
     },
     onSuccess: () => {
       queryClient.invalidateQueries({ queryKey: ['expense-comments', expense.id] });
+      queryClient.invalidateQueries({ queryKey: ['expenses'] });
       setCommentText('');
     },
   });
@@ -121,6 +122,7 @@ export function ExpenseDetailModal({
     },
     onSuccess: () => {
       queryClient.invalidateQueries({ queryKey: ['expense-reactions', expense.id] });
+      queryClient.invalidateQueries({ queryKey: ['expenses'] });
       setShowEmojiPicker(false);
     },
   });
@@ -134,6 +136,7 @@ export function ExpenseDetailModal({
     },
     onSuccess: () => {
       queryClient.invalidateQueries({ queryKey: ['expense-reactions', expense.id] });
+      queryClient.invalidateQueries({ queryKey: ['expenses'] });
     },
   });
 
@@ -24,4 +24,25 @@ api.interceptors.request.use(
   }
 );
 
+// Read-your-writes with a read replica: the API stamps responses to writes with
+// X-Last-Write; sending it back keeps our next reads on the primary, whichever
+// worker answers them. Applied to the shared instance and to bare axios calls.
+let lastWrite: string | null = null;
+
+for (const instance of [api, axios]) {
+  instance.interceptors.request.use((config) => {
+    if (lastWrite) {
+      config.headers['x-last-write'] = lastWrite;
+    }
+    return config;
+  });
+  instance.interceptors.response.use((response) => {
+    const stamp = response.headers['x-last-write'];
+    if (stamp) {
+      lastWrite = stamp;
+    }
+    return response;
+  });
+}
+
 export default api;